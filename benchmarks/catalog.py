@@ -0,0 +1,241 @@
+"""prm Package Web Service API - Synthetic package catalog
+
+Generator for synthetic package indexes that are used by the benchmarks. The
+generator writes an index file and one package file per package. The scale of
+the catalog is controlled by the number of packages, the number of modules per
+package, the depth of module folders, and the number of install tasks per
+module.
+
+Folder paths consist of components that are drawn from the first
+FOLDER_FANOUT words of the vocabulary. A prefix query of depth k that repeats
+the first word k times therefore matches about 1 / FOLDER_FANOUT^k of the
+package modules.
+
+The generated catalog only depends on its parameters and the random seed.
+
+Usage: python -m benchmarks.catalog [-p PACKAGES] [-m MODULES] [-d DEPTH]
+       [-t TASKS] [-s SEED] DIRECTORY
+"""
+
+import argparse
+import os
+import random
+import sys
+import yaml
+
+
+"""Words that are used for folder names, module names, and descriptions."""
+WORDS = [
+    'transportation', 'services', 'health', 'education', 'housing',
+    'environment', 'finance', 'safety', 'parks', 'census', 'energy',
+    'water', 'traffic', 'taxi', 'subway', 'bus', 'bike', 'permits',
+    'complaints', 'inspections', 'schools', 'budget', 'payroll', 'crime',
+    'weather', 'air', 'noise', 'trees', 'zoning', 'elections'
+]
+
+"""Number of different folder names on each level of the folder hierarchy."""
+FOLDER_FANOUT = 4
+
+
+def generate_catalog(directory, packages=100, modules=100, depth=2, tasks=1, seed=0):
+    """Write a synthetic package catalog into the given directory. The
+    directory is created if it does not exist. Package files are referenced
+    by their absolute path in the index file.
+
+    Parameters
+    ----------
+    directory: string
+        Output directory
+    packages: int, optional
+        Number of packages
+    modules: int, optional
+        Number of modules per package
+    depth: int, optional
+        Number of components in module folder paths
+    tasks: int, optional
+        Number of install tasks per module
+    seed: int, optional
+        Seed for the random generator
+
+    Returns
+    -------
+    string
+        Absolute path to the index file
+    """
+    directory = os.path.abspath(directory)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    rand = random.Random(seed)
+    entries = list()
+    for i in range(packages):
+        name = package_name(i)
+        package_file = os.path.join(directory, name + '.yaml')
+        doc = {
+            'version': '1.0.' + str(i),
+            'timestamp': '2017-09-21T08:00:' + str(i % 60).zfill(2),
+            'description': 'Synthetic package ' + str(i),
+            'modules': [
+                module_specification(rand, name, j, depth, tasks)
+                    for j in range(modules)
+            ]
+        }
+        with open(package_file, 'w') as f:
+            yaml.safe_dump(doc, f, default_flow_style=False)
+        entries.append({'name': name, 'file': package_file})
+    index_file = os.path.join(directory, 'index.yaml')
+    with open(index_file, 'w') as f:
+        yaml.safe_dump({'packages': entries}, f, default_flow_style=False)
+    return index_file
+
+
+def main(args=None):
+    """Generate a synthetic catalog from the command line.
+
+    Parameters
+    ----------
+    args: list(string), optional
+        Command line arguments. Uses sys.argv if not given.
+
+    Returns
+    -------
+    int
+        Exit status
+    """
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic prm package catalog.'
+    )
+    add_catalog_arguments(parser)
+    parser.add_argument('directory', help='output directory')
+    args = parser.parse_args(args)
+    index_file = generate_catalog(
+        args.directory,
+        packages=args.packages,
+        modules=args.modules,
+        depth=args.depth,
+        tasks=args.tasks,
+        seed=args.seed
+    )
+    print('generated catalog ' + index_file)
+    return 0
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def add_catalog_arguments(parser):
+    """Add the command line arguments for the catalog scale to a parser.
+
+    Parameters
+    ----------
+    parser: argparse.ArgumentParser
+        Command line argument parser
+    """
+    parser.add_argument(
+        '-p', '--packages', type=int, default=50,
+        help='number of packages (default 50)'
+    )
+    parser.add_argument(
+        '-m', '--modules', type=int, default=200,
+        help='number of modules per package (default 200)'
+    )
+    parser.add_argument(
+        '-d', '--depth', type=int, default=3,
+        help='number of components in module folders (default 3)'
+    )
+    parser.add_argument(
+        '-t', '--tasks', type=int, default=1,
+        help='number of install tasks per module (default 1)'
+    )
+    parser.add_argument(
+        '-s', '--seed', type=int, default=0,
+        help='seed for the random generator (default 0)'
+    )
+
+
+def folder_query(name, depth):
+    """Get the package query for the folder prefix of the given depth that is
+    repeated in every package.
+
+    Parameters
+    ----------
+    name: string
+        Package name
+    depth: int
+        Number of folder components in the query
+
+    Returns
+    -------
+    string
+    """
+    return '.'.join([name] + [WORDS[0]] * depth)
+
+
+def module_specification(rand, package, index, depth, tasks):
+    """Create a synthetic module specification.
+
+    Parameters
+    ----------
+    rand: random.Random
+        Random generator
+    package: string
+        Package name
+    index: int
+        Position of the module in the package
+    depth: int
+        Number of components in the module folder path
+    tasks: int
+        Number of install tasks
+
+    Returns
+    -------
+    dict
+    """
+    folder = '.'.join([
+        WORDS[rand.randrange(FOLDER_FANOUT)] for _ in range(depth)
+    ])
+    name = rand.choice(WORDS) + str(index)
+    module = {
+        'name': name,
+        'folder': folder,
+        'description': ' '.join(rand.sample(WORDS, 4)),
+        'command': {
+            'type': 'PYTHON',
+            'components': [{'type': 'CONST', 'value': name + '.py'}]
+        }
+    }
+    if tasks > 0:
+        module['install'] = {
+            'tasks': [
+                {
+                    'type': 'DOWNLOAD',
+                    'properties': [
+                        {
+                            'name': 'source',
+                            'value': package + '/' + name + '-' + str(t) + '.zip'
+                        },
+                        {'name': 'target', 'value': name + '-' + str(t) + '.zip'}
+                    ]
+                } for t in range(tasks)
+            ]
+        }
+    return module
+
+
+def package_name(index):
+    """Get the name of the package at the given position.
+
+    Parameters
+    ----------
+    index: int
+        Position of the package in the index
+
+    Returns
+    -------
+    string
+    """
+    return 'package' + str(index).zfill(4)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
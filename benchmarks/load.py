@@ -0,0 +1,584 @@
+"""prm Package Web Service API - Load test
+
+End-to-end load test for the Web server. The load test generates a synthetic
+catalog (see benchmarks.catalog), starts the Flask app for the catalog, and
+sends requests from many client threads for a fixed duration. Requests are
+drawn from a weighted mix of the following routes:
+
+- root: Service overview (/)
+- packages: Package listing (/packages)
+- query: Modules of a random package with a random folder prefix
+  (/packages/<query>)
+
+The app is either called in-process through its WSGI interface (driver
+'wsgi') or served by a threaded HTTP server on a loopback port (driver
+'http'). The report contains the throughput, the latency percentiles (p50,
+p95, p99), and the number of errors for all requests and for each route.
+
+If a change interval is given, one package file is rewritten at the given
+interval while the test is running. Requests that start within one interval
+after a change are reported separately to show stalls that are caused by
+reloading the index. By default, the index is reloaded on the request path.
+With --watch the index is reloaded by the background index watcher instead.
+
+Usage: python -m benchmarks.load [-p PACKAGES] [-m MODULES] [-d DEPTH]
+       [-t TASKS] [-s SEED] [--driver {wsgi,http}] [--threads THREADS]
+       [--duration SECONDS] [--mix MIX] [--change-interval SECONDS]
+       [--watch SECONDS] [-o OUTPUT]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import yaml
+
+from benchmarks.catalog import add_catalog_arguments, folder_query
+from benchmarks.catalog import generate_catalog, package_name
+import prmpckgsrv.const as const
+
+
+"""Request routes of the load test."""
+ROUTE_PACKAGES = 'packages'
+ROUTE_QUERY = 'query'
+ROUTE_ROOT = 'root'
+
+"""Default weights of the request routes."""
+DEFAULT_MIX = 'root=1,packages=2,query=7'
+
+"""Latency percentiles in the report."""
+PERCENTILES = [50, 95, 99]
+
+
+class LoadClient(threading.Thread):
+    """Client thread that sends requests until the end of the test. Records
+    the start time, latency, route, and status of each request.
+
+    Attributes
+    ----------
+    records: list(tuple)
+        List of (start time, latency, route, status) tuples. The status is
+        None for requests that raised an exception.
+    """
+    def __init__(self, send, requests, deadline, seed):
+        """Initialize the client.
+
+        Parameters
+        ----------
+        send: func
+            Function that sends a request for a path and returns the Http
+            status code
+        requests: func
+            Function that returns a random (route, path) pair for a given
+            random generator
+        deadline: float
+            Time (as returned by time.perf_counter) at which the client stops
+        seed: int
+            Seed for the random generator of the client
+        """
+        super(LoadClient, self).__init__()
+        self.daemon = True
+        self.send = send
+        self.requests = requests
+        self.deadline = deadline
+        self.rand = random.Random(seed)
+        self.records = list()
+
+    def run(self):
+        """Send requests until the deadline is reached."""
+        while True:
+            start = time.perf_counter()
+            if start >= self.deadline:
+                break
+            route, path = self.requests(self.rand)
+            try:
+                status = self.send(path)
+            except Exception:
+                status = None
+            self.records.append(
+                (start, time.perf_counter() - start, route, status)
+            )
+
+
+class PackageChanger(threading.Thread):
+    """Thread that rewrites a package file at a fixed interval. Each change
+    modifies the package description and replaces the file atomically.
+
+    Attributes
+    ----------
+    changes: list(float)
+        Times (as returned by time.perf_counter) of the changes
+    """
+    def __init__(self, package_file, interval, deadline):
+        """Initialize the changer.
+
+        Parameters
+        ----------
+        package_file: string
+            Path to the package file that is changed
+        interval: float
+            Interval between changes in seconds
+        deadline: float
+            Time (as returned by time.perf_counter) at which the changer stops
+        """
+        super(PackageChanger, self).__init__()
+        self.daemon = True
+        self.package_file = package_file
+        self.interval = interval
+        self.deadline = deadline
+        self.changes = list()
+
+    def run(self):
+        """Change the package file until the deadline is reached."""
+        with open(self.package_file, 'r') as f:
+            doc = yaml.safe_load(f)
+        while time.perf_counter() + self.interval < self.deadline:
+            time.sleep(self.interval)
+            doc['description'] = 'Changed ' + str(len(self.changes) + 1)
+            tmp_file = self.package_file + '.tmp'
+            with open(tmp_file, 'w') as f:
+                yaml.safe_dump(doc, f, default_flow_style=False)
+            os.replace(tmp_file, self.package_file)
+            self.changes.append(time.perf_counter())
+
+
+def main(args=None):
+    """Run the load test from the command line.
+
+    Parameters
+    ----------
+    args: list(string), optional
+        Command line arguments. Uses sys.argv if not given.
+
+    Returns
+    -------
+    int
+        Exit status
+    """
+    parser = argparse.ArgumentParser(
+        description='Run a load test against the prm package server.'
+    )
+    add_catalog_arguments(parser)
+    parser.add_argument(
+        '--driver', choices=['wsgi', 'http'], default='wsgi',
+        help='call the app in-process or over a loopback port (default wsgi)'
+    )
+    parser.add_argument(
+        '--threads', type=int, default=16,
+        help='number of client threads (default 16)'
+    )
+    parser.add_argument(
+        '--duration', type=float, default=10,
+        help='duration of the test in seconds (default 10)'
+    )
+    parser.add_argument(
+        '--mix', default=DEFAULT_MIX,
+        help='route weights (default ' + DEFAULT_MIX + ')'
+    )
+    parser.add_argument(
+        '--change-interval', type=float, default=0,
+        help='rewrite a package file every SECONDS during the test'
+    )
+    parser.add_argument(
+        '--watch', type=float, default=0,
+        help='polling interval of the background index watcher (default off)'
+    )
+    parser.add_argument('-o', '--output', help='write report to Json file')
+    args = parser.parse_args(args)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as ex:
+        parser.error(str(ex))
+    directory = tempfile.mkdtemp()
+    try:
+        index_file = generate_catalog(
+            directory,
+            packages=args.packages,
+            modules=args.modules,
+            depth=args.depth,
+            tasks=args.tasks,
+            seed=args.seed
+        )
+        app = create_app(directory, index_file, watch=args.watch)
+        report = run_load_test(
+            app,
+            request_generator(mix, args.packages, args.depth),
+            driver=args.driver,
+            threads=args.threads,
+            duration=args.duration,
+            change_file=os.path.join(directory, package_name(0) + '.yaml'),
+            change_interval=args.change_interval
+        )
+    finally:
+        shutil.rmtree(directory)
+    report['settings'] = {
+        'driver': args.driver,
+        'threads': args.threads,
+        'duration': args.duration,
+        'mix': mix,
+        'changeInterval': args.change_interval,
+        'watch': args.watch,
+        'packages': args.packages,
+        'modules': args.modules,
+        'depth': args.depth,
+        'tasks': args.tasks
+    }
+    print_report(report)
+    if not args.output is None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4, sort_keys=True)
+    return 0
+
+
+def run_load_test(app, requests, driver='wsgi', threads=16, duration=10, change_file=None, change_interval=0):
+    """Run the load test against the given app and return the report.
+
+    Parameters
+    ----------
+    app: flask.Flask
+        Web server app
+    requests: func
+        Function that returns a random (route, path) pair for a given random
+        generator
+    driver: string, optional
+        'wsgi' to call the app in-process, 'http' to serve the app on a
+        loopback port
+    threads: int, optional
+        Number of client threads
+    duration: float, optional
+        Duration of the test in seconds
+    change_file: string, optional
+        Package file that is rewritten during the test
+    change_interval: float, optional
+        Interval between package file changes in seconds. Package files are
+        not changed if the value is not greater than zero.
+
+    Returns
+    -------
+    dict
+    """
+    server = None
+    if driver == 'http':
+        server, port = start_http_server(app)
+        send = lambda path: send_http_request('127.0.0.1', port, path)
+    else:
+        send = lambda path: send_wsgi_request(app, path)
+    try:
+        start = time.perf_counter()
+        deadline = start + duration
+        clients = [
+            LoadClient(send, requests, deadline, seed=i)
+                for i in range(threads)
+        ]
+        changer = None
+        if change_interval > 0 and not change_file is None:
+            changer = PackageChanger(change_file, change_interval, deadline)
+            changer.start()
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - start
+        if not changer is None:
+            changer.join()
+    finally:
+        if not server is None:
+            server.shutdown()
+    records = list()
+    for client in clients:
+        records.extend(client.records)
+    report = {
+        'requests': len(records),
+        'throughput': len(records) / elapsed,
+        'all': summarize(records),
+        'routes': dict()
+    }
+    for route in sorted(set([r[2] for r in records])):
+        report['routes'][route] = summarize([r for r in records if r[2] == route])
+    if not changer is None:
+        # Requests that start within one interval after a change
+        window = [
+            r for r in records
+                if any([c <= r[0] < c + change_interval for c in changer.changes])
+        ]
+        report['changes'] = len(changer.changes)
+        report['afterChange'] = summarize(window)
+    return report
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def create_app(directory, index_file, watch=0):
+    """Create the Flask app for the given catalog. The server module reads
+    its configuration when it is imported. The configuration file is written
+    to the catalog directory and referenced by the environment variable
+    before the module is imported.
+
+    Parameters
+    ----------
+    directory: string
+        Catalog directory
+    index_file: string
+        Absolute path to the catalog index file
+    watch: float, optional
+        Polling interval of the background index watcher. The watcher is not
+        started if the value is not greater than zero.
+
+    Returns
+    -------
+    flask.Flask
+    """
+    config_file = os.path.join(directory, 'config.yaml')
+    properties = [
+        {'key': const.PACKAGE_INDEXFILE, 'value': index_file},
+        {'key': const.PACKAGE_WATCH_INTERVAL, 'value': watch},
+        {'key': const.APP_DEBUG, 'value': False}
+    ]
+    with open(config_file, 'w') as f:
+        yaml.safe_dump({'properties': properties}, f, default_flow_style=False)
+    os.environ[const.ENV_CONFIG] = config_file
+    from prmpckgsrv.server import app
+    return app
+
+
+def parse_mix(mix):
+    """Parse the route weights from a comma-separated list of route=weight
+    pairs. Raises ValueError if the list is not valid.
+
+    Parameters
+    ----------
+    mix: string
+        Route weights
+
+    Returns
+    -------
+    dict(int)
+    """
+    weights = dict()
+    for pair in mix.split(','):
+        route, _, weight = pair.partition('=')
+        if not route in [ROUTE_ROOT, ROUTE_PACKAGES, ROUTE_QUERY]:
+            raise ValueError('unknown route \'' + route + '\'')
+        try:
+            weights[route] = int(weight)
+        except ValueError:
+            raise ValueError('invalid weight \'' + weight + '\'')
+    if sum(weights.values()) <= 0:
+        raise ValueError('route weights must not all be zero')
+    return weights
+
+
+def percentile(values, p):
+    """Get the p-th percentile of a sorted list of values using the nearest
+    rank method.
+
+    Parameters
+    ----------
+    values: list(float)
+        Sorted list of values
+    p: int
+        Percentile
+
+    Returns
+    -------
+    float
+    """
+    if len(values) == 0:
+        return None
+    rank = max(int(-(-p * len(values) // 100)), 1)
+    return values[rank - 1]
+
+
+def print_report(report):
+    """Print the load test report.
+
+    Parameters
+    ----------
+    report: dict
+        Load test report
+    """
+    print(
+        str(report['requests']) + ' requests, ' +
+        ('%.1f' % report['throughput']) + ' requests/s'
+    )
+    rows = [('all', report['all'])]
+    rows.extend(sorted(report['routes'].items()))
+    if 'afterChange' in report:
+        rows.append((
+            'after ' + str(report['changes']) + ' change(s)',
+            report['afterChange']
+        ))
+    header = 'route'.ljust(24) + 'requests'.rjust(10) + 'errors'.rjust(8)
+    for p in PERCENTILES:
+        header += ('p' + str(p)).rjust(12)
+    header += 'max'.rjust(12)
+    print(header)
+    for name, summary in rows:
+        line = name.ljust(24)
+        line += str(summary['requests']).rjust(10)
+        line += str(summary['errors']).rjust(8)
+        for key in ['p' + str(p) for p in PERCENTILES] + ['max']:
+            if summary[key] is None:
+                line += '-'.rjust(12)
+            else:
+                line += ('%.2f ms' % (summary[key] * 1000)).rjust(12)
+        print(line)
+
+
+def request_generator(mix, packages, depth):
+    """Get function that returns a random (route, path) pair for a given
+    random generator. Routes are drawn according to their weights. Package
+    queries reference a random package and a folder prefix of random depth.
+
+    Parameters
+    ----------
+    mix: dict(int)
+        Route weights
+    packages: int
+        Number of packages in the catalog
+    depth: int
+        Number of components in module folders
+
+    Returns
+    -------
+    func
+    """
+    routes = list(mix.keys())
+    weights = [mix[route] for route in routes]
+    def requests(rand):
+        route = rand.choices(routes, weights=weights)[0]
+        if route == ROUTE_ROOT:
+            return route, '/'
+        elif route == ROUTE_PACKAGES:
+            return route, '/packages'
+        query = folder_query(
+            package_name(rand.randrange(packages)),
+            rand.randint(0, depth)
+        )
+        return route, '/packages/' + query
+    return requests
+
+
+def send_http_request(host, port, path):
+    """Send a GET request over Http and read the response.
+
+    Parameters
+    ----------
+    host: string
+        Server host
+    port: int
+        Server port
+    path: string
+        Request path
+
+    Returns
+    -------
+    int
+    """
+    connection = http.client.HTTPConnection(host, port)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def send_wsgi_request(app, path):
+    """Call the app through its WSGI interface and read the response.
+
+    Parameters
+    ----------
+    app: flask.Flask
+        Web server app
+    path: string
+        Request path
+
+    Returns
+    -------
+    int
+    """
+    from werkzeug.test import run_wsgi_app
+    from werkzeug.test import EnvironBuilder
+    builder = EnvironBuilder(path=path, method='GET')
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+    body, status, _ = run_wsgi_app(app, environ, buffered=False)
+    for _ in body:
+        pass
+    if hasattr(body, 'close'):
+        body.close()
+    return int(status.split(' ', 1)[0])
+
+
+def start_http_server(app):
+    """Serve the app on a free loopback port in a background thread. Requests
+    are handled in separate threads.
+
+    Parameters
+    ----------
+    app: flask.Flask
+        Web server app
+
+    Returns
+    -------
+    werkzeug.serving.BaseWSGIServer, int
+    """
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+    server = make_server(
+        '127.0.0.1',
+        0,
+        app,
+        threaded=True,
+        request_handler=QuietRequestHandler
+    )
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, server.server_port
+
+
+def summarize(records):
+    """Summarize a list of request records. The summary contains the number of
+    requests and errors and the latency percentiles in seconds. Requests
+    with a status of 400 or above and requests that failed are errors.
+
+    Parameters
+    ----------
+    records: list(tuple)
+        List of (start time, latency, route, status) tuples
+
+    Returns
+    -------
+    dict
+    """
+    latencies = sorted([r[1] for r in records])
+    summary = {
+        'requests': len(records),
+        'errors': len([r for r in records if r[3] is None or r[3] >= 400])
+    }
+    for p in PERCENTILES:
+        summary['p' + str(p)] = percentile(latencies, p)
+    if len(latencies) > 0:
+        summary['max'] = latencies[-1]
+    else:
+        summary['max'] = None
+    return summary
+
+
+if __name__ == '__main__':
+    sys.exit(main())
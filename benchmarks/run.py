@@ -0,0 +1,358 @@
+"""prm Package Web Service API - Benchmarks
+
+Micro-benchmarks for the index reader and the API layer. The benchmarks run
+against a synthetic catalog (see benchmarks.catalog) and time the following
+operations:
+
+- read_index_file: Read the index file and all package descriptors
+- read_modules: Read the modules of a single package file
+- list_packages: Serialize the package listing
+- get_package_modules[depth=k]: Query the modules of a package with a folder
+  prefix of depth k
+- encode_package_modules: Encode the modules of a package from their
+  pre-encoded Json fragments
+- serialize_modules: Encode the dictionary serialization of the modules of a
+  package
+- search_modules: Search modules with a single term
+
+Each benchmark is repeated several times. The number of calls per repetition
+is chosen such that a repetition takes at least 0.2 seconds. Benchmarks that
+take less than a millisecond per call are repeated at least SHORT_REPEAT
+times since their minimum is more easily affected by noise. Repetitions are
+run in rounds over the whole suite. The repetitions of each benchmark are
+therefore spread over the duration of the run, and a period of load from
+other processes does not affect all repetitions of the same benchmark.
+Results are written as Json and contain the minimum and median time per call
+in seconds.
+
+In compare mode the results are compared against a saved baseline. The
+minimum time per call is compared because it is least affected by noise from
+other processes. A benchmark whose minimum time exceeds the baseline by more
+than the threshold is reported as a regression and the exit status is 1.
+Differences below an absolute floor (--min-difference, in microseconds per
+call) are never reported, since relative differences of very short
+benchmarks are dominated by noise.
+
+Usage: python -m benchmarks.run [-p PACKAGES] [-m MODULES] [-d DEPTH]
+       [-t TASKS] [-s SEED] [-r REPEAT] [-o OUTPUT] [-c BASELINE]
+       [--threshold THRESHOLD] [--min-difference MICROSECONDS]
+       [--catalog DIRECTORY]
+"""
+
+import argparse
+import datetime as dt
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import timeit
+
+from benchmarks.catalog import add_catalog_arguments, folder_query
+from benchmarks.catalog import generate_catalog, package_name
+from prmpckgsrv.api import PrmPackageServer
+from prmpckgsrv.index import read_index_entries, read_index_file, read_modules
+from prmpckgsrv.yamlutil import yaml_backend
+import prmpckgsrv.const as const
+
+
+"""Default relative slowdown of the minimum time that counts as regression."""
+DEFAULT_THRESHOLD = 0.2
+
+"""Default absolute difference (in microseconds per call) below which a
+change of the minimum time is not reported."""
+DEFAULT_MIN_DIFFERENCE = 5
+
+"""Benchmarks whose time per call is below this limit (in seconds) are
+repeated at least SHORT_REPEAT times."""
+SHORT_BENCHMARK = 0.001
+SHORT_REPEAT = 15
+
+"""Labels for the result of comparing a benchmark against the baseline."""
+STATUS_IMPROVED = 'improved'
+STATUS_MISSING = 'missing'
+STATUS_OK = 'ok'
+STATUS_REGRESSION = 'REGRESSION'
+
+
+def benchmark_suite(index_file, depth):
+    """Get the list of benchmarks for a synthetic catalog. Returns a list of
+    (name, function) pairs. The API is initialized and all package modules
+    are loaded before the benchmarks are returned.
+
+    Parameters
+    ----------
+    index_file: string
+        Absolute path to the index file of the catalog
+    depth: int
+        Number of components in module folders
+
+    Returns
+    -------
+    list((string, func))
+    """
+    config = dict(const.DEFAULT_CONFIG)
+    config[const.PACKAGE_INDEXFILE] = index_file
+    api = PrmPackageServer(config)
+    snapshot = api.get_snapshot()
+    for name in snapshot.packages:
+        snapshot.get_modules(name)
+    package = package_name(0)
+    _, package_file = read_index_entries(index_file)[0]
+    suite = [
+        ('read_index_file', lambda: read_index_file(index_file)),
+        ('read_modules', lambda: read_modules(package_file, api.download_prefix)),
+        ('list_packages', lambda: api.list_packages(snapshot=snapshot))
+    ]
+    for k in range(depth + 1):
+        suite.append((
+            'get_package_modules[depth=' + str(k) + ']',
+            query_function(api, snapshot, folder_query(package, k))
+        ))
+    suite.extend([
+        (
+            'encode_package_modules',
+            lambda: api.encode_package_modules(package, snapshot=snapshot)
+        ),
+        (
+            'serialize_modules',
+            lambda: json.dumps(api.get_package_modules(package, snapshot=snapshot))
+        ),
+        (
+            'search_modules',
+            lambda: api.search_modules('transportation', snapshot=snapshot)
+        )
+    ])
+    return suite
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD, min_difference=DEFAULT_MIN_DIFFERENCE):
+    """Compare benchmark results against a baseline. Returns a list of (name,
+    baseline time, time, ratio, status) tuples for all benchmarks in the
+    results. Times are the minimum times per call. Baseline time and ratio are
+    None for benchmarks that are not in the baseline. A benchmark is only
+    reported as regression or improvement if its time differs from the
+    baseline by more than the threshold and by at least the minimum
+    difference.
+
+    Parameters
+    ----------
+    results: dict
+        Benchmark results
+    baseline: dict
+        Baseline benchmark results
+    threshold: float, optional
+        Relative slowdown of the minimum time that counts as regression
+    min_difference: float, optional
+        Absolute difference of the minimum time (in microseconds per call)
+        below which changes are not reported
+
+    Returns
+    -------
+    list(tuple)
+    """
+    comparison = list()
+    for name, result in results['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            comparison.append((name, None, result['min'], None, STATUS_MISSING))
+            continue
+        ratio = result['min'] / base['min']
+        significant = abs(result['min'] - base['min']) * 1e6 >= min_difference
+        if significant and ratio > 1 + threshold:
+            status = STATUS_REGRESSION
+        elif significant and ratio < 1 - threshold:
+            status = STATUS_IMPROVED
+        else:
+            status = STATUS_OK
+        comparison.append((name, base['min'], result['min'], ratio, status))
+    return comparison
+
+
+def main(args=None):
+    """Run the benchmarks from the command line.
+
+    Parameters
+    ----------
+    args: list(string), optional
+        Command line arguments. Uses sys.argv if not given.
+
+    Returns
+    -------
+    int
+        Exit status
+    """
+    parser = argparse.ArgumentParser(
+        description='Run prm package server benchmarks.'
+    )
+    add_catalog_arguments(parser)
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=5,
+        help='number of repetitions per benchmark (default 5)'
+    )
+    parser.add_argument('-o', '--output', help='write results to Json file')
+    parser.add_argument(
+        '-c', '--compare',
+        help='compare results against baseline Json file'
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=DEFAULT_THRESHOLD,
+        help='relative slowdown that counts as regression (default 0.2)'
+    )
+    parser.add_argument(
+        '--min-difference', type=float, default=DEFAULT_MIN_DIFFERENCE,
+        help='smallest reported change in microseconds per call (default 5)'
+    )
+    parser.add_argument(
+        '--catalog',
+        help='directory for the generated catalog (default: temporary)'
+    )
+    args = parser.parse_args(args)
+    catalog = {
+        'packages': args.packages,
+        'modules': args.modules,
+        'depth': args.depth,
+        'tasks': args.tasks,
+        'seed': args.seed
+    }
+    directory = args.catalog
+    if directory is None:
+        directory = tempfile.mkdtemp()
+    try:
+        index_file = generate_catalog(directory, **catalog)
+        results = run_benchmarks(
+            benchmark_suite(index_file, args.depth),
+            repeat=args.repeat
+        )
+    finally:
+        if args.catalog is None:
+            shutil.rmtree(directory)
+    results['catalog'] = catalog
+    if not args.output is None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+    if args.compare is None:
+        for name, result in results['benchmarks'].items():
+            print(
+                name.ljust(32) +
+                format_time(result['min']) +
+                format_time(result['median'])
+            )
+        return 0
+    with open(args.compare, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get('catalog') != catalog:
+        print('warning: baseline was measured for a different catalog')
+    regressions = 0
+    comparison = compare_results(
+        results,
+        baseline,
+        threshold=args.threshold,
+        min_difference=args.min_difference
+    )
+    for name, base, value, ratio, status in comparison:
+        line = name.ljust(32)
+        if base is None:
+            line += '-'.rjust(12) + format_time(value)
+        else:
+            line += format_time(base) + format_time(value)
+            line += ('%.2fx' % ratio).rjust(8)
+        print(line + '  ' + status)
+        if status == STATUS_REGRESSION:
+            regressions += 1
+    if regressions > 0:
+        return 1
+    return 0
+
+
+def run_benchmarks(suite, repeat=5):
+    """Time each benchmark in the given suite. Returns a dictionary with the
+    environment information and the results for each benchmark. Benchmarks
+    that take less than SHORT_BENCHMARK seconds per call are repeated at
+    least SHORT_REPEAT times. Each round runs one repetition of every
+    benchmark that has repetitions left.
+
+    Parameters
+    ----------
+    suite: list((string, func))
+        List of benchmark names and functions
+    repeat: int, optional
+        Number of repetitions per benchmark
+
+    Returns
+    -------
+    dict
+    """
+    # Calibrate the number of calls per repetition for each benchmark
+    timers = list()
+    for name, func in suite:
+        timer = timeit.Timer(func)
+        number, elapsed = timer.autorange()
+        runs = repeat
+        if elapsed / number < SHORT_BENCHMARK:
+            runs = max(repeat, SHORT_REPEAT)
+        timers.append((name, timer, number, runs, list()))
+    for i in range(max([runs for _, _, _, runs, _ in timers])):
+        for _, timer, number, runs, times in timers:
+            if i < runs:
+                times.append(timer.timeit(number=number) / number)
+    benchmarks = dict()
+    for name, _, number, runs, times in timers:
+        benchmarks[name] = {
+            'min': min(times),
+            'median': statistics.median(times),
+            'number': number,
+            'repeat': runs
+        }
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'yaml': yaml_backend(),
+            'timestamp': dt.datetime.now(dt.timezone.utc).isoformat()
+        },
+        'benchmarks': benchmarks
+    }
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def format_time(seconds):
+    """Format a time in seconds as milliseconds with a fixed width.
+
+    Parameters
+    ----------
+    seconds: float
+        Time in seconds
+
+    Returns
+    -------
+    string
+    """
+    return ('%.3f ms' % (seconds * 1000)).rjust(12)
+
+
+def query_function(api, snapshot, package_query):
+    """Get benchmark function for a package query.
+
+    Parameters
+    ----------
+    api: prmpckgsrv.api.PrmPackageServer
+        API instance
+    snapshot: prmpckgsrv.index.IndexSnapshot
+        Index snapshot
+    package_query: string
+        Package query
+
+    Returns
+    -------
+    func
+    """
+    return lambda: api.get_package_modules(package_query, snapshot=snapshot)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,100 +5,46 @@ The API module separates the implementation from the specifics of the Web server
 (e.g., Flask or Tornado).
 """
 
-import datetime as dt
+import base64
+import binascii
+import bisect
+import hashlib
+import json
 import os
-import yaml
+import time
+from urllib.parse import urlencode
 
 import prmpckgsrv.const as const
+from prmpckgsrv.compiled import compiled_filename
 from prmpckgsrv.hateoas import UrlFactory, reference, self_reference
+from prmpckgsrv.index import PackageIndex
+# The package model and the index readers are defined in prmpckgsrv.index.
+# They are imported here to keep the existing import paths working.
+from prmpckgsrv.index import ModuleSpecification, PackageDescriptor
+from prmpckgsrv.index import read_index_file, read_modules
+from prmpckgsrv.metrics import STAGE_MATCH, STAGE_SERIALIZE, observe_stage
+from prmpckgsrv.versions import module_query, parse_package_query
 
 
 """Frequently used serialization element labels."""
 JSON_REFERENCES = 'links'
 
 
+"""Version of the module serialization. Index generations that are shared
+between worker processes contain serialized modules. The version has to be
+incremented whenever the serialization changes."""
+SERIALIZATION_VERSION = 1
+
+
 """HATEOAS relation identifier."""
 REL_APIDOC = 'doc';
+REL_BATCH = 'batch'
+REL_NEXT = 'next'
 REL_PACKAGES = 'packages'
+REL_SEARCH = 'search'
 REL_SERVICE = 'home'
 
 
-class ModuleSpecification(object):
-    """Specification of a package module. Expects a dictionary containing the
-    module specification.
-
-    Attributes
-    ----------
-    identifier: string
-        Full module path containing the module folder and name
-    """
-    def __init__(self, obj):
-        """Initialize from dict.
-
-        Parameters
-        ----------
-        obj: dict
-        """
-        self.obj = obj
-        self.identifier = self.obj['folder']
-        if self.identifier == '':
-            self.identifier = self.obj['name']
-        else:
-            self.identifier = self.identifier + '.' + self.obj['name']
-
-
-    def matches(self, query):
-        path = self.identifier.split('.')
-        if len(path) >= len(query):
-            for i in range(len(query)):
-                if path[i] != query[i]:
-                    return False
-            return True
-        return False
-
-    def to_dict(self):
-        return self.obj
-
-
-class PackageDescriptor(object):
-    """Descriptor for a package that is available on the server.
-
-    Attributes
-    ----------
-    name: string
-        Unique package name
-    description: string, optional
-        Optional package description
-    version: string
-        Package version information
-    timestamp: datetime
-        Timestamp of package creation
-    file: string
-        Path to package file
-    """
-    def __init__(self, name, file, version, timestamp, description=None):
-        """Initialize package descriptor.
-
-        Parameters
-        ----------
-        name: string
-            Unique package name
-        file: string
-            Path to package file
-        version: string
-            Package version information
-        timestamp: datetime
-            Timestamp of package creation
-        description: string, optional
-            Optional package description
-        """
-        self.name = name
-        self.file = file
-        self.timestamp = timestamp
-        self.version = version
-        self.description = description
-
-
 class PrmPackageServer(object):
     """The Web Service API implements the methods that correspond to the Http
     requests that are handled by the Web server.
@@ -109,43 +55,122 @@ class PrmPackageServer(object):
       - name         : Unique package name
       - file         : Absolute path to package definition file
     """
-    def __init__(self, config):
+    def __init__(self, config, logger=None):
         """Initialize the API from a configuration dictionary. Expects the
         following keys to be present in the dictionary:
         - APP_NAME : Application (short) name for the service description
         - API_DOC : Url for API documentation
         - DOWNLOAD_URLPREFIX: Url prefix for module download tasks.
-        - PACKAGE_INDEXFILE: Index file for package information
+        - DOWNLOAD_DIRECTORY: Directory of module artifacts that are served
+          by the Web server (optional). If given, module download tasks refer
+          to the download route of the server instead of DOWNLOAD_URLPREFIX.
+        - PACKAGE_INDEXFILE: Index file for package information, or list of
+          index files and directories of index files (shards) that are merged
+          into a single package index
+        - PACKAGE_CACHE_MAXBYTES: Memory budget in bytes for loaded package
+          modules (optional)
+        - PACKAGE_COMPILEDFILE: Compiled index file (optional)
+        - PACKAGE_LOAD_WORKERS: Number of workers that read package files in
+          parallel (optional)
+        - PACKAGE_LOAD_PROCESSES: Use a process pool instead of a thread pool
+          to read package files (optional)
+        - PACKAGE_SHARED: Share the package index between worker processes
+          by publishing it as an index generation in the compiled index file
+          (optional)
+        - PACKAGE_WATCH_INTERVAL: Polling interval (in seconds) of the
+          background index watcher (optional). The watcher is only started
+          if the interval is greater than zero.
         - SERVER_APP_PATH : Application path part of the Url to access the app
         - SERVER_URL : Base Url of the server where the app is running
         - SERVER_PORT : Port the server is running on
 
         Raises ValueError if (1) the configuration file misses required
         parameters, (2) the package index file does not exist, or (3) the
-        package index file is not in the expected format.
+        package index file is not in the expected format. For a list of index
+        files, ValueError is raised if any of the files or directories does
+        not exist or if none of the index files is valid.
 
         Parameters
         ----------
         config : dict
             Dictionary with configuration parametera
+        logger: logging.Logger, optional
+            Logger for errors that occur outside of requests
         """
-        self.index_file = os.path.abspath(config[const.PACKAGE_INDEXFILE])
-        if not os.path.isfile(self.index_file):
-            raise ValueError('unknown file \'' + self.index_file + '\'')
-        # Read index file to ensure that it is valid
-        read_index_file(self.index_file)
-        # Initialize the download Url prefix
-        self.download_prefix = config[const.DOWNLOAD_URLPREFIX]
-        while self.download_prefix.endswith('/'):
-            self.downoad_prefix = self.download_prefix[:-1]
+        index_files = config[const.PACKAGE_INDEXFILE]
+        if isinstance(index_files, list):
+            self.index_files = [os.path.abspath(f) for f in index_files]
+        else:
+            self.index_files = [os.path.abspath(index_files)]
+        for filename in self.index_files:
+            if not os.path.isfile(filename) and not os.path.isdir(filename):
+                raise ValueError('unknown file \'' + filename + '\'')
         # Initialize the factory for API resource Urls
         self.urls = UrlFactory(config)
+        # Initialize the download Url prefix. Artifacts in a local download
+        # directory are served by the Web server itself.
+        self.download_directory = config.get(const.DOWNLOAD_DIRECTORY)
+        if not self.download_directory is None:
+            self.download_directory = os.path.abspath(self.download_directory)
+            if not os.path.isdir(self.download_directory):
+                raise ValueError(
+                    'unknown directory \'' + self.download_directory + '\''
+                )
+            self.download_prefix = self.urls.downloads_url()
+        else:
+            self.download_prefix = config[const.DOWNLOAD_URLPREFIX]
+        while self.download_prefix.endswith('/'):
+            self.download_prefix = self.download_prefix[:-1]
+        # The compiled index file defaults to the index file name with suffix
+        # '.bin'. The file is only used if it exists and is current. Each
+        # shard of a federated index has its own compiled file.
+        if const.PACKAGE_COMPILEDFILE in config:
+            if isinstance(index_files, list) or os.path.isdir(self.index_files[0]):
+                raise ValueError(
+                    '\'' + const.PACKAGE_COMPILEDFILE +
+                    '\' requires a single index file'
+                )
+            compiled_file = os.path.abspath(config[const.PACKAGE_COMPILEDFILE])
+        else:
+            compiled_file = compiled_filename
+        # Shared index generations contain serialized modules. The
+        # fingerprint ensures that generations are only shared by servers
+        # that serialize modules in the same way.
+        fingerprint = None
+        if config.get(const.PACKAGE_SHARED, False):
+            fingerprint = hashlib.sha1(json.dumps([
+                SERIALIZATION_VERSION,
+                self.urls.service_url(),
+                self.download_prefix
+            ]).encode('utf-8')).hexdigest()
+        # Read the initial index snapshot to ensure that the index is valid.
+        # The snapshot is re-read only if any of the index files changes.
+        if isinstance(index_files, list):
+            index_file = self.index_files
+        else:
+            index_file = self.index_files[0]
+        self.index = PackageIndex(
+            index_file,
+            self.download_prefix,
+            compiled_file=compiled_file,
+            workers=config.get(const.PACKAGE_LOAD_WORKERS, 1),
+            processes=config.get(const.PACKAGE_LOAD_PROCESSES, False),
+            cache_size=config.get(const.PACKAGE_CACHE_MAXBYTES, 0),
+            serializer=self.serialize_module,
+            logger=logger,
+            fingerprint=fingerprint
+        )
+        watch_interval = config.get(const.PACKAGE_WATCH_INTERVAL, 0)
+        if watch_interval > 0:
+            self.index.start_watcher(watch_interval, logger=logger)
         # Initialize the service description dictionary
         self.service_descriptor = {
             'name' : config[const.APP_NAME],
             JSON_REFERENCES : [
                 self_reference(self.urls.service_url()),
                 reference(REL_PACKAGES, self.urls.packages_url()),
+                reference(REL_BATCH, self.urls.batch_url()),
+                reference(REL_SEARCH, self.urls.search_url()),
                 reference(REL_APIDOC, config[const.API_DOC])
             ]
         }
@@ -164,74 +189,513 @@ class PrmPackageServer(object):
         """
         return self.service_descriptor
 
+    def cache_statistics(self):
+        """Get statistics for the cache of loaded package modules. The result
+        contains the number of cached packages, their approximate size in
+        bytes, the memory budget, and the number of cache hits, misses, and
+        evictions.
+
+        Returns
+        -------
+        dict
+        """
+        return self.index.cache.statistics()
+
+    def index_statistics(self, snapshot=None):
+        """Get statistics for the package index. The result contains the
+        number of packages and package versions, the number of index shards,
+        the number of rejected shards, and the number of package name
+        conflicts between shards.
+
+        Parameters
+        ----------
+        snapshot: prmpckgsrv.index.IndexSnapshot, optional
+            Index snapshot. Uses the current snapshot if not given.
+
+        Returns
+        -------
+        dict
+        """
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+        return {
+            'packages': len(snapshot.packages),
+            'versions': len(snapshot.files),
+            'shards': len(self.index.shards),
+            'shardErrors': len(snapshot.errors),
+            'conflicts': len(snapshot.conflicts)
+        }
+
     # --------------------------------------------------------------------------
     # Packages
     # --------------------------------------------------------------------------
-    def get_package_modules(self, package_query):
+    def encode_batch_modules(self, package_queries, snapshot=None):
+        """Get the Json encoding for the result of a list of package queries.
+        All queries are evaluated against the same index snapshot. Each
+        matching module is contained only once in the list of modules, even if
+        it matches several queries. For each query the result contains the
+        positions of the matching modules in that list. Queries that reference
+        an unknown package have an error message instead.
+
+        Parameters
+        ----------
+        package_queries: list(string)
+            List of path expressions (using '.' as delimiter) referencing a
+            package or a package folder.
+        snapshot: prmpckgsrv.index.IndexSnapshot, optional
+            Index snapshot to query. Uses the current snapshot if not given.
+
+        Returns
+        -------
+        bytes
+        """
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+        # Modules of each package are retrieved only once to ensure that
+        # duplicates can be identified by object identity.
+        packages = dict()
+        modules = list()
+        positions = dict()
+        results = list()
+        for package_query in package_queries:
+            name, version, path = parse_package_query(package_query)
+            if not (name, version) in packages:
+                packages[(name, version)] = snapshot.get_modules(
+                    name,
+                    version=version
+                )
+            trie = packages[(name, version)]
+            if trie is None:
+                if not version is None:
+                    name += '@' + version
+                results.append({
+                    'query': package_query,
+                    'error': 'unknown package \'' + name + '\''
+                })
+                continue
+            matches = list()
+            start = time.perf_counter()
+            found = trie.find(path)
+            observe_stage(STAGE_MATCH, start)
+            for module in found:
+                pos = positions.get(id(module))
+                if pos is None:
+                    pos = len(modules)
+                    positions[id(module)] = pos
+                    modules.append(module)
+                matches.append(pos)
+            results.append({'query': package_query, 'modules': matches})
+        links = [
+            self_reference(self.urls.batch_url()),
+            reference(
+                REL_PACKAGES,
+                self.urls.packages_url()
+            ),
+            reference(
+                REL_SERVICE,
+                self.urls.service_url()
+            )
+        ]
+        start = time.perf_counter()
+        body = b''.join([
+            b'{"queries": ',
+            json.dumps(results).encode('utf-8'),
+            b', "modules": [',
+            b', '.join([module.fragment for module in modules]),
+            b'], "' + JSON_REFERENCES.encode('utf-8') + b'": ',
+            json.dumps(links).encode('utf-8'),
+            b'}'
+        ])
+        observe_stage(STAGE_SERIALIZE, start)
+        return body
+
+    def encode_package_modules(self, package_query, snapshot=None):
+        """Get the Json encoding of the result of get_package_modules. The
+        encoding is assembled from the pre-encoded fragments of the matching
+        modules. The result is None if the referenced package does not exist.
+
+        Parameters
+        ----------
+        package_query: string
+            Path expression (using '.' as delimiter) referencing a package or a
+            package folder.
+        snapshot: prmpckgsrv.index.IndexSnapshot, optional
+            Index snapshot to query. Uses the current snapshot if not given.
+
+        Returns
+        -------
+        bytes
+        """
+        modules = self.find_modules(package_query, snapshot=snapshot)
+        if modules is None:
+            return None
+        return self.encode_modules(package_query, modules)
+
+    def encode_modules(self, package_query, modules):
+        """Get the Json encoding of a list of modules that matched the given
+        package query. The encoding is assembled from the pre-encoded
+        fragments of the modules.
+
+        Parameters
+        ----------
+        package_query: string
+            Path expression (using '.' as delimiter) referencing a package or a
+            package folder.
+        modules: list(prmpckgsrv.index.ModuleSpecification)
+            Modules that matched the query
+
+        Returns
+        -------
+        bytes
+        """
+        start = time.perf_counter()
+        body = b''.join(self.stream_modules(package_query, modules))
+        observe_stage(STAGE_SERIALIZE, start)
+        return body
+
+    def stream_modules(self, package_query, modules, chunk_size=65536):
+        """Generator for the Json encoding of a list of modules that matched
+        the given package query. The encoding is produced incrementally from
+        the pre-encoded module fragments. Fragments are combined into chunks of
+        approximately the given size.
+
+        Parameters
+        ----------
+        package_query: string
+            Path expression (using '.' as delimiter) referencing a package or a
+            package folder.
+        modules: list(prmpckgsrv.index.ModuleSpecification)
+            Modules that matched the query
+        chunk_size: int, optional
+            Approximate number of bytes in each generated chunk
+
+        Returns
+        -------
+        generator(bytes)
+        """
+        chunk = [b'{"modules": [']
+        size = len(chunk[0])
+        for i, module in enumerate(modules):
+            if i > 0:
+                chunk.append(b', ')
+                size += 2
+            chunk.append(module.fragment)
+            size += len(module.fragment)
+            if size >= chunk_size:
+                yield b''.join(chunk)
+                chunk = []
+                size = 0
+        links = self.package_modules_references(package_query)
+        chunk.append(b'], "' + JSON_REFERENCES.encode('utf-8') + b'": ')
+        chunk.append(json.dumps(links).encode('utf-8'))
+        chunk.append(b'}')
+        yield b''.join(chunk)
+
+    def find_modules(self, package_query, snapshot=None):
+        """Get the specifications of all modules that match the given package
+        query. The result is None if the referenced package does not exist.
+
+        Parameters
+        ----------
+        package_query: string
+            Path expression (using '.' as delimiter) referencing a package or a
+            package folder.
+        snapshot: prmpckgsrv.index.IndexSnapshot, optional
+            Index snapshot to query. Uses the current snapshot if not given.
+
+        Returns
+        -------
+        tuple(prmpckgsrv.index.ModuleSpecification)
+        """
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+        name, version, path = parse_package_query(package_query)
+        modules = snapshot.get_modules(name, version=version)
+        if modules is None:
+            return None
+        start = time.perf_counter()
+        modules = modules.find(path)
+        observe_stage(STAGE_MATCH, start)
+        return modules
+
+    def get_package_modules(
+        self, package_query, snapshot=None, fields=None, limit=None,
+        cursor=None
+    ):
         """Get descriptors for all modules that match the given package query.
         Queries are path expressions (using '.' as path delimiter) starting with
-        a package name.
+        a package name. The package name may be followed by '@' and a version
+        (e.g., name@1.2 or name@latest). The most recent version is used if no
+        version is given.
+
+        The result can be paginated. Modules are returned in the order of the
+        package file. At most limit modules are returned, starting after the
+        module that is encoded in the cursor. If more modules remain the
+        result contains a 'next' reference for the following page. The
+        optional list of fields restricts the module descriptors to the given
+        keys.
+
+        Raises ValueError if the limit or cursor is invalid.
 
         Parameters
         ----------
         package_query: string
             Path expression (using '.' as delimiter) referencing a package or a
             package folder.
+        snapshot: prmpckgsrv.index.IndexSnapshot, optional
+            Index snapshot to query. Uses the current snapshot if not given.
+        fields: list(string), optional
+            Keys that are included in the module descriptors
+        limit: int, optional
+            Maximum number of returned modules
+        cursor: string, optional
+            Cursor returned in the 'next' reference of the previous page
 
         Returns
         -------
         dict
         """
-        packages = read_index_file(self.index_file)
-        query = package_query.split('.')
-        package_name = query[0]
-        if not package_name in packages:
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+        modules = self.find_modules(package_query, snapshot=snapshot)
+        if modules is None:
             return None
-        modules = list()
-        package = packages[package_name]
-        for module in read_modules(package.file, self.download_prefix):
-            if module.matches(query[1:]):
-                m = module.to_dict()
-                m['package'] = package_name
-                m['version'] = package.version
-                m[JSON_REFERENCES] = [
-                    self_reference(
-                        self.urls.module_url(
-                            package_name + '.' + module.identifier
-                        )
-                    )
-                ]
-                modules.append(m)
+        modules, next_cursor = page(
+            modules,
+            lambda m: m.identifier,
+            snapshot.digest,
+            limit=limit,
+            cursor=cursor
+        )
+        name, version, _ = parse_package_query(package_query)
+        package = snapshot.resolve(name, version=version).package
         return {
-            'modules' : modules,
-            JSON_REFERENCES : [
-                self_reference(self.urls.module_url(package_query)),
-                reference(
-                    REL_PACKAGES,
-                    self.urls.packages_url()
-                ),
-                reference(
-                    REL_SERVICE,
-                    self.urls.service_url()
-                )
-            ]
+            'modules' : [
+                self.serialize_module(package, m, fields=fields)
+                    for m in modules
+            ],
+            JSON_REFERENCES : self.package_modules_references(
+                package_query,
+                fields=fields,
+                limit=limit,
+                cursor=cursor,
+                next_cursor=next_cursor
+            )
         }
 
-    def list_packages(self):
+    def get_snapshot(self):
+        """Get the current snapshot of the package index. Callers that issue
+        several requests that need to be consistent should pass the snapshot
+        to the respective API methods.
+
+        Returns
+        -------
+        prmpckgsrv.index.IndexSnapshot
+        """
+        return self.index.get_snapshot()
+
+    def get_timestamp(self, package_query=None, snapshot=None):
+        """Get the creation timestamp of the package that is referenced by the
+        package query. If no query is given the timestamp of the most recent
+        package is returned. The result is None if the referenced package does
+        not exist or if the index is empty.
+
+        Parameters
+        ----------
+        package_query: string, optional
+            Path expression (using '.' as delimiter) referencing a package or a
+            package folder.
+        snapshot: prmpckgsrv.index.IndexSnapshot, optional
+            Index snapshot to query. Uses the current snapshot if not given.
+
+        Returns
+        -------
+        datetime
+        """
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+        if package_query is None:
+            return snapshot.timeline.high_water_mark()
+        name, version, _ = parse_package_query(package_query)
+        source = snapshot.resolve(name, version=version)
+        if source is None:
+            return None
+        return source.package.timestamp
+
+    def list_packages(
+        self, snapshot=None, fields=None, limit=None, cursor=None, since=None
+    ):
         """Get list of packages that are  currently available from the server.
+        Packages are listed in the order of the index file. The listing can be
+        paginated and package descriptors can be restricted to a given list of
+        fields in the same way as the result of get_package_modules.
+
+        If a timestamp is given in since, only packages that are newer than
+        the timestamp are listed, ordered by their timestamp. The result then
+        contains a high-water mark. Clients pass the high-water mark as the
+        since value of their next request to receive subsequent changes. The
+        high-water mark is the timestamp of the last listed package. If the
+        page ends within a group of packages with the same timestamp, the
+        high-water mark is the timestamp of the preceding group. It equals
+        since if no package precedes the group.
+
+        Raises ValueError if the limit or cursor is invalid.
+
+        Parameters
+        ----------
+        snapshot: prmpckgsrv.index.IndexSnapshot, optional
+            Index snapshot to query. Uses the current snapshot if not given.
+        fields: list(string), optional
+            Keys that are included in the package descriptors
+        limit: int, optional
+            Maximum number of returned packages
+        cursor: string, optional
+            Cursor returned in the 'next' reference of the previous page
+        since: datetime, optional
+            Only list packages that are newer than the given timestamp (UTC)
 
         Returns
         -------
         dict
         """
-        packages = read_index_file(self.index_file)
-        return {
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+        if not since is None:
+            # The change feed is ordered by timestamp and name. The cursor
+            # remains valid when packages change between requests.
+            feed = [
+                snapshot.packages[name]
+                    for name in snapshot.timeline.since(since)
+            ]
+            packages, next_cursor = page(
+                feed,
+                lambda p: [p.timestamp.isoformat(), p.name],
+                snapshot.digest,
+                limit=limit,
+                cursor=cursor,
+                ordered=True
+            )
+        else:
+            packages, next_cursor = page(
+                list(snapshot.packages.values()),
+                lambda p: p.name,
+                snapshot.digest,
+                limit=limit,
+                cursor=cursor
+            )
+        url = self.urls.packages_url()
+        links = [
+            self_reference(
+                page_url(
+                    url,
+                    fields=fields,
+                    limit=limit,
+                    cursor=cursor,
+                    since=since
+                )
+            ),
+            reference(
+                REL_SERVICE,
+                self.urls.service_url()
+            )
+        ]
+        if not next_cursor is None:
+            links.append(
+                reference(
+                    REL_NEXT,
+                    page_url(
+                        url,
+                        fields=fields,
+                        limit=limit,
+                        cursor=next_cursor,
+                        since=since
+                    )
+                )
+            )
+        obj = {
             'packages': [
-                self.serialize_package_descriptor(packages[p])
+                self.serialize_package_descriptor(
+                    p,
+                    fields=fields,
+                    versions=snapshot.versions[p.name].versions()
+                )
                     for p in packages
             ],
-            JSON_REFERENCES : [
-                self_reference(self.urls.packages_url()),
+            JSON_REFERENCES : links
+        }
+        if not since is None:
+            # Packages that have the same timestamp as the first package on
+            # the next page must not be skipped by the next request.
+            following = None
+            if not next_cursor is None:
+                _, position, _ = decode_cursor(next_cursor)
+                following = feed[position].timestamp
+            high_water_mark = since
+            for package in packages:
+                if following is None or package.timestamp < following:
+                    high_water_mark = package.timestamp
+            obj['highWaterMark'] = high_water_mark.isoformat()
+        return obj
+
+    def search_modules(self, query, limit=20, snapshot=None):
+        """Search modules in all packages. Returns the best matching modules
+        for the terms in the given query. Each term matches module names,
+        folders, and descriptions that contain a word starting with the term.
+
+        Raises ValueError if the limit is not a positive number.
+
+        Parameters
+        ----------
+        query: string
+            Search query
+        limit: int, optional
+            Maximum number of returned modules
+        snapshot: prmpckgsrv.index.IndexSnapshot, optional
+            Index snapshot to query. Uses the current snapshot if not given.
+
+        Returns
+        -------
+        dict
+        """
+        if limit < 1:
+            raise ValueError('invalid limit \'' + str(limit) + '\'')
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+        results = list()
+        search = self.index.get_search_index(snapshot)
+        for package_name, (name, folder, description), score in search.search(query, limit=limit):
+            if folder != '':
+                identifier = folder + '.' + name
+            else:
+                identifier = name
+            version = snapshot.packages[package_name].version
+            obj = {
+                'package': package_name,
+                'version': version,
+                'name': name,
+                'folder': folder,
+                'score': score,
+                JSON_REFERENCES: [
+                    self_reference(
+                        self.urls.module_url(
+                            module_query(package_name, version, identifier)
+                        )
+                    )
+                ]
+            }
+            if not description is None:
+                obj['description'] = description
+            results.append(obj)
+        return {
+            'query': query,
+            'modules': results,
+            JSON_REFERENCES: [
+                self_reference(
+                    self.urls.search_url() + '?' + urlencode([
+                        ('q', query),
+                        ('limit', str(limit))
+                    ])
+                ),
                 reference(
                     REL_SERVICE,
                     self.urls.service_url()
@@ -239,13 +703,18 @@ class PrmPackageServer(object):
             ]
         }
 
-    def serialize_package_descriptor(self, package):
-        """Create dictionary serialization for dataset instance.
+    def serialize_package_descriptor(self, package, fields=None, versions=None):
+        """Create dictionary serialization for a package descriptor.
 
         Parameters
         ----------
-        f_handle : database.fileserver.FileHandle
-            Handle for file server resource
+        package: prmpckgsrv.index.PackageDescriptor
+            Package descriptor
+        fields: list(string), optional
+            Keys that are included in the serialization. All keys are included
+            if not given.
+        versions: list(string), optional
+            All available versions of the package
 
         Returns
         -------
@@ -266,103 +735,247 @@ class PrmPackageServer(object):
         }
         if not package.description is None:
             obj['description'] = package.description
+        if not versions is None:
+            obj['versions'] = versions
+        if not fields is None:
+            obj = {key: obj[key] for key in fields if key in obj}
+        return obj
+
+    def package_modules_references(
+        self, package_query, fields=None, limit=None, cursor=None,
+        next_cursor=None
+    ):
+        """Get HATEOAS references for the result of a package query. The self
+        reference contains the pagination and projection parameters of the
+        query. A 'next' reference is included if a cursor for the next page is
+        given.
+
+        Parameters
+        ----------
+        package_query: string
+            Path expression (using '.' as delimiter) referencing a package or a
+            package folder.
+        fields: list(string), optional
+            Projection parameter of the query
+        limit: int, optional
+            Page size of the query
+        cursor: string, optional
+            Cursor of the current page
+        next_cursor: string, optional
+            Cursor of the next page
+
+        Returns
+        -------
+        list(dict)
+        """
+        url = self.urls.module_url(package_query)
+        links = [
+            self_reference(
+                page_url(url, fields=fields, limit=limit, cursor=cursor)
+            ),
+            reference(
+                REL_PACKAGES,
+                self.urls.packages_url()
+            ),
+            reference(
+                REL_SERVICE,
+                self.urls.service_url()
+            )
+        ]
+        if not next_cursor is None:
+            links.append(
+                reference(
+                    REL_NEXT,
+                    page_url(url, fields=fields, limit=limit, cursor=next_cursor)
+                )
+            )
+        return links
+
+    def serialize_module(self, package, module, fields=None):
+        """Create dictionary serialization for a package module.
+
+        Parameters
+        ----------
+        package: prmpckgsrv.index.PackageDescriptor
+            Descriptor of the package that contains the module
+        module: prmpckgsrv.index.ModuleSpecification
+            Module specification
+        fields: list(string), optional
+            Keys that are included in the serialization. All keys are included
+            if not given.
+
+        Returns
+        -------
+        dict
+        """
+        obj = module.to_dict(fields=fields)
+        if fields is None or 'package' in fields:
+            obj['package'] = package.name
+        if fields is None or 'version' in fields:
+            obj['version'] = package.version
+        if fields is None or JSON_REFERENCES in fields:
+            # Module references include the package version
+            obj[JSON_REFERENCES] = [
+                self_reference(
+                    self.urls.module_url(
+                        module_query(
+                            package.name,
+                            package.version,
+                            module.identifier
+                        )
+                    )
+                )
+            ]
         return obj
 
 
 # ------------------------------------------------------------------------------
+#
 # Helper Methods
+#
 # ------------------------------------------------------------------------------
 
-def read_index_file(filename):
-    """Read the package index file. Ensures that the file contains an array of
-    package descriptiors with the following elements: name, and file.
-
-    From each referenced file the (optional) description, timestamps and
-    version information is extracted and added to the package descriptor.
+def decode_cursor(cursor):
+    """Decode a page cursor. Returns the snapshot digest, the position of the
+    first item on the page, and the key of the last item on the previous
+    page. Raises ValueError if the cursor is not valid.
 
-    Returns a dictionary of package descriptors keyed by the package name.
+    Parameters
+    ----------
+    cursor: string
+        Page cursor
 
-    Raises ValueError if the index file is not valid or if it contains duplicate
-    package descriptors.
+    Returns
+    -------
+    string, int, any
+    """
+    try:
+        obj = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        obj = None
+    if not isinstance(obj, list) or len(obj) != 3:
+        raise ValueError('invalid cursor \'' + cursor + '\'')
+    digest, position, key = obj
+    if not isinstance(digest, str) or not isinstance(position, int):
+        raise ValueError('invalid cursor \'' + cursor + '\'')
+    return digest, position, key
+
+
+def encode_cursor(digest, position, key):
+    """Get the opaque page cursor for the page that starts at the given
+    position.
 
     Parameters
     ----------
-    filename: string
-        Path to the Yaml file (expected to be in Yaml format)
+    digest: string
+        Digest of the index snapshot that the page was taken from
+    position: int
+        Position of the first item on the page
+    key: any
+        Json serializable key of the last item on the previous page
 
     Returns
     -------
-    dict(PackageDescriptor)
+    string
     """
-    packages = dict()
-    with open(filename, 'r') as f:
-        try:
-            doc = yaml.load(f.read())
-        except yaml.YAMLError as ex:
-            raise ValueError(str(ex))
-    if not 'packages' in doc:
-        raise ValueError('index file is missing element \'packages\'')
-    for obj in doc['packages']:
-        for key in ['name', 'file']:
-            if not key in obj:
-                raise ValueError('package descriptor is missing element \'' + key + '\'')
-        name = obj['name']
-        if name in packages:
-            raise ValueError('duplicate package descriptor \'' + name + '\'')
-        package_file = os.path.abspath(obj['file'])
-        if not os.path.isfile(package_file):
-            raise ValueError('package file \'' + package_file + '\' does not exist')
-        try:
-            with open(package_file, 'r') as f:
-                pckg = yaml.load(f.read())
-        except yaml.YAMLError as ex:
-            raise ValueError(str(ex))
-        for key in ['timestamp', 'version']:
-            if not key in pckg:
-                raise ValueError('package descriptor is missing element \'' + key + '\'')
-        version = pckg['version']
-        timestamp = dt.datetime.strptime(pckg['timestamp'], '%Y-%m-%dT%H:%M:%S')
-        if 'description' in pckg:
-            description = pckg['description']
-        else:
-            description = None
-        packages[name] = PackageDescriptor(
-            name,
-            package_file,
-            version,
-            timestamp,
-            description=description
-        )
-    return packages
+    obj = json.dumps([digest, position, key]).encode('utf-8')
+    return base64.urlsafe_b64encode(obj).decode('ascii')
+
+
+def page(items, key, digest, limit=None, cursor=None, ordered=False):
+    """Get a page of items from a list. Returns the items of the page and the
+    cursor for the next page. The next cursor is None if there are no more
+    items.
 
+    The cursor is an opaque string that encodes the digest of the index
+    snapshot, the position of the first item of the page, and the key of the
+    last item of the previous page. If the cursor was created for the given
+    snapshot the page starts at the encoded position. Otherwise, the page
+    starts after the item with the encoded key. If the items are ordered by
+    their key, the page starts after the last item whose key is not greater
+    than the encoded key, even if the item with that key no longer exists.
 
-def read_modules(filename, download_prefix):
-    """Get list of module descriptors in a package file.
+    Raises ValueError if the limit is not a positive number, if the cursor is
+    invalid, or if the item that the cursor refers to no longer exists.
 
     Parameters
     ----------
-    filename: string
-        Path to package definoition file
-    download_prefix: string
-        Url prefix for download sources
+    items: list or tuple
+        List of items
+    key: func
+        Function that returns the unique and Json serializable key of an item
+    digest: string
+        Digest of the index snapshot that the items were taken from
+    limit: int, optional
+        Maximum number of items on the page. The page contains all remaining
+        items if not given.
+    cursor: string, optional
+        Cursor returned for the previous page
+    ordered: bool, optional
+        Items are sorted by their key
 
     Returns
     -------
-    list(ModuleSpecification)
+    list, string
     """
-    modules = list()
-    with open(filename, 'r') as f:
-        try:
-            doc = yaml.load(f.read())
-        except yaml.YAMLError as ex:
-            raise ValueError(str(ex))
-    if 'modules' in doc:
-        for obj in doc['modules']:
-            if 'install' in obj:
-                for task in obj['install']['tasks']:
-                    if task['type'] == 'DOWNLOAD':
-                        for prop in task['properties']:
-                            if prop['name'] == 'source':
-                                prop['value'] = download_prefix + '/' + prop['value']
-            modules.append(ModuleSpecification(obj))
-    return modules
+    start = 0
+    if not cursor is None:
+        cursor_digest, start, cursor_key = decode_cursor(cursor)
+        if cursor_digest == digest:
+            if start < 1 or start > len(items) or key(items[start - 1]) != cursor_key:
+                raise ValueError('invalid cursor \'' + cursor + '\'')
+        else:
+            keys = [key(item) for item in items]
+            if ordered:
+                try:
+                    start = bisect.bisect_right(keys, cursor_key)
+                except TypeError:
+                    raise ValueError('invalid cursor \'' + cursor + '\'')
+            elif cursor_key in keys:
+                start = keys.index(cursor_key) + 1
+            else:
+                raise ValueError('expired cursor \'' + cursor + '\'')
+    if limit is None:
+        return items[start:], None
+    if limit < 1:
+        raise ValueError('invalid limit \'' + str(limit) + '\'')
+    end = start + limit
+    if end >= len(items):
+        return items[start:], None
+    return items[start:end], encode_cursor(digest, end, key(items[end - 1]))
+
+
+def page_url(url, fields=None, limit=None, cursor=None, since=None):
+    """Append the pagination, projection, and change feed parameters of a
+    query to the given resource Url.
+
+    Parameters
+    ----------
+    url: string
+        Resource Url
+    fields: list(string), optional
+        Projection parameter
+    limit: int, optional
+        Page size
+    cursor: string, optional
+        Page cursor
+    since: datetime, optional
+        Change feed timestamp
+
+    Returns
+    -------
+    string
+    """
+    args = []
+    if not fields is None:
+        args.append(('fields', ','.join(fields)))
+    if not limit is None:
+        args.append(('limit', str(limit)))
+    if not cursor is None:
+        args.append(('cursor', cursor))
+    if not since is None:
+        args.append(('since', since.isoformat()))
+    if len(args) == 0:
+        return url
+    return url + '?' + urlencode(args)
+
@@ -0,0 +1,288 @@
+"""prm Package Web Service API - Caches
+
+Cache for encoded API responses. Responses only change when the package index
+changes. Cached responses are therefore associated with the index snapshot
+that they were created from. The whole cache is invalidated when a different
+snapshot is used. Responses are kept in a least-recently-used cache whose size
+is bounded by the number of bytes of the encoded responses.
+
+Cache for package modules. Modules are loaded when they are first accessed
+and kept in a least-recently-used cache whose size is bounded by an
+approximate memory budget.
+"""
+
+from collections import OrderedDict
+import hashlib
+import sys
+import threading
+
+
+class ModuleCache(object):
+    """Least-recently-used cache for loaded package modules. The cache size is
+    bounded by the approximate number of bytes that the cached values occupy
+    in memory. The most recently loaded value is always kept, even if it
+    exceeds the budget on its own.
+
+    Attributes
+    ----------
+    max_bytes: int
+        Memory budget in bytes. The cache is unbounded if the value is not
+        greater than zero.
+    size: int
+        Approximate number of bytes that are occupied by cached values
+    hits: int
+        Number of cache hits
+    misses: int
+        Number of cache misses
+    evictions: int
+        Number of evicted values
+    """
+    def __init__(self, max_bytes=0):
+        """Initialize an empty cache.
+
+        Parameters
+        ----------
+        max_bytes: int, optional
+            Memory budget in bytes. The cache is unbounded if the value is not
+            greater than zero.
+        """
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, load):
+        """Get the cached value for the given key. If the value is not cached
+        it is loaded using the given load function. The load function is
+        called without holding the cache lock.
+
+        Parameters
+        ----------
+        key: any
+            Unique key for the value
+        load: func
+            Function that loads the value
+
+        Returns
+        -------
+        any
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry is None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = load()
+        size = estimate_size(value)
+        with self.lock:
+            if not key in self.entries:
+                self.entries[key] = (value, size)
+                self.size += size
+            if self.max_bytes > 0:
+                while self.size > self.max_bytes and len(self.entries) > 1:
+                    _, (_, evicted_size) = self.entries.popitem(last=False)
+                    self.size -= evicted_size
+                    self.evictions += 1
+        return value
+
+    def peek(self, key):
+        """Get the cached value for the given key without loading it. The
+        result is None if the value is not cached. Does not affect the order
+        of eviction or the cache statistics.
+
+        Parameters
+        ----------
+        key: any
+            Unique key for the value
+
+        Returns
+        -------
+        any
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def statistics(self):
+        """Get cache statistics.
+
+        Returns
+        -------
+        dict
+        """
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'size': self.size,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class ResponseCache(object):
+    """Least-recently-used cache for encoded Json responses keyed by the
+    request route and query. The cache size is bounded by the number of bytes
+    of the cached keys and responses. Responses that exceed the budget on
+    their own are not cached.
+
+    The cache is bound to a single index snapshot at a time. Accessing the
+    cache with a different snapshot drops all entries.
+
+    Attributes
+    ----------
+    digest: string
+        Digest of the snapshot that the cached responses were created from
+    max_bytes: int
+        Memory budget in bytes. The cache is unbounded if the value is not
+        greater than zero.
+    size: int
+        Number of bytes that are occupied by cached keys and responses
+    """
+    def __init__(self, max_bytes):
+        """Initialize an empty cache.
+
+        Parameters
+        ----------
+        max_bytes: int
+            Memory budget in bytes. The cache is unbounded if the value is not
+            greater than zero.
+        """
+        self.max_bytes = max_bytes
+        self.digest = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.size = 0
+
+    def etag(self, snapshot, key):
+        """Get strong entity tag for the response with the given key. The tag
+        is derived from the snapshot digest and the key. It can be computed
+        without having the response at hand.
+
+        Parameters
+        ----------
+        snapshot: prmpckgsrv.index.IndexSnapshot
+            Current index snapshot
+        key: string
+            Route and query of the request
+
+        Returns
+        -------
+        string
+        """
+        key_digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return snapshot.digest[:20] + '-' + key_digest[:20]
+
+    def get(self, snapshot, key):
+        """Get the encoded response for the given key. The result is None if
+        no response is cached for the key and snapshot.
+
+        Parameters
+        ----------
+        snapshot: prmpckgsrv.index.IndexSnapshot
+            Current index snapshot
+        key: string
+            Route and query of the request
+
+        Returns
+        -------
+        bytes
+        """
+        with self.lock:
+            self.validate(snapshot)
+            body = self.entries.get(key)
+            if not body is None:
+                self.entries.move_to_end(key)
+            return body
+
+    def put(self, snapshot, key, body):
+        """Add encoded response to the cache. Least recently used responses
+        are evicted until the cache is within its memory budget.
+
+        Parameters
+        ----------
+        snapshot: prmpckgsrv.index.IndexSnapshot
+            Index snapshot that the response was created from
+        key: string
+            Route and query of the request
+        body: bytes
+            Encoded response
+        """
+        size = len(key) + len(body)
+        if self.max_bytes > 0 and size > self.max_bytes:
+            return
+        with self.lock:
+            self.validate(snapshot)
+            previous = self.entries.pop(key, None)
+            if not previous is None:
+                self.size -= len(key) + len(previous)
+            self.entries[key] = body
+            self.size += size
+            if self.max_bytes > 0:
+                while self.size > self.max_bytes:
+                    evicted_key, evicted = self.entries.popitem(last=False)
+                    self.size -= len(evicted_key) + len(evicted)
+
+    def validate(self, snapshot):
+        """Drop all cached responses if the given snapshot differs from the
+        snapshot that they were created from. The caller is expected to hold
+        the cache lock.
+
+        Parameters
+        ----------
+        snapshot: prmpckgsrv.index.IndexSnapshot
+            Current index snapshot
+        """
+        if self.digest != snapshot.digest:
+            self.digest = snapshot.digest
+            self.entries = OrderedDict()
+            self.size = 0
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def estimate_size(obj):
+    """Estimate the number of bytes that an object occupies in memory
+    including all objects that are reachable from it. Objects that are reached
+    more than once are only counted once. Classes are not counted.
+
+    Parameters
+    ----------
+    obj: any
+        Object whose size is estimated
+
+    Returns
+    -------
+    int
+    """
+    size = 0
+    seen = set()
+    objects = [obj]
+    while len(objects) > 0:
+        obj = objects.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            objects.extend(obj.keys())
+            objects.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            objects.extend(obj)
+        else:
+            if hasattr(obj, '__dict__'):
+                objects.append(obj.__dict__)
+            for slot in getattr(type(obj), '__slots__', ()):
+                if hasattr(obj, slot):
+                    objects.append(getattr(obj, slot))
+    return size
@@ -0,0 +1,318 @@
+"""prm Package Web Service API - Compiled package index
+
+Binary format for a compiled snapshot of the package index. The compiled file
+contains the package metadata and the module lists of all packages in the
+index. It is memory-mapped when loaded, which avoids parsing the index file and
+every package file in Yaml format.
+
+The file starts with a fixed-size header that contains a magic number, the
+format version, and the position of the table of contents. Module lists are
+stored as Json-encoded blocks, one block per package. The table of contents is
+a Json object at the end of the file with the following elements:
+
+- index: Absolute path of the index file that was compiled
+- packages: List of package entries with elements name, file, version,
+  timestamp, description, offset and length. Offset and length reference the
+  block of encoded modules for the package.
+
+Index generations that are published by the Web server for sharing between
+worker processes use a second format version. Modules are stored as records
+that contain the Json encoding of the module elements and of the serialized
+module. For each package, offset and length reference a Json table of
+[folder, name, record offset] triples. The table of contents contains an
+additional element fingerprint that identifies the serialization of modules.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+
+"""Magic number and format version of compiled index files."""
+MAGIC = b'PRMINDEX'
+FORMAT_VERSION = 1
+
+"""Format version of index generations that are published by the Web server."""
+GENERATION_VERSION = 2
+
+"""File header containing magic number, format version, and the offset and
+length of the table of contents."""
+HEADER = struct.Struct('<8sIQQ')
+
+"""Header of a module record in an index generation containing the lengths of
+the encoded module elements and of the encoded serialized module."""
+RECORD = struct.Struct('<II')
+
+
+class CompiledIndex(object):
+    """Memory-mapped compiled index file.
+
+    Attributes
+    ----------
+    buffer: mmap.mmap
+        Memory-mapped file content
+    filename: string
+        Path to the compiled index file
+    fingerprint: string
+        Identifier for the serialization of modules in an index generation.
+        None for compiled index files.
+    index_file: string
+        Absolute path to the index file that was compiled
+    packages: list(dict)
+        Package entries in the order of the index file
+    version: int
+        Format version of the file
+    """
+    def __init__(self, filename):
+        """Open and memory-map the compiled index file. Raises ValueError if
+        the file is not a compiled index file or an index generation, or if it
+        has been written using a different format version.
+
+        Parameters
+        ----------
+        filename: string
+            Path to the compiled index file
+        """
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.buffer) < HEADER.size:
+            self.close()
+            raise ValueError('invalid compiled index file \'' + filename + '\'')
+        magic, version, offset, length = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or not version in [FORMAT_VERSION, GENERATION_VERSION]:
+            self.close()
+            raise ValueError('invalid compiled index file \'' + filename + '\'')
+        toc = json.loads(self.buffer[offset:offset + length].decode('utf-8'))
+        self.version = version
+        self.index_file = toc['index']
+        self.packages = toc['packages']
+        self.fingerprint = toc.get('fingerprint')
+
+    def close(self):
+        """Release the memory-mapped file."""
+        self.buffer.close()
+
+    def modules(self, package):
+        """Decode the list of modules for a package entry. Returns the module
+        dictionaries as they were read from the package file.
+
+        Parameters
+        ----------
+        package: dict
+            Package entry from the table of contents
+
+        Returns
+        -------
+        list(dict)
+        """
+        offset = package['offset']
+        block = self.buffer[offset:offset + package['length']]
+        return json.loads(block.decode('utf-8'))
+
+    def records(self, package):
+        """Decode the table of module records for a package entry in an index
+        generation. Returns a list of [folder, name, record offset] triples
+        in package file order.
+
+        Parameters
+        ----------
+        package: dict
+            Package entry from the table of contents
+
+        Returns
+        -------
+        list(list)
+        """
+        return self.modules(package)
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def compiled_filename(index_file):
+    """Get the default path of the compiled file for an index file.
+
+    Parameters
+    ----------
+    index_file: string
+        Path to the index file
+
+    Returns
+    -------
+    string
+    """
+    return index_file + '.bin'
+
+
+def is_compiled_current(filename, index_file, package_files):
+    """Test whether a compiled index file is at least as new as the index file
+    and all the package files it was compiled from.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the compiled index file
+    index_file: string
+        Path to the index file
+    package_files: list(string)
+        Paths to the package files
+
+    Returns
+    -------
+    bool
+    """
+    try:
+        mtime = os.stat(filename).st_mtime_ns
+        for source in [index_file] + list(package_files):
+            if os.stat(source).st_mtime_ns > mtime:
+                return False
+    except OSError:
+        return False
+    return True
+
+
+def write_compiled_index(filename, index_file, packages):
+    """Write a compiled index file. The file is written to a temporary file
+    first that then replaces the target file. Readers will therefore never see
+    a partially written file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the compiled index file
+    index_file: string
+        Absolute path to the index file that was compiled
+    packages: list((dict, list(dict)))
+        List of package entries and their modules. Package entries contain
+        the elements name, file, version, timestamp, and description.
+    """
+    write_index_file(
+        filename,
+        FORMAT_VERSION,
+        {'index': index_file},
+        packages,
+        write_module_list
+    )
+
+
+def write_generation(filename, index_file, packages, fingerprint):
+    """Write an index generation. The generation replaces the target file
+    atomically. Processes that have mapped the replaced file continue to read
+    the previous generation.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the index generation file
+    index_file: string
+        Absolute path to the index file that the generation was read from
+    packages: list((dict, list(prmpckgsrv.index.ModuleSpecification)))
+        List of package entries and their modules. Package entries contain
+        the elements name, file, version, timestamp, and description.
+    fingerprint: string
+        Identifier for the serialization of modules
+    """
+    write_index_file(
+        filename,
+        GENERATION_VERSION,
+        {'index': index_file, 'fingerprint': fingerprint},
+        packages,
+        write_module_records
+    )
+
+
+def write_index_file(filename, version, toc, packages, write_modules):
+    """Write a compiled index file or index generation. The file is written
+    to a temporary file first that then replaces the target file. Readers will
+    therefore never see a partially written file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the target file
+    version: int
+        Format version
+    toc: dict
+        Elements of the table of contents other than the package entries
+    packages: list((dict, list))
+        List of package entries and their modules
+    write_modules: func
+        Function that writes the modules of a package to a file object and
+        returns the offset and length of the block that the package entry
+        references
+    """
+    target_dir = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_file = tempfile.mkstemp(dir=target_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, version, 0, 0))
+            entries = list()
+            for package, modules in packages:
+                entry = dict(package)
+                entry['offset'], entry['length'] = write_modules(f, modules)
+                entries.append(entry)
+            toc = dict(toc)
+            toc['packages'] = entries
+            toc = json.dumps(toc).encode('utf-8')
+            offset = f.tell()
+            f.write(toc)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, version, offset, len(toc)))
+        # Temporary files are only readable by the owner. The compiled file
+        # needs to be readable by the Web server.
+        os.chmod(tmp_file, 0o644)
+        os.replace(tmp_file, filename)
+    except:
+        os.remove(tmp_file)
+        raise
+
+
+def write_module_list(f, modules):
+    """Write the Json encoding of a list of module dictionaries.
+
+    Parameters
+    ----------
+    f: file object
+        Output file
+    modules: list(dict)
+        Module dictionaries as read from the package file
+
+    Returns
+    -------
+    int, int
+    """
+    block = json.dumps(modules).encode('utf-8')
+    offset = f.tell()
+    f.write(block)
+    return offset, len(block)
+
+
+def write_module_records(f, modules):
+    """Write one record for each module followed by the table of records.
+
+    Parameters
+    ----------
+    f: file object
+        Output file
+    modules: list(prmpckgsrv.index.ModuleSpecification)
+        Module specifications in package file order
+
+    Returns
+    -------
+    int, int
+        Offset and length of the table of records
+    """
+    table = list()
+    for module in modules:
+        fragment = module.fragment
+        if fragment is None:
+            fragment = b''
+        table.append([module.folder, module.name, f.tell()])
+        f.write(RECORD.pack(len(module.properties), len(fragment)))
+        f.write(module.properties)
+        f.write(fragment)
+    return write_module_list(f, table)
@@ -0,0 +1,106 @@
+"""prm Package Web Service API - Index compiler
+
+Command-line tool that compiles the package index file and all package files
+that it references into a single compiled index file. The Web server loads the
+compiled file instead of the Yaml files as long as the compiled file is at
+least as new as all of its sources.
+
+Relative package file paths in the index file are resolved against the current
+working directory. The compiler should therefore be run from the same directory
+as the Web server.
+
+Usage: prm-pckgsrv-compile [-o OUTPUT] INDEX_FILE
+"""
+
+import argparse
+import os
+import sys
+
+from prmpckgsrv.compiled import compiled_filename, write_compiled_index
+from prmpckgsrv.index import package_descriptor, read_index_entries
+from prmpckgsrv.index import read_yaml_file
+
+
+def compile_index(index_file, output_file):
+    """Compile the given index file. Raises ValueError if the index file or
+    any of the package files is not valid.
+
+    The modification time of the compiled file is set to the most recent
+    modification time of its sources as observed before reading them. A source
+    that is modified while the index is being compiled is therefore newer than
+    the compiled file.
+
+    Parameters
+    ----------
+    index_file: string
+        Path to the package index file
+    output_file: string
+        Path to the compiled index file
+
+    Returns
+    -------
+    int
+        Number of compiled packages
+    """
+    index_file = os.path.abspath(index_file)
+    mtime = os.stat(index_file).st_mtime_ns
+    packages = list()
+    for name, package_file in read_index_entries(index_file):
+        mtime = max(mtime, os.stat(package_file).st_mtime_ns)
+        doc = read_yaml_file(package_file)
+        # Validate the package information before compiling it
+        package = package_descriptor(name, package_file, doc)
+        entry = {
+            'name': name,
+            'file': package_file,
+            'version': package.version,
+            'timestamp': doc['timestamp']
+        }
+        if 'description' in doc:
+            entry['description'] = doc['description']
+        if 'modules' in doc:
+            modules = doc['modules']
+        else:
+            modules = list()
+        packages.append((entry, modules))
+    write_compiled_index(output_file, index_file, packages)
+    os.utime(output_file, ns=(mtime, mtime))
+    return len(packages)
+
+
+def main(args=None):
+    """Run the index compiler from the command line.
+
+    Parameters
+    ----------
+    args: list(string), optional
+        Command line arguments. Uses sys.argv if not given.
+
+    Returns
+    -------
+    int
+        Exit status
+    """
+    parser = argparse.ArgumentParser(
+        description='Compile a prm package index into a binary index file.'
+    )
+    parser.add_argument('index', help='package index file')
+    parser.add_argument(
+        '-o', '--output',
+        help='compiled index file (default: INDEX.bin)'
+    )
+    args = parser.parse_args(args)
+    output_file = args.output
+    if output_file is None:
+        output_file = compiled_filename(os.path.abspath(args.index))
+    try:
+        count = compile_index(args.index, output_file)
+    except (OSError, ValueError) as ex:
+        sys.stderr.write('error: ' + str(ex) + '\n')
+        return 1
+    print('compiled ' + str(count) + ' package(s) into ' + output_file)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,24 +14,58 @@ API_DOC = 'api.doc'
 APP_NAME = 'app.name'
 APP_DEBUG = 'app.debug'
 
+DOWNLOAD_DIRECTORY = 'download.directory'
 DOWNLOAD_URLPREFIX = 'download.urlprefix'
 
+PACKAGE_CACHE_MAXBYTES = 'package.cache.maxbytes'
+PACKAGE_COMPILEDFILE = 'package.compiled'
 PACKAGE_INDEXFILE = 'package.index'
+PACKAGE_LOAD_PROCESSES = 'package.load.processes'
+PACKAGE_LOAD_WORKERS = 'package.load.workers'
+PACKAGE_SHARED = 'package.shared'
+PACKAGE_WATCH_INTERVAL = 'package.watch.interval'
 
 SERVER_APP_PATH = 'server.apppath'
+SERVER_BATCH_MAXQUERIES = 'server.batch.maxqueries'
+SERVER_CACHE_MAXAGE = 'server.cache.maxage'
+SERVER_CACHE_MAXBYTES = 'server.cache.maxbytes'
+SERVER_METRICS = 'server.metrics'
 SERVER_URL = 'server.url'
 SERVER_PORT = 'server.port'
+SERVER_PROFILE_HEADER = 'server.profile.header'
+SERVER_PROFILE_MAXFILES = 'server.profile.maxfiles'
+SERVER_PROFILE_MODE = 'server.profile.mode'
+SERVER_PROFILE_RATE = 'server.profile.rate'
+SERVER_PROFILE_SECRET = 'server.profile.secret'
+SERVER_PROFILE_TOP = 'server.profile.top'
+SERVER_SEARCH_LIMIT = 'server.search.limit'
+SERVER_STREAM_THRESHOLD = 'server.stream.threshold'
 SERVER_LOG_DIR = 'server.logdir'
 
 
 """Default Web Service configuration."""
 DEFAULT_CONFIG = {
     SERVER_APP_PATH : '/package-server/api/v1',
+    SERVER_BATCH_MAXQUERIES : 100,
+    SERVER_CACHE_MAXAGE : 60,
+    SERVER_CACHE_MAXBYTES : 64 * 1024 * 1024,
+    SERVER_METRICS : True,
     SERVER_URL : 'http://localhost',
     SERVER_PORT : 5000,
+    SERVER_PROFILE_MAXFILES : 100,
+    SERVER_PROFILE_MODE : 'dump',
+    SERVER_PROFILE_RATE : 0,
+    SERVER_PROFILE_TOP : 10,
+    SERVER_SEARCH_LIMIT : 20,
+    SERVER_STREAM_THRESHOLD : 1000,
     API_DOC : 'http://cds-dc.cims.nyu.edu/prm/package-server/',
     APP_NAME : 'prm - Project Repository Manager',
     APP_DEBUG : True,
     DOWNLOAD_URLPREFIX: 'http://cds-dc.cims.nyu.edu/prm/packages',
-    PACKAGE_INDEXFILE: './.packages/index.yaml'
+    PACKAGE_CACHE_MAXBYTES: 0,
+    PACKAGE_INDEXFILE: './.packages/index.yaml',
+    PACKAGE_LOAD_PROCESSES: False,
+    PACKAGE_LOAD_WORKERS: 1,
+    PACKAGE_SHARED: False,
+    PACKAGE_WATCH_INTERVAL: 0
 }
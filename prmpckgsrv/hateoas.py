@@ -55,6 +55,24 @@ class UrlFactory:
         """
         return self.service_url() + '/packages'
 
+    def batch_url(self):
+        """Url to resolve a list of package queries in a single request.
+
+        Returns
+        -------
+        string
+        """
+        return self.packages_url() + ':batch'
+
+    def downloads_url(self):
+        """Url prefix for module artifacts that are served by the Web server.
+
+        Returns
+        -------
+        string
+        """
+        return self.service_url() + '/downloads'
+
     def module_url(self, module_id):
         """Url to retrieve module descriptor.
 
@@ -64,6 +82,15 @@ class UrlFactory:
         """
         return self.packages_url() + '/' + module_id
 
+    def search_url(self):
+        """Url to search modules.
+
+        Returns
+        -------
+        string
+        """
+        return self.service_url() + '/search'
+
     def service_url(self):
         """Base Url for the Web API server.
 
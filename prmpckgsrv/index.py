@@ -0,0 +1,1873 @@
+"""prm Package Web Service API - Package index
+
+Reads the package index file and the package definition files that are
+referenced by the index. The parsed index is kept in memory as an immutable
+snapshot. The snapshot is only re-read if the stat signature of the index file
+or of one of the package files changes.
+
+If a compiled index file exists that is at least as new as the index file and
+all package files, the snapshot is loaded from the compiled file instead of
+parsing the Yaml files. Worker processes of the Web server may share the
+encoded modules of the index by publishing it as an index generation in the
+compiled file (see prmpckgsrv.shared). Module tries remain private to each
+process.
+
+The package index may be split into several index files (shards), e.g., one
+per team that maintains packages. Each shard is read, validated, and cached
+independently. Shards are merged into a single namespace of package names. A
+shard that is not valid is rejected without affecting the other shards.
+
+Package metadata is read when the snapshot is loaded. Only the header of each
+package file is parsed at that time. The modules of a package are only read
+when they are first accessed. Loaded modules are kept in a least-recently-used
+cache that is shared by all snapshots of an index.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import yaml
+
+from prmpckgsrv.cache import ModuleCache
+from prmpckgsrv.compiled import GENERATION_VERSION, RECORD
+from prmpckgsrv.compiled import CompiledIndex, is_compiled_current
+from prmpckgsrv.metrics import observe_reload
+from prmpckgsrv.search import SearchIndex
+from prmpckgsrv.shared import GenerationLock, publish_generation
+from prmpckgsrv.timeline import TimestampIndex
+from prmpckgsrv.trie import ModuleTrie
+from prmpckgsrv.versions import VERSION_SEPARATOR
+from prmpckgsrv.versions import PackageVersions, version_key
+from prmpckgsrv.watcher import IndexWatcher
+from prmpckgsrv.yamlutil import load_yaml, load_yaml_header
+
+
+"""Maximum number of index shards that are read concurrently."""
+SHARD_WORKERS = 8
+
+"""Suffixes of index shard files in index directories."""
+SHARD_SUFFIXES = ('.yaml', '.yml')
+
+"""Elements of the package file that are read when the index is loaded."""
+PACKAGE_HEADER = ['version', 'timestamp', 'description']
+
+
+class PackageLoadError(Exception):
+    """Error for package modules that cannot be read when they are first
+    accessed. Only the header of a package file is validated when the index is
+    loaded. Errors in the modules of the package are therefore not detected
+    before the modules are read.
+
+    Attributes
+    ----------
+    name: string
+        Name of the package
+    """
+    def __init__(self, name, message):
+        """Initialize the package name and the error message.
+
+        Parameters
+        ----------
+        name: string
+            Name of the package
+        message: string
+            Error message. May contain the path of the package file.
+        """
+        Exception.__init__(self, message)
+        self.name = name
+
+
+class ModuleSpecification(object):
+    """Specification of a package module. Expects a dictionary containing the
+    module specification.
+
+    Module specifications are immutable. The folder and name strings are
+    interned so that folder paths that are shared by many modules are only
+    stored once. All other elements of the specification are kept in a
+    compact Json encoding that is only expanded when the module is
+    serialized.
+
+    If a serializer is given, the Json encoding of the serialized module is
+    created once when the module is initialized. The encoded fragment is used
+    to assemble responses without encoding the module again.
+
+    Modules of different versions of a package are often identical. The Json
+    encoding of the module elements is shared with the modules of other
+    versions that are in memory if a dictionary of shared encodings is given.
+
+    Attributes
+    ----------
+    folder: string
+        Module folder path
+    fragment: bytes
+        Json encoding of the serialized module. None if no serializer was
+        given.
+    identifier: string
+        Full module path containing the module folder and name
+    name: string
+        Module name
+    """
+    __slots__ = ['folder', 'fragment', 'name', 'properties']
+
+    def __init__(self, obj, serialize=None, shared=None):
+        """Initialize from dict.
+
+        Parameters
+        ----------
+        obj: dict
+        serialize: func, optional
+            Function that returns the dictionary serialization of the module
+            for API responses
+        shared: dict(bytes), optional
+            Json encodings of module elements that are shared with other
+            modules. Equal encodings are replaced by the shared object.
+        """
+        properties = dict(obj)
+        object.__setattr__(self, 'folder', sys.intern(properties.pop('folder')))
+        object.__setattr__(self, 'name', sys.intern(properties.pop('name')))
+        properties = json.dumps(properties, default=str).encode('utf-8')
+        if not shared is None:
+            properties = shared.setdefault(properties, properties)
+        object.__setattr__(self, 'properties', properties)
+        fragment = None
+        if not serialize is None:
+            fragment = json.dumps(serialize(self), default=str).encode('utf-8')
+        object.__setattr__(self, 'fragment', fragment)
+
+    def __reduce__(self):
+        """Pickle support for the immutable object."""
+        return (ModuleSpecification, (self.to_dict(),))
+
+    def __setattr__(self, name, value):
+        """Module specifications are immutable."""
+        raise AttributeError('module specification is immutable')
+
+    @property
+    def identifier(self):
+        """Full module path containing the module folder and name.
+
+        Returns
+        -------
+        string
+        """
+        if self.folder == '':
+            return self.name
+        else:
+            return self.folder + '.' + self.name
+
+    def matches(self, query):
+        path = self.identifier.split('.')
+        if len(path) >= len(query):
+            for i in range(len(query)):
+                if path[i] != query[i]:
+                    return False
+            return True
+        return False
+
+    def to_dict(self, fields=None):
+        """Get dictionary serialization of the module specification. Returns
+        a new dictionary on each call. The optional list of fields restricts
+        the result to the given keys. The module properties are only decoded
+        if any of the fields is not the module name or folder.
+
+        Parameters
+        ----------
+        fields: list(string), optional
+            Keys that are included in the result. All keys are included if
+            not given.
+
+        Returns
+        -------
+        dict
+        """
+        obj = {'name': self.name, 'folder': self.folder}
+        if fields is None:
+            obj.update(json.loads(self.properties.decode('utf-8')))
+            return obj
+        if len(set(fields) - set(obj.keys())) > 0:
+            obj.update(json.loads(self.properties.decode('utf-8')))
+        return {key: obj[key] for key in fields if key in obj}
+
+
+class MappedModuleSpecification(ModuleSpecification):
+    """Specification of a package module in a memory-mapped index generation.
+    Only the module folder and name are held in memory. The Json encodings of
+    the module elements and of the serialized module are read from the module
+    record in the shared memory map when they are accessed.
+
+    Attributes
+    ----------
+    buffer: mmap.mmap
+        Memory-mapped index generation
+    offset: int
+        Position of the module record in the index generation
+    """
+    __slots__ = ['buffer', 'offset']
+
+    def __init__(self, folder, name, buffer, offset):
+        """Initialize the module from its record.
+
+        Parameters
+        ----------
+        folder: string
+            Module folder path
+        name: string
+            Module name
+        buffer: mmap.mmap
+            Memory-mapped index generation
+        offset: int
+            Position of the module record in the index generation
+        """
+        object.__setattr__(self, 'folder', sys.intern(folder))
+        object.__setattr__(self, 'name', sys.intern(name))
+        object.__setattr__(self, 'buffer', buffer)
+        object.__setattr__(self, 'offset', offset)
+
+    @property
+    def fragment(self):
+        """Json encoding of the serialized module. None if the generation was
+        written without a serializer.
+
+        Returns
+        -------
+        bytes
+        """
+        properties_length, fragment_length = RECORD.unpack_from(
+            self.buffer,
+            self.offset
+        )
+        if fragment_length == 0:
+            return None
+        start = self.offset + RECORD.size + properties_length
+        return self.buffer[start:start + fragment_length]
+
+    @property
+    def properties(self):
+        """Json encoding of the module elements other than folder and name.
+
+        Returns
+        -------
+        bytes
+        """
+        properties_length, _ = RECORD.unpack_from(self.buffer, self.offset)
+        start = self.offset + RECORD.size
+        return self.buffer[start:start + properties_length]
+
+
+class PackageDescriptor(object):
+    """Descriptor for a package that is available on the server. Package
+    descriptors are immutable.
+
+    Attributes
+    ----------
+    name: string
+        Unique package name
+    description: string, optional
+        Optional package description
+    version: string
+        Package version information
+    timestamp: datetime
+        Timestamp of package creation
+    file: string
+        Path to package file
+    """
+    __slots__ = ['name', 'file', 'version', 'timestamp', 'description']
+
+    def __init__(self, name, file, version, timestamp, description=None):
+        """Initialize package descriptor.
+
+        Parameters
+        ----------
+        name: string
+            Unique package name
+        file: string
+            Path to package file
+        version: string
+            Package version information
+        timestamp: datetime
+            Timestamp of package creation
+        description: string, optional
+            Optional package description
+        """
+        object.__setattr__(self, 'name', sys.intern(name))
+        object.__setattr__(self, 'file', file)
+        object.__setattr__(self, 'timestamp', timestamp)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'description', description)
+
+    def __reduce__(self):
+        """Pickle support for the immutable object."""
+        return (
+            PackageDescriptor,
+            (self.name, self.file, self.version, self.timestamp, self.description)
+        )
+
+    def __setattr__(self, name, value):
+        """Package descriptors are immutable."""
+        raise AttributeError('package descriptor is immutable')
+
+
+class ModuleSource(object):
+    """Source for the modules of a package. Modules are either read from the
+    package file or decoded from a compiled index file.
+
+    Attributes
+    ----------
+    key: tuple
+        Cache key for the loaded modules. The key contains the package file
+        path and its stat signature, and the package name and version. The
+        name and version are part of the encoded module fragments.
+    package: PackageDescriptor
+        Descriptor of the package that the modules belong to
+    """
+    def __init__(self, package, signature, download_prefix, serializer=None, compiled=None, entry=None):
+        """Initialize the module source.
+
+        Parameters
+        ----------
+        package: PackageDescriptor
+            Descriptor of the package that the modules belong to
+        signature: tuple
+            Stat signature of the package file
+        download_prefix: string
+            Url prefix for download sources
+        serializer: func, optional
+            Function that returns the dictionary serialization of a module for
+            API responses. The function is called with the package descriptor
+            and the module specification as arguments.
+        compiled: prmpckgsrv.compiled.CompiledIndex, optional
+            Compiled index file that contains the package modules
+        entry: dict, optional
+            Package entry in the compiled index file
+        """
+        self.package = package
+        self.download_prefix = download_prefix
+        self.serializer = serializer
+        self.compiled = compiled
+        self.entry = entry
+        self.key = (package.file, signature, package.name, package.version)
+
+    def entries(self):
+        """Read the (name, folder, description) triples of the package modules
+        in package file order. Module specifications are not created and the
+        modules are not serialized. Raises ValueError if the package file is
+        not valid.
+
+        Returns
+        -------
+        list(tuple)
+        """
+        if not self.compiled is None and self.compiled.version == GENERATION_VERSION:
+            return [
+                module_entry(
+                    MappedModuleSpecification(
+                        folder,
+                        name,
+                        self.compiled.buffer,
+                        offset
+                    )
+                )
+                    for folder, name, offset in self.compiled.records(self.entry)
+            ]
+        if self.compiled is None:
+            modules = read_yaml_file(self.package.file).get('modules', list())
+        else:
+            modules = self.compiled.modules(self.entry)
+        return [
+            (obj['name'], obj['folder'], obj.get('description'))
+                for obj in modules
+        ]
+
+    def load(self, shared=None):
+        """Read the package modules and index them in a module trie. Raises
+        ValueError if the package file is not valid.
+
+        Parameters
+        ----------
+        shared: dict(bytes), optional
+            Json encodings of module elements that are shared with modules of
+            other versions of the package
+
+        Returns
+        -------
+        prmpckgsrv.trie.ModuleTrie
+        """
+        if not self.compiled is None and self.compiled.version == GENERATION_VERSION:
+            # Modules in an index generation remain in the shared memory map
+            return ModuleTrie([
+                MappedModuleSpecification(folder, name, self.compiled.buffer, offset)
+                    for folder, name, offset in self.compiled.records(self.entry)
+            ])
+        if self.compiled is None:
+            doc = read_yaml_file(self.package.file)
+        else:
+            doc = {'modules': self.compiled.modules(self.entry)}
+        serialize = None
+        if not self.serializer is None:
+            serialize = lambda module: self.serializer(self.package, module)
+        return ModuleTrie(
+            module_specifications(
+                doc,
+                self.download_prefix,
+                serialize=serialize,
+                shared=shared
+            )
+        )
+
+
+class IndexSnapshot(object):
+    """Immutable snapshot of the package index. Contains the descriptors for
+    all packages in the index together with the sources for the module
+    specifications of each package. Modules are loaded on first access and
+    indexed in a trie on their identifiers.
+
+    The index may contain several versions of a package. The package
+    descriptors and module sources that are keyed by the package name refer to
+    the most recent version. All versions are kept in a sorted list per
+    package.
+
+    The snapshot keeps the stat signatures of the index file and of all package
+    files at the time they were read. The snapshot is current as long as none
+    of these signatures has changed. Snapshots are shared between requests and
+    must not be modified.
+
+    Attributes
+    ----------
+    cache: prmpckgsrv.cache.ModuleCache
+        Cache for loaded package modules
+    conflicts: list(string)
+        Messages for packages that were ignored because a package with the
+        same name is defined by a preceding index shard
+    digest: string
+        Hash of the file signatures that uniquely identifies the snapshot
+    errors: dict(string)
+        Error messages for rejected index shards keyed by the shard index file
+    files: dict(ModuleSource)
+        Module sources for all package versions keyed by the package file
+    packages: dict(PackageDescriptor)
+        Descriptor of the most recent version of each package keyed by the
+        package name
+    sources: dict(ModuleSource)
+        Module source for the most recent version of each package keyed by
+        the package name
+    signatures: dict(tuple)
+        Stat signatures keyed by the absolute path of the index and package
+        files
+    timeline: prmpckgsrv.timeline.TimestampIndex
+        Package names sorted by the package timestamps
+    versions: dict(prmpckgsrv.versions.PackageVersions)
+        Sorted list of versions for each package keyed by the package name
+    """
+    def __init__(self, packages, sources, signatures, cache=None, previous=None, versions=None, conflicts=None, errors=None):
+        """Initialize the snapshot components.
+
+        Parameters
+        ----------
+        packages: dict(PackageDescriptor)
+            Package descriptors keyed by the package name
+        sources: dict(ModuleSource)
+            Module source for each package keyed by the package name
+        signatures: dict(tuple)
+            Stat signatures keyed by the absolute path of the index and package
+            files
+        cache: prmpckgsrv.cache.ModuleCache, optional
+            Cache for loaded package modules. An unbounded cache is used if
+            not given.
+        previous: prmpckgsrv.index.IndexSnapshot, optional
+            Previous snapshot of the index. The timeline of the previous
+            snapshot is updated for changed packages instead of being rebuilt.
+        versions: dict(prmpckgsrv.versions.PackageVersions), optional
+            Sorted list of versions for each package keyed by the package
+            name. If not given, the given sources are the only versions.
+        conflicts: list(string), optional
+            Messages for packages that were ignored when merging index shards
+        errors: dict(string), optional
+            Error messages for rejected index shards
+        """
+        self.packages = packages
+        self.sources = sources
+        self.signatures = signatures
+        if versions is None:
+            versions = {
+                name: PackageVersions([source])
+                    for name, source in sources.items()
+            }
+        self.versions = versions
+        if conflicts is None:
+            conflicts = list()
+        self.conflicts = conflicts
+        if errors is None:
+            errors = dict()
+        self.errors = errors
+        self.files = dict()
+        for package_versions in versions.values():
+            for source in package_versions.sources:
+                self.files[source.package.file] = source
+        if cache is None:
+            cache = ModuleCache()
+        self.cache = cache
+        self.digest = hashlib.sha1(
+            repr(sorted(signatures.items())).encode('utf-8')
+        ).hexdigest()
+        if not previous is None:
+            self.timeline = TimestampIndex(packages, previous=previous.timeline)
+        else:
+            self.timeline = TimestampIndex(packages)
+
+    def get_modules(self, name, version=None):
+        """Get the module trie for a package version. Modules are loaded if
+        they are not in the module cache. The result is None if the package
+        or version does not exist. Raises PackageLoadError if the modules
+        cannot be read.
+
+        Modules that are loaded share the encoding of their elements with
+        equal modules of other versions of the package that are in the cache.
+
+        Parameters
+        ----------
+        name: string
+            Unique package name
+        version: string, optional
+            Package version. Refers to the most recent version if not given.
+
+        Returns
+        -------
+        prmpckgsrv.trie.ModuleTrie
+        """
+        source = self.resolve(name, version=version)
+        if source is None:
+            return None
+        def load():
+            try:
+                return source.load(shared=self.shared_modules(name, source))
+            except (OSError, ValueError) as ex:
+                raise PackageLoadError(name, str(ex))
+        return self.cache.get(source.key, load)
+
+    def get_module_entries(self, name):
+        """Get the (name, folder, description) triples of the modules of the
+        most recent version of a package in package file order. The triples
+        are taken from the module cache if the modules are loaded. Otherwise,
+        they are read from the module source without adding the modules to
+        the cache. The result is None if the package does not exist. Raises
+        PackageLoadError if the modules cannot be read.
+
+        Parameters
+        ----------
+        name: string
+            Unique package name
+
+        Returns
+        -------
+        list(tuple)
+        """
+        source = self.sources.get(name)
+        if source is None:
+            return None
+        modules = self.cache.peek(source.key)
+        if not modules is None:
+            return [module_entry(module) for module in modules.find([])]
+        try:
+            return source.entries()
+        except (OSError, ValueError) as ex:
+            raise PackageLoadError(name, str(ex))
+
+    def resolve(self, name, version=None):
+        """Get the module source for a package version. The version is
+        resolved to the most recent version that equals the given version or
+        that extends it by further components. The result is None if the
+        package or version does not exist.
+
+        Parameters
+        ----------
+        name: string
+            Unique package name
+        version: string, optional
+            Package version. Refers to the most recent version if not given.
+
+        Returns
+        -------
+        prmpckgsrv.index.ModuleSource
+        """
+        if version is None:
+            return self.sources.get(name)
+        versions = self.versions.get(name)
+        if versions is None:
+            return None
+        return versions.resolve(version)
+
+    def shared_modules(self, name, source):
+        """Get the Json encodings of the module elements of all other versions
+        of a package whose modules are in the cache. The result is None if
+        there is only one version of the package.
+
+        Parameters
+        ----------
+        name: string
+            Unique package name
+        source: prmpckgsrv.index.ModuleSource
+            Module source of the version that is loaded
+
+        Returns
+        -------
+        dict(bytes)
+        """
+        versions = self.versions.get(name)
+        if versions is None or len(versions) < 2:
+            return None
+        shared = dict()
+        for other in versions.sources:
+            if other is source:
+                continue
+            modules = self.cache.peek(other.key)
+            if not modules is None:
+                for module in modules.find([]):
+                    shared[module.properties] = module.properties
+        return shared
+
+    def is_current(self):
+        """Test whether none of the files that the snapshot was read from has
+        changed since.
+
+        Returns
+        -------
+        bool
+        """
+        for filename, signature in self.signatures.items():
+            if file_signature(filename) != signature:
+                return False
+        return True
+
+
+class IndexShard(object):
+    """Part of the package index that is read from a single index file. The
+    shard keeps the last snapshot that was read successfully from its index
+    file.
+
+    If reading the shard fails, the error and the stat signatures of the shard
+    files are kept. The shard is not read again until any of these files
+    changes. The last snapshot that was read successfully remains available.
+
+    Attributes
+    ----------
+    compiled_file: string
+        Absolute path to the compiled index file of the shard. May be None.
+    error: string
+        Error message of the last read. None if the last read succeeded.
+    failed_signatures: dict(tuple)
+        Stat signatures of the shard files at the time of the last failed read
+    index_file: string
+        Absolute path to the index file of the shard
+    snapshot: prmpckgsrv.index.IndexSnapshot
+        Last snapshot that was read successfully. None if the shard has never
+        been read successfully.
+    """
+    def __init__(self, index_file, compiled_file=None):
+        """Initialize the shard. The shard is read on the first refresh of the
+        package index.
+
+        Parameters
+        ----------
+        index_file: string
+            Absolute path to the index file of the shard
+        compiled_file: string, optional
+            Absolute path to the compiled index file of the shard
+        """
+        self.index_file = index_file
+        self.compiled_file = compiled_file
+        self.snapshot = None
+        self.error = None
+        self.failed_signatures = None
+
+    def is_current(self):
+        """Test whether none of the shard files has changed since the shard
+        was last read. A shard that has never been read is not current.
+
+        Returns
+        -------
+        bool
+        """
+        if self.snapshot is None and self.error is None:
+            return False
+        for filename, signature in self.signatures().items():
+            if file_signature(filename) != signature:
+                return False
+        return True
+
+    def read(self, download_prefix, workers=1, processes=False, cache=None, serializer=None, fingerprint=None):
+        """Read a new snapshot of the shard incrementally based on the last
+        snapshot. If reading the shard fails the error is kept and the last
+        snapshot remains unchanged.
+
+        Parameters
+        ----------
+        download_prefix: string
+            Url prefix for download sources
+        workers: int, optional
+            Number of workers that read package files in parallel
+        processes: bool, optional
+            Use a process pool instead of a thread pool to read package files
+        cache: prmpckgsrv.cache.ModuleCache, optional
+            Cache for loaded package modules
+        serializer: func, optional
+            Function that returns the dictionary serialization of a module for
+            API responses
+        fingerprint: string, optional
+            Identifier for the serialization of modules. If given, the shard
+            is published as an index generation in its compiled file.
+
+        Returns
+        -------
+        bool
+            True if the shard was read successfully
+        """
+        # Signatures of the known shard files before reading the shard. If
+        # any of them is modified while the shard is read, the shard is read
+        # again on the next refresh.
+        signatures = dict()
+        for filename in self.signatures():
+            signatures[filename] = file_signature(filename)
+        try:
+            snapshot = read_index_snapshot(
+                self.index_file,
+                download_prefix,
+                compiled_file=self.compiled_file,
+                previous=self.snapshot,
+                workers=workers,
+                processes=processes,
+                cache=cache,
+                serializer=serializer,
+                fingerprint=fingerprint
+            )
+        except (OSError, ValueError) as ex:
+            self.error = str(ex)
+            self.failed_signatures = shard_signatures(
+                self.index_file,
+                self.compiled_file
+            )
+            self.failed_signatures.update(signatures)
+            return False
+        self.snapshot = snapshot
+        self.error = None
+        self.failed_signatures = None
+        return True
+
+    def signatures(self):
+        """Get the stat signatures of the shard files. These are the
+        signatures of the last snapshot, or the signatures at the time of the
+        last failed read.
+
+        Returns
+        -------
+        dict(tuple)
+        """
+        if not self.error is None:
+            return self.failed_signatures
+        elif not self.snapshot is None:
+            return self.snapshot.signatures
+        else:
+            return {self.index_file: None}
+
+
+class PackageIndex(object):
+    """Stat-validated cache for the package index. Keeps the last snapshot that
+    was read from the index file. A new snapshot is only read if the current
+    snapshot is outdated.
+
+    The index is either read from a single index file or it is federated from
+    several index shards. Shards are given as a list of index files and of
+    directories that contain index files. Shards that have changed are read
+    concurrently. The snapshot of the index merges the last valid snapshot of
+    each shard. If several shards define a package with the same name, the
+    package of the first shard (in the order of the configuration) is used and
+    the conflict is reported. A shard that is not valid is reported and
+    rejected. The other shards remain available.
+
+    By default, the signatures of the index files are checked whenever the
+    snapshot is accessed. If the index watcher is running, the files are
+    checked by the watcher in the background instead and accessing the
+    snapshot never blocks.
+
+    Attributes
+    ----------
+    index_files: list(string)
+        Absolute paths to the package index files and index directories
+    download_prefix: string
+        Url prefix for module download sources
+    cache: prmpckgsrv.cache.ModuleCache
+        Cache for loaded package modules
+    compiled_file: string or func
+        Absolute path to the compiled index file, or function that returns the
+        compiled file for a shard index file. May be None.
+    directories: dict(tuple)
+        Stat signatures of the index directories at the time they were last
+        listed
+    federated: bool
+        The index is merged from shards. Errors in a shard do not affect the
+        other shards.
+    fingerprint: string
+        Identifier for the serialization of modules in shared index
+        generations. None if the index is not shared.
+    logger: logging.Logger
+        Logger for rejected shards and package name conflicts
+    processes: bool
+        Use a process pool instead of a thread pool to read package files
+    search: prmpckgsrv.search.SearchIndex
+        Search index for the most recently searched snapshot. May be None.
+    serializer: func
+        Function that returns the dictionary serialization of a module for
+        API responses. May be None.
+    shards: dict(prmpckgsrv.index.IndexShard)
+        Index shards keyed by their index file in the order of the
+        configuration
+    watcher: prmpckgsrv.watcher.IndexWatcher
+        Background index watcher. None if the watcher is not running.
+    workers: int
+        Number of workers that read package files in parallel
+    """
+    def __init__(self, index_file, download_prefix, compiled_file=None, workers=1, processes=False, cache_size=0, serializer=None, logger=None, fingerprint=None):
+        """Initialize the index and read the initial snapshot. Raises
+        ValueError if the index file is not valid. For federated indexes,
+        ValueError is only raised if none of the shards is valid.
+
+        Parameters
+        ----------
+        index_file: string or list(string)
+            Absolute path to the package index file, or list of absolute paths
+            to index files and to directories that contain index files. All
+            Yaml files in an index directory are index files.
+        download_prefix: string
+            Url prefix for module download sources
+        compiled_file: string or func, optional
+            Absolute path to the compiled index file, or function that returns
+            the path to the compiled index file for a given index file. The
+            file does not need to exist.
+        workers: int, optional
+            Number of workers that read package files in parallel
+        processes: bool, optional
+            Use a process pool instead of a thread pool to read package files
+        cache_size: int, optional
+            Memory budget in bytes for loaded package modules. The module
+            cache is unbounded if the value is not greater than zero.
+        serializer: func, optional
+            Function that returns the dictionary serialization of a module for
+            API responses. The function is called with the package descriptor
+            and the module specification as arguments. The Json encoding of
+            each module is created when the package modules are loaded.
+        logger: logging.Logger, optional
+            Logger for rejected shards and package name conflicts
+        fingerprint: string, optional
+            Identifier for the serialization of modules. If given, the index
+            is shared with other processes by publishing snapshots as index
+            generations in the compiled index files. Requires a compiled file.
+        """
+        if isinstance(index_file, str):
+            self.index_files = [index_file]
+            self.federated = os.path.isdir(index_file)
+        else:
+            self.index_files = list(index_file)
+            self.federated = True
+        self.download_prefix = download_prefix
+        self.compiled_file = compiled_file
+        self.workers = workers
+        self.processes = processes
+        self.cache = ModuleCache(cache_size)
+        self.serializer = serializer
+        self.fingerprint = fingerprint
+        if logger is None:
+            logger = logging.getLogger(__name__)
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.search = None
+        self.search_lock = threading.Lock()
+        self.directories = dict()
+        self.shards = dict()
+        self.snapshot = None
+        self.snapshot = self.read_snapshot()
+        if len(self.shards) > 0 and len(self.snapshot.errors) == len(self.shards):
+            raise ValueError('no valid index shard')
+        self.watcher = None
+
+    def get_search_index(self, snapshot):
+        """Get the module search index for the given snapshot. The index is
+        created when the snapshot is first searched. It is derived from the
+        search index of the previously searched snapshot.
+
+        Parameters
+        ----------
+        snapshot: prmpckgsrv.index.IndexSnapshot
+            Index snapshot
+
+        Returns
+        -------
+        prmpckgsrv.search.SearchIndex
+        """
+        search = self.search
+        if not search is None and search.digest == snapshot.digest:
+            return search
+        with self.search_lock:
+            search = self.search
+            if search is None or search.digest != snapshot.digest:
+                search = SearchIndex(
+                    snapshot,
+                    previous=search,
+                    logger=self.logger
+                )
+                self.search = search
+            return search
+
+    def get_snapshot(self):
+        """Get the current index snapshot. Reads a new snapshot if any of the
+        files that the last snapshot was read from has changed. Raises
+        ValueError if the modified index is not valid.
+
+        If the index watcher is running the current snapshot is returned
+        without checking the files.
+
+        Returns
+        -------
+        prmpckgsrv.index.IndexSnapshot
+        """
+        snapshot = self.snapshot
+        if not self.watcher is None or snapshot.is_current():
+            return snapshot
+        with self.lock:
+            # Another thread may have read a new snapshot while we were waiting
+            # for the lock
+            if not self.snapshot is snapshot and self.snapshot.is_current():
+                return self.snapshot
+            self.snapshot = self.read_snapshot()
+            return self.snapshot
+
+    def is_current(self):
+        """Test whether none of the index directories and none of the shard
+        files has changed since they were last read.
+
+        Returns
+        -------
+        bool
+        """
+        for directory, signature in self.directories.items():
+            if file_signature(directory) != signature:
+                return False
+        for shard in self.shards.values():
+            if not shard.is_current():
+                return False
+        return True
+
+    def read_shard(self, shard):
+        """Read a new snapshot of an index shard. Errors are logged for
+        federated indexes.
+
+        Parameters
+        ----------
+        shard: prmpckgsrv.index.IndexShard
+            Index shard
+        """
+        success = shard.read(
+            self.download_prefix,
+            workers=self.workers,
+            processes=self.processes,
+            cache=self.cache,
+            serializer=self.serializer,
+            fingerprint=self.fingerprint
+        )
+        if not success and self.federated:
+            self.logger.error(
+                'index shard \'' + shard.index_file + '\' rejected: ' +
+                shard.error
+            )
+
+    def read_snapshot(self):
+        """Read a new snapshot of the package index. Only shards that have
+        changed are read. Shards are read incrementally based on their last
+        snapshot. The number and duration of reloads are recorded in the
+        metrics registry.
+
+        For an index that is read from a single index file ValueError is
+        raised if the index is not valid.
+
+        Returns
+        -------
+        prmpckgsrv.index.IndexSnapshot
+        """
+        start = time.perf_counter()
+        self.update_shards()
+        stale = [shard for shard in self.shards.values() if not shard.is_current()]
+        parallel_map(
+            self.read_shard,
+            [(shard,) for shard in stale],
+            min(len(stale), SHARD_WORKERS)
+        )
+        if not self.federated:
+            shard = self.shards[self.index_files[0]]
+            if not shard.error is None:
+                observe_reload(start, 'error')
+                raise ValueError(shard.error)
+            observe_reload(start, 'success')
+            return shard.snapshot
+        snapshot = merge_shards(
+            list(self.shards.values()),
+            self.directories,
+            cache=self.cache,
+            previous=self.snapshot
+        )
+        for conflict in snapshot.conflicts:
+            if self.snapshot is None or not conflict in self.snapshot.conflicts:
+                self.logger.warning(conflict)
+        observe_reload(start, 'success')
+        return snapshot
+
+    def refresh(self):
+        """Read a new snapshot if the current snapshot is outdated. The new
+        snapshot is published by replacing the reference to the current
+        snapshot. If reading the new snapshot of an index with a single index
+        file fails the current snapshot remains unchanged and ValueError is
+        raised. A failed refresh is not repeated until the files change again.
+
+        Returns
+        -------
+        bool
+            True if a new snapshot was published
+        """
+        with self.lock:
+            if self.is_current():
+                return False
+            snapshot = self.read_snapshot()
+            if snapshot is self.snapshot:
+                return False
+            self.snapshot = snapshot
+            return True
+
+    def start_watcher(self, interval, logger=None):
+        """Start the background index watcher.
+
+        Parameters
+        ----------
+        interval: float
+            Polling interval in seconds
+        logger: logging.Logger, optional
+            Logger for failed reloads. Defaults to the index logger.
+        """
+        if logger is None:
+            logger = self.logger
+        if self.watcher is None:
+            self.watcher = IndexWatcher(self, interval, logger=logger)
+            self.watcher.start()
+
+    def stop_watcher(self):
+        """Stop the background index watcher if it is running."""
+        if not self.watcher is None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def update_shards(self):
+        """Update the list of index shards. Index directories are listed to
+        add shards for new index files and to remove shards whose index file
+        has been removed. Existing shards are kept.
+        """
+        shards = dict()
+        directories = dict()
+        for path in self.index_files:
+            if self.federated and os.path.isdir(path):
+                # Get the directory signature before listing the directory
+                directories[path] = file_signature(path)
+                filenames = index_directory_files(path)
+            else:
+                filenames = [path]
+            for filename in filenames:
+                if filename in shards:
+                    continue
+                shard = self.shards.get(filename)
+                if shard is None:
+                    compiled_file = self.compiled_file
+                    if callable(compiled_file):
+                        compiled_file = compiled_file(filename)
+                    shard = IndexShard(filename, compiled_file=compiled_file)
+                shards[filename] = shard
+        self.shards = shards
+        self.directories = directories
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def file_signature(filename):
+    """Get the stat signature of a file. The signature is a tuple of the
+    modification time, the file size, and the inode number. Returns None if
+    the file does not exist.
+
+    Parameters
+    ----------
+    filename: string
+        Path to file
+
+    Returns
+    -------
+    tuple
+    """
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def package_descriptor(name, filename, doc):
+    """Create descriptor for a package from the parsed package file. Raises
+    ValueError if the timestamp or version information is missing or if the
+    version contains the separator that terminates versions in package
+    queries. Versions are converted to strings since unquoted versions like
+    1.2 are parsed as numbers.
+
+    Parameters
+    ----------
+    name: string
+        Unique package name
+    filename: string
+        Absolute path to the package file
+    doc: dict
+        Parsed content of the package file
+
+    Returns
+    -------
+    PackageDescriptor
+    """
+    for key in ['timestamp', 'version']:
+        if not key in doc:
+            raise ValueError('package descriptor is missing element \'' + key + '\'')
+    version = str(doc['version'])
+    if VERSION_SEPARATOR in version:
+        raise ValueError('invalid package version \'' + version + '\'')
+    timestamp = dt.datetime.strptime(doc['timestamp'], '%Y-%m-%dT%H:%M:%S')
+    if 'description' in doc:
+        description = doc['description']
+    else:
+        description = None
+    return PackageDescriptor(
+        name,
+        filename,
+        version,
+        timestamp,
+        description=description
+    )
+
+
+def group_versions(sources):
+    """Group the module sources of all package versions by package name.
+    Returns dictionaries of (1) the package descriptor and (2) the module
+    source of the most recent version of each package, and (3) the sorted
+    list of versions of each package. Packages are in the order in which they
+    first occur in the given list. Raises ValueError if a package version
+    occurs more than once.
+
+    Parameters
+    ----------
+    sources: list(ModuleSource)
+        Module sources in the order of the package index
+
+    Returns
+    -------
+    dict(PackageDescriptor), dict(ModuleSource), dict(prmpckgsrv.versions.PackageVersions)
+    """
+    grouped = dict()
+    for source in sources:
+        grouped.setdefault(source.package.name, list()).append(source)
+    packages = dict()
+    latest = dict()
+    versions = dict()
+    for name, package_sources in grouped.items():
+        versions[name] = PackageVersions(package_sources)
+        latest[name] = versions[name].latest()
+        packages[name] = latest[name].package
+    return packages, latest, versions
+
+
+def index_directory_files(directory):
+    """Get the sorted list of absolute paths of all index files in an index
+    directory. Index files are the Yaml files in the directory. The result is
+    empty if the directory cannot be listed.
+
+    Parameters
+    ----------
+    directory: string
+        Absolute path to the index directory
+
+    Returns
+    -------
+    list(string)
+    """
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return list()
+    return [
+        os.path.join(directory, name)
+            for name in sorted(names)
+                if name.endswith(SHARD_SUFFIXES) and os.path.isfile(os.path.join(directory, name))
+    ]
+
+
+def is_unchanged(snapshot, name, filename, signature):
+    """Test whether a package in the given snapshot was read from the given
+    package file and the file has not changed since.
+
+    Parameters
+    ----------
+    snapshot: prmpckgsrv.index.IndexSnapshot
+        Previous snapshot of the package index. May be None.
+    name: string
+        Unique package name
+    filename: string
+        Absolute path to the package file
+    signature: tuple
+        Current stat signature of the package file
+
+    Returns
+    -------
+    bool
+    """
+    if snapshot is None or signature is None:
+        return False
+    source = snapshot.files.get(filename)
+    if source is None or source.package.name != name:
+        return False
+    return snapshot.signatures.get(filename) == signature
+
+
+def merge_shards(shards, directories, cache=None, previous=None):
+    """Merge the last valid snapshots of the given index shards into a single
+    snapshot. Packages are merged in the order of the shards. A package whose
+    name is already defined by a preceding shard is ignored and reported as a
+    conflict. Shards that failed to be read are reported as errors. Their last
+    valid snapshot (if any) remains part of the merged snapshot.
+
+    The signatures of the merged snapshot contain the signatures of the index
+    directories and of all shard files. For rejected shards these are the
+    signatures at the time of the failed read.
+
+    Parameters
+    ----------
+    shards: list(prmpckgsrv.index.IndexShard)
+        Index shards in order of precedence
+    directories: dict(tuple)
+        Stat signatures of the index directories
+    cache: prmpckgsrv.cache.ModuleCache, optional
+        Cache for loaded package modules
+    previous: prmpckgsrv.index.IndexSnapshot, optional
+        Previous merged snapshot
+
+    Returns
+    -------
+    prmpckgsrv.index.IndexSnapshot
+    """
+    signatures = dict(directories)
+    packages = dict()
+    sources = dict()
+    versions = dict()
+    owners = dict()
+    conflicts = list()
+    errors = dict()
+    for shard in shards:
+        signatures.update(shard.signatures())
+        if not shard.error is None:
+            errors[shard.index_file] = shard.error
+        if shard.snapshot is None:
+            continue
+        for name, package_versions in shard.snapshot.versions.items():
+            if name in owners:
+                conflicts.append(
+                    'package \'' + name + '\' in index shard \'' +
+                    shard.index_file + '\' is already defined in \'' +
+                    owners[name] + '\''
+                )
+                continue
+            owners[name] = shard.index_file
+            packages[name] = shard.snapshot.packages[name]
+            sources[name] = shard.snapshot.sources[name]
+            versions[name] = package_versions
+    return IndexSnapshot(
+        packages,
+        sources,
+        signatures,
+        cache=cache,
+        previous=previous,
+        versions=versions,
+        conflicts=conflicts,
+        errors=errors
+    )
+
+
+def module_entry(module):
+    """Get the (name, folder, description) triple for a module specification.
+    The description is None if the module does not have a description.
+
+    Parameters
+    ----------
+    module: ModuleSpecification
+        Module specification
+
+    Returns
+    -------
+    tuple
+    """
+    description = module.to_dict(fields=['description']).get('description')
+    return (module.name, module.folder, description)
+
+
+def module_specifications(doc, download_prefix, serialize=None, shared=None):
+    """Get list of module descriptors from a parsed package file. Sources of
+    download tasks are prefixed with the given download Url prefix.
+
+    Parameters
+    ----------
+    doc: dict
+        Parsed content of the package file
+    download_prefix: string
+        Url prefix for download sources
+    serialize: func, optional
+        Function that returns the dictionary serialization of a module for API
+        responses
+    shared: dict(bytes), optional
+        Json encodings of module elements that are shared with other modules
+
+    Returns
+    -------
+    list(ModuleSpecification)
+    """
+    modules = list()
+    if 'modules' in doc:
+        for obj in doc['modules']:
+            if 'install' in obj:
+                for task in obj['install']['tasks']:
+                    if task['type'] == 'DOWNLOAD':
+                        for prop in task['properties']:
+                            if prop['name'] == 'source':
+                                prop['value'] = download_prefix + '/' + prop['value']
+            modules.append(
+                ModuleSpecification(obj, serialize=serialize, shared=shared)
+            )
+    return modules
+
+
+def read_index_entries(filename, check_files=True):
+    """Read the list of package entries from the package index file. Ensures
+    that the file contains an array of package descriptiors with the following
+    elements: name, and file.
+
+    Returns a list of (name, file) pairs in the order in which they appear in
+    the index file. Package file paths are absolute. The same package name may
+    occur several times for different versions of the package.
+
+    Raises ValueError if the index file is not valid, if a package file is
+    referenced more than once, or if a referenced package file does not exist.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the Yaml file (expected to be in Yaml format)
+    check_files: bool, optional
+        Check that the referenced package files exist. Callers that disable
+        the check are responsible for checking the files themselves.
+
+    Returns
+    -------
+    list((string, string))
+    """
+    doc = read_yaml_file(filename)
+    if not 'packages' in doc:
+        raise ValueError('index file is missing element \'packages\'')
+    entries = list()
+    files = set()
+    for obj in doc['packages']:
+        for key in ['name', 'file']:
+            if not key in obj:
+                raise ValueError('package descriptor is missing element \'' + key + '\'')
+        name = obj['name']
+        package_file = os.path.abspath(obj['file'])
+        if package_file in files:
+            raise ValueError('duplicate package file \'' + package_file + '\'')
+        if check_files and not os.path.isfile(package_file):
+            raise ValueError('package file \'' + package_file + '\' does not exist')
+        files.add(package_file)
+        entries.append((name, package_file))
+    return entries
+
+
+def read_index_file(filename):
+    """Read the package index file. Ensures that the file contains an array of
+    package descriptiors with the following elements: name, and file.
+
+    From each referenced file the (optional) description, timestamps and
+    version information is extracted and added to the package descriptor.
+
+    Returns a dictionary of package descriptors keyed by the package name. If
+    the index contains several versions of a package the descriptor of the
+    most recent version is returned.
+
+    Raises ValueError if the index file is not valid or if it references a
+    package file more than once.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the Yaml file (expected to be in Yaml format)
+
+    Returns
+    -------
+    dict(PackageDescriptor)
+    """
+    packages = dict()
+    for name, package_file in read_index_entries(filename):
+        package = read_package(name, package_file)
+        if name in packages:
+            if version_key(package.version) == version_key(packages[name].version):
+                raise ValueError(
+                    'duplicate version \'' + package.version +
+                    '\' for package \'' + name + '\''
+                )
+            if version_key(package.version) < version_key(packages[name].version):
+                continue
+        packages[name] = package
+    return packages
+
+
+def parallel_map(func, args, workers, processes=False):
+    """Apply a function to each element in a list of argument tuples. The
+    function is applied in parallel by a thread or process pool if more than
+    one worker is given. Results are returned in the order of the arguments.
+    Exceptions that are raised by the function are re-raised.
+
+    Parameters
+    ----------
+    func: func
+        Function that is applied to each argument tuple. The function has to
+        be defined at module level if a process pool is used.
+    args: list(tuple)
+        Argument tuples
+    workers: int
+        Number of workers
+    processes: bool, optional
+        Use a process pool instead of a thread pool
+
+    Returns
+    -------
+    list
+    """
+    if workers <= 1 or len(args) <= 1:
+        return [func(*a) for a in args]
+    if processes:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        return list(executor.map(func, *zip(*args)))
+
+
+def read_compiled_snapshot(compiled_file, filename, download_prefix, previous=None, cache=None, serializer=None, fingerprint=None):
+    """Read snapshot of the package index from a compiled index file. Returns
+    None if the compiled file is not valid, if it was compiled from a
+    different index file, or if it is older than any of its sources.
+
+    If a fingerprint is given, the compiled file has to be an index generation
+    with the same fingerprint. Otherwise, it has to be a compiled index file.
+
+    Only the package metadata is read. Package modules are decoded from the
+    memory-mapped compiled file when they are first accessed. Descriptors of
+    packages in the previous snapshot whose package file is unchanged are
+    reused. Module sources always refer to the given compiled file.
+
+    Parameters
+    ----------
+    compiled_file: string
+        Absolute path to the compiled index file
+    filename: string
+        Absolute path to the package index file
+    download_prefix: string
+        Url prefix for download sources
+    previous: prmpckgsrv.index.IndexSnapshot, optional
+        Previous snapshot of the package index
+    cache: prmpckgsrv.cache.ModuleCache, optional
+        Cache for loaded package modules
+    serializer: func, optional
+        Function that returns the dictionary serialization of a module for API
+        responses
+    fingerprint: string, optional
+        Identifier for the serialization of modules in an index generation
+
+    Returns
+    -------
+    prmpckgsrv.index.IndexSnapshot
+    """
+    signatures = {compiled_file: file_signature(compiled_file)}
+    try:
+        compiled = CompiledIndex(compiled_file)
+    except (OSError, ValueError):
+        return None
+    if compiled.index_file != filename or compiled.fingerprint != fingerprint:
+        compiled.close()
+        return None
+    package_files = [entry['file'] for entry in compiled.packages]
+    if not is_compiled_current(compiled_file, filename, package_files):
+        compiled.close()
+        return None
+    signatures[filename] = file_signature(filename)
+    sources = list()
+    for entry in compiled.packages:
+        name = entry['name']
+        signature = file_signature(entry['file'])
+        signatures[entry['file']] = signature
+        # Module sources of the previous snapshot may refer to a previous
+        # compiled file that is not kept mapped
+        if is_unchanged(previous, name, entry['file'], signature):
+            package = previous.files[entry['file']].package
+        else:
+            package = package_descriptor(name, entry['file'], entry)
+        sources.append(
+            ModuleSource(
+                package,
+                signature,
+                download_prefix,
+                serializer=serializer,
+                compiled=compiled,
+                entry=entry
+            )
+        )
+    # The compiled file remains memory-mapped as long as it is referenced by
+    # a module source.
+    packages, latest, versions = group_versions(sources)
+    return IndexSnapshot(
+        packages,
+        latest,
+        signatures,
+        cache=cache,
+        previous=previous,
+        versions=versions
+    )
+
+
+def read_index_snapshot(filename, download_prefix, compiled_file=None, previous=None, workers=1, processes=False, cache=None, serializer=None, fingerprint=None):
+    """Read snapshot of the package index. Only the package metadata is read
+    from each package file. Package modules are read when they are first
+    accessed.
+
+    The snapshot is read from the compiled index file instead if the file
+    exists and is current.
+
+    If a fingerprint is given, the compiled index file is an index generation
+    that is shared with other processes. If the generation is not current, the
+    index is read and published as a new generation while holding the
+    generation lock. The returned snapshot is read from the new generation.
+
+    If a previous snapshot is given the snapshot is read incrementally. The
+    index file is always read. Package descriptors and module sources are
+    reused for all packages in the previous snapshot whose package file is
+    unchanged. Only added packages and modified package files are read.
+
+    Package files are read in parallel if more than one worker is given. The
+    result does not depend on the number of workers.
+
+    Raises ValueError if the index file or any of the package files is not
+    valid.
+
+    Parameters
+    ----------
+    filename: string
+        Absolute path to the package index file
+    download_prefix: string
+        Url prefix for download sources
+    compiled_file: string, optional
+        Absolute path to the compiled index file
+    previous: prmpckgsrv.index.IndexSnapshot, optional
+        Previous snapshot of the package index
+    workers: int, optional
+        Number of workers that read package files in parallel
+    processes: bool, optional
+        Use a process pool instead of a thread pool to read package files
+    cache: prmpckgsrv.cache.ModuleCache, optional
+        Cache for loaded package modules
+    serializer: func, optional
+        Function that returns the dictionary serialization of a module for API
+        responses
+    fingerprint: string, optional
+        Identifier for the serialization of modules in index generations. If
+        given, snapshots are published as index generations in the compiled
+        index file.
+
+    Returns
+    -------
+    prmpckgsrv.index.IndexSnapshot
+    """
+    if not compiled_file is None:
+        if os.path.isfile(compiled_file):
+            snapshot = read_compiled_snapshot(
+                compiled_file,
+                filename,
+                download_prefix,
+                previous=previous,
+                cache=cache,
+                serializer=serializer,
+                fingerprint=fingerprint
+            )
+            if not snapshot is None:
+                return snapshot
+        if not fingerprint is None:
+            with GenerationLock(compiled_file):
+                # Another process may have published a current generation
+                # while we were waiting for the lock
+                snapshot = read_compiled_snapshot(
+                    compiled_file,
+                    filename,
+                    download_prefix,
+                    previous=previous,
+                    cache=cache,
+                    serializer=serializer,
+                    fingerprint=fingerprint
+                )
+                if not snapshot is None:
+                    return snapshot
+                snapshot = read_source_snapshot(
+                    filename,
+                    download_prefix,
+                    compiled_file=compiled_file,
+                    previous=previous,
+                    workers=workers,
+                    processes=processes,
+                    cache=cache,
+                    serializer=serializer
+                )
+                publish_generation(
+                    compiled_file,
+                    filename,
+                    snapshot,
+                    fingerprint,
+                    lambda sources: parallel_map(
+                        ModuleSource.load,
+                        [(source,) for source in sources],
+                        workers
+                    )
+                )
+                generation = read_compiled_snapshot(
+                    compiled_file,
+                    filename,
+                    download_prefix,
+                    previous=previous,
+                    cache=cache,
+                    serializer=serializer,
+                    fingerprint=fingerprint
+                )
+            # The generation is not current if any of the files was modified
+            # while the generation was written. The snapshot that was read
+            # from the files is used until the next generation is published.
+            if generation is None:
+                return snapshot
+            return generation
+    return read_source_snapshot(
+        filename,
+        download_prefix,
+        compiled_file=compiled_file,
+        previous=previous,
+        workers=workers,
+        processes=processes,
+        cache=cache,
+        serializer=serializer
+    )
+
+
+def read_source_snapshot(filename, download_prefix, compiled_file=None, previous=None, workers=1, processes=False, cache=None, serializer=None):
+    """Read snapshot of the package index from the index file and the package
+    files. The snapshot is read incrementally if a previous snapshot is given.
+    Raises ValueError if the index file or any of the package files is not
+    valid.
+
+    Parameters
+    ----------
+    filename: string
+        Absolute path to the package index file
+    download_prefix: string
+        Url prefix for download sources
+    compiled_file: string, optional
+        Absolute path to the compiled index file. The signature of the file is
+        kept to switch to the compiled file once it is current.
+    previous: prmpckgsrv.index.IndexSnapshot, optional
+        Previous snapshot of the package index
+    workers: int, optional
+        Number of workers that read package files in parallel
+    processes: bool, optional
+        Use a process pool instead of a thread pool to read package files
+    cache: prmpckgsrv.cache.ModuleCache, optional
+        Cache for loaded package modules
+    serializer: func, optional
+        Function that returns the dictionary serialization of a module for API
+        responses
+
+    Returns
+    -------
+    prmpckgsrv.index.IndexSnapshot
+    """
+    signatures = dict()
+    if not compiled_file is None:
+        # Keep the signature of the compiled file to switch to the compiled
+        # file once it has been (re-)compiled.
+        signatures[compiled_file] = file_signature(compiled_file)
+    # Get the file signature before reading the file. If the file is modified
+    # while being read the snapshot will be outdated on the next request.
+    signatures[filename] = file_signature(filename)
+    entries = read_index_entries(filename, check_files=False)
+    # Get the signatures of all package files. The signature is None for
+    # package files that do not exist.
+    package_files = [package_file for _, package_file in entries]
+    package_signatures = parallel_map(
+        file_signature,
+        [(package_file,) for package_file in package_files],
+        workers
+    )
+    for package_file, signature in zip(package_files, package_signatures):
+        if signature is None:
+            raise ValueError('package file \'' + package_file + '\' does not exist')
+        signatures[package_file] = signature
+    # Read all packages that are new or whose package file has changed.
+    load = list()
+    for name, package_file in entries:
+        if not is_unchanged(previous, name, package_file, signatures[package_file]):
+            load.append((name, package_file))
+    results = parallel_map(read_package, load, workers, processes=processes)
+    loaded = dict()
+    for args, result in zip(load, results):
+        loaded[args[1]] = result
+    # Merge packages in the order of the index file
+    sources = list()
+    for name, package_file in entries:
+        if package_file in loaded:
+            sources.append(
+                ModuleSource(
+                    loaded[package_file],
+                    signatures[package_file],
+                    download_prefix,
+                    serializer=serializer
+                )
+            )
+        else:
+            sources.append(previous.files[package_file])
+    packages, latest, versions = group_versions(sources)
+    return IndexSnapshot(
+        packages,
+        latest,
+        signatures,
+        cache=cache,
+        previous=previous,
+        versions=versions
+    )
+
+
+def read_modules(filename, download_prefix):
+    """Get list of module descriptors in a package file.
+
+    Parameters
+    ----------
+    filename: string
+        Path to package definoition file
+    download_prefix: string
+        Url prefix for download sources
+
+    Returns
+    -------
+    list(ModuleSpecification)
+    """
+    return module_specifications(read_yaml_file(filename), download_prefix)
+
+
+def read_package(name, filename):
+    """Read package descriptor from a package file. Only the package header
+    is parsed. The package modules are not read. Raises ValueError if the
+    package header is not valid.
+
+    Parameters
+    ----------
+    name: string
+        Unique package name
+    filename: string
+        Absolute path to the package file
+
+    Returns
+    -------
+    PackageDescriptor
+    """
+    return package_descriptor(name, filename, read_yaml_header(filename))
+
+
+def shard_signatures(index_file, compiled_file=None):
+    """Get the stat signatures of the index file, the compiled index file, and
+    all package files of an index shard. Package files are only included if
+    the index file can be read.
+
+    Parameters
+    ----------
+    index_file: string
+        Absolute path to the index file of the shard
+    compiled_file: string, optional
+        Absolute path to the compiled index file of the shard
+
+    Returns
+    -------
+    dict(tuple)
+    """
+    signatures = {index_file: file_signature(index_file)}
+    if not compiled_file is None:
+        signatures[compiled_file] = file_signature(compiled_file)
+    try:
+        entries = read_index_entries(index_file, check_files=False)
+    except (OSError, ValueError):
+        return signatures
+    for _, package_file in entries:
+        signatures[package_file] = file_signature(package_file)
+    return signatures
+
+
+def read_yaml_file(filename):
+    """Read the content of a file in Yaml format. Raises ValueError if the file
+    content is not valid Yaml.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the Yaml file
+
+    Returns
+    -------
+    dict
+    """
+    with open(filename, 'r') as f:
+        try:
+            return load_yaml(f)
+        except yaml.YAMLError as ex:
+            raise ValueError(str(ex))
+
+
+def read_yaml_header(filename):
+    """Read the header of a package file in Yaml format. The header contains
+    the scalar top-level elements of the file. Parsing stops once all package
+    header elements have been read. Raises ValueError if the header is not
+    valid Yaml.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the Yaml file
+
+    Returns
+    -------
+    dict
+    """
+    with open(filename, 'r') as f:
+        try:
+            return load_yaml_header(f, keys=PACKAGE_HEADER)
+        except yaml.YAMLError as ex:
+            raise ValueError(str(ex))
@@ -0,0 +1,226 @@
+"""prm Package Web Service API - Logging
+
+Queued logging for the Web server. Records that are logged on request threads
+are put on a queue and written by a background listener thread. Logging an
+error therefore does not perform file I/O on the request thread.
+
+If a log directory is given, errors are written to an error log file and each
+request is written to an access log file. Access log records are Json objects
+(one per line) that contain the request method, path, route, response status,
+response size, and request duration.
+
+Under a WSGI server all worker processes append to the same log files. Log
+files are therefore not rotated by the server itself, since rotating the same
+file from several processes loses records. Rotate the files externally (e.g.,
+with logrotate). Each process reopens a log file when it detects that the file
+was moved or removed.
+
+The listener thread runs in the process that configures logging. WSGI servers
+that import the application before forking the worker processes (e.g.,
+gunicorn --preload) configure logging in the master process only. The forked
+workers do not inherit the listener thread and their records are never
+written. Configure logging (i.e., import prmpckgsrv.server) after the fork in
+each worker process.
+"""
+
+import atexit
+import datetime as dt
+import json
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+
+"""Name of the access logger."""
+ACCESS_LOGGER = 'prmpckgsrv.access'
+
+"""Names of the log files in the log directory."""
+ACCESS_LOG_FILE = 'access.log'
+ERROR_LOG_FILE = 'vizier-api.log'
+
+
+class AccessLogFormatter(logging.Formatter):
+    """Formatter for access log records. Records are expected to have an
+    attribute 'access' that contains the dictionary of request properties.
+    The record is formatted as a single-line Json object.
+    """
+    def format(self, record):
+        """Format an access log record.
+
+        Parameters
+        ----------
+        record: logging.LogRecord
+            Access log record
+
+        Returns
+        -------
+        string
+        """
+        obj = {
+            'time': dt.datetime.fromtimestamp(
+                record.created,
+                dt.timezone.utc
+            ).isoformat()
+        }
+        obj.update(getattr(record, 'access', dict()))
+        return json.dumps(obj, sort_keys=True)
+
+
+class LogListener(QueueListener):
+    """Queue listener that keeps track of whether its thread has been
+    started. Stopping a listener that is not running has no effect.
+
+    Attributes
+    ----------
+    running: bool
+        True if the listener thread has been started and not stopped
+    """
+    def __init__(self, log_queue, *handlers, respect_handler_level=False):
+        """Initialize the listener for the given queue and handlers.
+
+        Parameters
+        ----------
+        log_queue: queue.SimpleQueue
+            Queue of log records
+        handlers: list(logging.Handler)
+            Handlers that write the queued records
+        respect_handler_level: bool, optional
+            Pass records to handlers only if the record level is at least the
+            handler level
+        """
+        super(LogListener, self).__init__(
+            log_queue,
+            *handlers,
+            respect_handler_level=respect_handler_level
+        )
+        self.running = False
+
+    def start(self):
+        """Start the listener thread."""
+        super(LogListener, self).start()
+        self.running = True
+
+    def stop(self):
+        """Stop the listener thread after all queued records have been
+        written. Does nothing if the listener is not running.
+        """
+        if self.running:
+            self.running = False
+            super(LogListener, self).stop()
+
+
+def configure_logging(logger, log_dir=None):
+    """Route all records of the given logger through a queue to a background
+    listener. Handlers that are attached to the logger are moved to the
+    listener. If a log directory is given, an error log handler is added to
+    the listener and the access logger is configured to write to an access log
+    file. The directory is created if it does not exist. Log files are not
+    rotated by the server (see module documentation).
+
+    Listeners are stopped (and remaining records are written) when the
+    interpreter exits. Returns the list of started listeners and the access
+    logger. The access logger is None if no log directory is given.
+
+    Parameters
+    ----------
+    logger: logging.Logger
+        Application logger
+    log_dir: string, optional
+        Path to the log file directory
+
+    Returns
+    -------
+    list(prmpckgsrv.logutil.LogListener), logging.Logger
+    """
+    handlers = list(logger.handlers)
+    listeners = list()
+    access_logger = None
+    if not log_dir is None:
+        log_dir = os.path.abspath(log_dir)
+        if not os.path.isdir(log_dir):
+            os.makedirs(log_dir)
+        error_handler = log_file_handler(
+            os.path.join(log_dir, ERROR_LOG_FILE),
+            logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        )
+        error_handler.setLevel(logging.ERROR)
+        handlers.append(error_handler)
+        # The access log has a queue of its own to keep access records out of
+        # the handlers of the application logger.
+        access_logger = logging.getLogger(ACCESS_LOGGER)
+        access_logger.setLevel(logging.INFO)
+        access_logger.propagate = False
+        listeners.append(start_listener(
+            access_logger,
+            [
+                log_file_handler(
+                    os.path.join(log_dir, ACCESS_LOG_FILE),
+                    AccessLogFormatter()
+                )
+            ]
+        ))
+    listeners.append(start_listener(logger, handlers))
+    return listeners, access_logger
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def log_file_handler(filename, formatter):
+    """Create a handler with the given formatter that appends to a log file.
+    The file is reopened if it was moved or removed by external log rotation.
+
+    Parameters
+    ----------
+    filename: string
+        Path to the log file
+    formatter: logging.Formatter
+        Formatter for log records
+
+    Returns
+    -------
+    logging.handlers.WatchedFileHandler
+    """
+    handler = WatchedFileHandler(filename)
+    handler.setFormatter(formatter)
+    return handler
+
+
+def start_listener(logger, handlers):
+    """Replace the handlers of a logger with a handler that puts records on a
+    queue. Start a listener that passes the queued records to the given
+    handlers. The listener is stopped when the interpreter exits.
+
+    Parameters
+    ----------
+    logger: logging.Logger
+        Logger
+    handlers: list(logging.Handler)
+        Handlers that write the queued records
+
+    Returns
+    -------
+    prmpckgsrv.logutil.LogListener
+    """
+    log_queue = queue.SimpleQueue()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(log_queue))
+    listener = LogListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_listener, listener)
+    return listener
+
+
+def stop_listener(listener):
+    """Stop a listener after all queued records have been written. Listeners
+    that have already been stopped are ignored.
+
+    Parameters
+    ----------
+    listener: prmpckgsrv.logutil.LogListener
+        Log listener
+    """
+    listener.stop()
@@ -0,0 +1,373 @@
+"""prm Package Web Service API - Metrics
+
+Collects request and loader metrics for the /metrics route of the Web server.
+Metrics are counters and histograms that are identified by a metric name and
+a tuple of (label, value) pairs.
+
+Each thread records its values in a store of its own. Recording a value does
+not acquire a lock (apart from registering the store of a new thread). The
+stores of all threads are aggregated only when the metrics are collected.
+Stores of threads that have terminated are merged into a single store of
+retired values.
+
+Metrics are rendered in the Prometheus text exposition format. Values that
+are recorded in the workers of a process pool are not collected.
+"""
+
+import bisect
+import threading
+import time
+
+
+"""Metric names."""
+HTTP_REQUESTS = 'prmpckgsrv_http_requests_total'
+HTTP_REQUEST_DURATION = 'prmpckgsrv_http_request_duration_seconds'
+INDEX_RELOADS = 'prmpckgsrv_index_reloads_total'
+INDEX_RELOAD_DURATION = 'prmpckgsrv_index_reload_duration_seconds'
+RESPONSE_CACHE_REQUESTS = 'prmpckgsrv_response_cache_requests_total'
+STAGE_DURATION = 'prmpckgsrv_stage_duration_seconds'
+
+"""Processing stages whose duration is recorded."""
+STAGE_MATCH = 'module_match'
+STAGE_SERIALIZE = 'serialize'
+STAGE_YAML = 'yaml_parse'
+
+"""Upper bounds (in seconds) of the histogram buckets."""
+DURATION_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+"""Type and help text of the metrics that are rendered. Metrics that are not
+listed are rendered as untyped."""
+METRIC_TYPES = {
+    HTTP_REQUESTS: ('counter', 'Number of handled Http requests'),
+    HTTP_REQUEST_DURATION: ('histogram', 'Http request latency'),
+    INDEX_RELOADS: ('counter', 'Number of package index reloads'),
+    INDEX_RELOAD_DURATION: ('histogram', 'Duration of package index reloads'),
+    RESPONSE_CACHE_REQUESTS: ('counter', 'Number of response cache lookups'),
+    STAGE_DURATION: ('histogram', 'Time spent in request processing stages'),
+    'prmpckgsrv_index_conflicts': (
+        'gauge',
+        'Number of package names that are defined by more than one shard'
+    ),
+    'prmpckgsrv_index_shard_errors': (
+        'gauge',
+        'Number of index shards that are not valid'
+    ),
+    'prmpckgsrv_index_shards': ('gauge', 'Number of index shards'),
+    'prmpckgsrv_module_cache_bytes': (
+        'gauge',
+        'Approximate size of the loaded package modules in bytes'
+    ),
+    'prmpckgsrv_module_cache_entries': (
+        'gauge',
+        'Number of packages with loaded modules'
+    ),
+    'prmpckgsrv_module_cache_evictions_total': (
+        'counter',
+        'Number of packages evicted from the module cache'
+    ),
+    'prmpckgsrv_module_cache_hit_ratio': (
+        'gauge',
+        'Ratio of module cache lookups that were hits'
+    ),
+    'prmpckgsrv_module_cache_hits_total': (
+        'counter',
+        'Number of module cache hits'
+    ),
+    'prmpckgsrv_module_cache_misses_total': (
+        'counter',
+        'Number of module cache misses'
+    ),
+    'prmpckgsrv_package_versions': (
+        'gauge',
+        'Number of package versions in the index'
+    ),
+    'prmpckgsrv_packages': ('gauge', 'Number of packages in the index'),
+    'prmpckgsrv_response_cache_hit_ratio': (
+        'gauge',
+        'Ratio of response cache lookups that were hits'
+    ),
+    'prmpckgsrv_yaml_backend_info': ('gauge', 'Active Yaml parser backend')
+}
+
+"""Number of registered stores at which stores of terminated threads are
+merged."""
+MIN_COMPACT_THRESHOLD = 64
+
+
+class MetricsStore(object):
+    """Counter and histogram values that are recorded by a single thread.
+
+    Attributes
+    ----------
+    counters: dict
+        Counter values keyed by (name, labels)
+    histograms: dict
+        Histogram values keyed by (name, labels). Each value is a list of
+        bucket counts (one more than the number of buckets) followed by the
+        sum of the observed values.
+    """
+    def __init__(self):
+        """Initialize an empty store."""
+        self.counters = dict()
+        self.histograms = dict()
+
+    def merge(self, counters, histograms):
+        """Add the given counter and histogram values to the store.
+
+        Parameters
+        ----------
+        counters: dict
+            Counter values keyed by (name, labels)
+        histograms: dict
+            Histogram values keyed by (name, labels)
+        """
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, values in histograms.items():
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                self.histograms[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    histogram[i] += value
+
+
+class MetricsRegistry(object):
+    """Registry for the metric stores of all threads.
+
+    Attributes
+    ----------
+    buckets: tuple(float)
+        Upper bounds of the histogram buckets
+    """
+    def __init__(self, buckets=DURATION_BUCKETS):
+        """Initialize the registry.
+
+        Parameters
+        ----------
+        buckets: tuple(float), optional
+            Upper bounds of the histogram buckets in increasing order
+        """
+        self.buckets = buckets
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        # List of (thread, store) pairs for all registered threads
+        self.stores = list()
+        self.retired = MetricsStore()
+        self.compact_threshold = MIN_COMPACT_THRESHOLD
+
+    def collect(self):
+        """Aggregate the values of all threads. Returns a pair of dictionaries
+        with counter and histogram values keyed by (name, labels).
+
+        Returns
+        -------
+        dict, dict
+        """
+        with self.lock:
+            self.compact()
+            result = MetricsStore()
+            result.merge(self.retired.counters, self.retired.histograms)
+            for _, store in self.stores:
+                # Copy the dictionaries of running threads. The copies are
+                # created without releasing the interpreter lock.
+                result.merge(store.counters.copy(), store.histograms.copy())
+        return result.counters, result.histograms
+
+    def compact(self):
+        """Merge the stores of terminated threads into the store of retired
+        values. Expects the caller to hold the registry lock.
+        """
+        stores = list()
+        for thread, store in self.stores:
+            if thread.is_alive():
+                stores.append((thread, store))
+            else:
+                self.retired.merge(store.counters, store.histograms)
+        self.stores = stores
+        self.compact_threshold = max(MIN_COMPACT_THRESHOLD, 2 * len(stores))
+
+    def increment(self, name, labels=(), value=1):
+        """Increment a counter.
+
+        Parameters
+        ----------
+        name: string
+            Metric name
+        labels: tuple, optional
+            Tuple of (label, value) pairs
+        value: int, optional
+            Increment
+        """
+        counters = self.store().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """Add a value to a histogram.
+
+        Parameters
+        ----------
+        name: string
+            Metric name
+        labels: tuple
+            Tuple of (label, value) pairs
+        value: float
+            Observed value
+        """
+        histograms = self.store().histograms
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = [0] * (len(self.buckets) + 1) + [0.0]
+            histograms[key] = histogram
+        histogram[bisect.bisect_left(self.buckets, value)] += 1
+        histogram[-1] += value
+
+    def render(self, gauges=None):
+        """Render all metrics in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        gauges: list(tuple), optional
+            List of (name, labels, value) triples for values that are
+            computed when the metrics are collected
+
+        Returns
+        -------
+        string
+        """
+        counters, histograms = self.collect()
+        samples = dict()
+        for (name, labels), value in counters.items():
+            samples.setdefault(name, list()).append((name, labels, value))
+        if not gauges is None:
+            for name, labels, value in gauges:
+                samples.setdefault(name, list()).append((name, labels, value))
+        for (name, labels), histogram in histograms.items():
+            entries = samples.setdefault(name, list())
+            count = 0
+            for i, bound in enumerate(self.buckets + (float('inf'),)):
+                count += histogram[i]
+                entries.append((
+                    name + '_bucket',
+                    labels + (('le', format_value(bound)),),
+                    count
+                ))
+            entries.append((name + '_sum', labels, histogram[-1]))
+            entries.append((name + '_count', labels, count))
+        lines = list()
+        for name in sorted(samples):
+            metric_type, description = METRIC_TYPES.get(name, ('untyped', None))
+            if not description is None:
+                lines.append('# HELP ' + name + ' ' + description)
+            lines.append('# TYPE ' + name + ' ' + metric_type)
+            for sample, labels, value in samples[name]:
+                lines.append(
+                    sample + format_labels(labels) + ' ' + format_value(value)
+                )
+        return '\n'.join(lines) + '\n'
+
+    def store(self):
+        """Get the store of the current thread. A new store is registered if
+        the thread does not have a store yet.
+
+        Returns
+        -------
+        prmpckgsrv.metrics.MetricsStore
+        """
+        store = getattr(self.local, 'store', None)
+        if store is None:
+            store = MetricsStore()
+            with self.lock:
+                if len(self.stores) >= self.compact_threshold:
+                    self.compact()
+                self.stores.append((threading.current_thread(), store))
+            self.local.store = store
+        return store
+
+
+"""Registry that is used by the Web server, the API, and the index."""
+registry = MetricsRegistry()
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def format_labels(labels):
+    """Format a tuple of (label, value) pairs for the exposition format.
+
+    Parameters
+    ----------
+    labels: tuple
+        Tuple of (label, value) pairs
+
+    Returns
+    -------
+    string
+    """
+    if len(labels) == 0:
+        return ''
+    pairs = list()
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n')
+        pairs.append(key + '="' + value.replace('"', '\\"') + '"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def format_value(value):
+    """Format a sample value for the exposition format.
+
+    Parameters
+    ----------
+    value: int or float
+        Sample value
+
+    Returns
+    -------
+    string
+    """
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value)
+
+
+def observe_reload(start, result):
+    """Record a package index reload that started at the given time.
+
+    Parameters
+    ----------
+    start: float
+        Start time as returned by time.perf_counter
+    result: string
+        Result of the reload ('success' or 'error')
+    """
+    labels = (('result', result),)
+    registry.increment(INDEX_RELOADS, labels)
+    registry.observe(
+        INDEX_RELOAD_DURATION,
+        labels,
+        time.perf_counter() - start
+    )
+
+
+def observe_stage(stage, start):
+    """Record the duration of a processing stage that started at the given
+    time.
+
+    Parameters
+    ----------
+    stage: string
+        Stage name
+    start: float
+        Start time as returned by time.perf_counter
+    """
+    registry.observe(
+        STAGE_DURATION,
+        (('stage', stage),),
+        time.perf_counter() - start
+    )
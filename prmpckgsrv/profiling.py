@@ -0,0 +1,268 @@
+"""prm Package Web Service API - Request profiling
+
+Opt-in profiler for individual requests. A request is profiled if it carries
+the profiling header with the configured secret value or if it is drawn by the
+sampling rate. Profiled requests are run under cProfile.
+
+The profiler has two modes:
+
+- dump: The profile of each profiled request is written to a file in the
+  profile directory. File names contain the request route, the package query,
+  and the request duration. Profiles can be inspected using pstats. Only the
+  most recent profile files are kept. Older files are removed.
+- aggregate: Only the profiles of the slowest requests are kept. The report
+  of the top-N slowest requests (with the functions that they spent the most
+  time in) is rewritten whenever the list of slowest requests changes.
+
+The profiler is used by the Web server only if profiling is enabled in the
+configuration. Requests are not affected otherwise.
+"""
+
+import cProfile
+import collections
+import datetime as dt
+import hmac
+import io
+import itertools
+import os
+import pstats
+import random
+import re
+import threading
+
+
+"""Profiler modes."""
+MODE_AGGREGATE = 'aggregate'
+MODE_DUMP = 'dump'
+
+"""Suffix of profile files in dump mode."""
+PROFILE_SUFFIX = '.prof'
+
+"""Name of the report file for the slowest requests in aggregate mode."""
+REPORT_FILE = 'slowest.txt'
+
+"""Number of functions that are listed for each request in the report."""
+REPORT_FUNCTIONS = 25
+
+
+class RequestProfiler(object):
+    """Profiler for sampled requests.
+
+    Attributes
+    ----------
+    directory: string
+        Directory for profile files and the report
+    files: collections.deque
+        Paths of the profile files in dump mode, oldest first
+    header: string
+        Name of the request header that enables profiling for a request
+    max_files: int
+        Maximum number of profile files that are kept in dump mode
+    mode: string
+        Profiler mode (dump or aggregate)
+    rate: float
+        Fraction of requests that are profiled
+    secret: string
+        Value of the profiling header that enables profiling
+    top: int
+        Number of slowest requests that are kept in aggregate mode
+    """
+    def __init__(self, directory, rate=0, header=None, secret=None, mode=MODE_DUMP, top=10, max_files=100):
+        """Initialize the profiler. The profile directory is created if it
+        does not exist. Raises ValueError if the mode or the sampling rate is
+        not valid, or if a profiling header is given without a secret.
+
+        Profile files that already exist in the directory count towards the
+        maximum number of files.
+
+        Parameters
+        ----------
+        directory: string
+            Directory for profile files and the report
+        rate: float, optional
+            Fraction of requests that are profiled (between 0 and 1)
+        header: string, optional
+            Name of the request header that enables profiling for a request
+        secret: string, optional
+            Value of the profiling header that enables profiling. Required if
+            a header is given.
+        mode: string, optional
+            Profiler mode (dump or aggregate)
+        top: int, optional
+            Number of slowest requests that are kept in aggregate mode
+        max_files: int, optional
+            Maximum number of profile files that are kept in dump mode
+        """
+        if not mode in [MODE_AGGREGATE, MODE_DUMP]:
+            raise ValueError('unknown profiler mode \'' + str(mode) + '\'')
+        if rate < 0 or rate > 1:
+            raise ValueError('invalid profiling rate \'' + str(rate) + '\'')
+        if not header is None and not secret:
+            raise ValueError('profiling header requires a secret')
+        if max_files < 1:
+            raise ValueError(
+                'invalid number of profile files \'' + str(max_files) + '\''
+            )
+        self.directory = os.path.abspath(directory)
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self.rate = rate
+        self.header = header
+        self.secret = secret
+        self.mode = mode
+        self.top = top
+        self.max_files = max_files
+        # File names start with the creation time
+        self.files = collections.deque([
+            os.path.join(self.directory, filename)
+                for filename in sorted(os.listdir(self.directory))
+                    if filename.endswith(PROFILE_SUFFIX)
+        ])
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        # List of (duration, timestamp, route, package query, statistics)
+        # tuples for the slowest requests, sorted by decreasing duration
+        self.slowest = list()
+
+    def finish(self, profile, route, package_query, duration):
+        """Stop the profiler of a request and write or aggregate the profile.
+
+        Parameters
+        ----------
+        profile: cProfile.Profile
+            Profiler that was returned by start
+        route: string
+            Route of the request
+        package_query: string
+            Package query of the request (may be None)
+        duration: float
+            Request duration in seconds
+        """
+        profile.disable()
+        timestamp = dt.datetime.now(dt.timezone.utc)
+        if self.mode == MODE_DUMP:
+            filename = '-'.join([
+                timestamp.strftime('%Y%m%dT%H%M%S'),
+                str(next(self.counter)),
+                profile_tag(route, package_query),
+                str(int(duration * 1000)) + 'ms'
+            ])
+            profile_file = os.path.join(self.directory, filename + PROFILE_SUFFIX)
+            profile.dump_stats(profile_file)
+            with self.lock:
+                self.files.append(profile_file)
+                removed = list()
+                while len(self.files) > self.max_files:
+                    removed.append(self.files.popleft())
+            for profile_file in removed:
+                try:
+                    os.remove(profile_file)
+                except FileNotFoundError:
+                    pass
+            return
+        with self.lock:
+            if len(self.slowest) >= self.top and duration <= self.slowest[-1][0]:
+                return
+        # Format the statistics without holding the lock
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(REPORT_FUNCTIONS)
+        entry = (
+            duration,
+            timestamp.isoformat(),
+            route,
+            package_query,
+            stream.getvalue()
+        )
+        with self.lock:
+            self.slowest.append(entry)
+            self.slowest.sort(key=lambda e: e[0], reverse=True)
+            del self.slowest[self.top:]
+            if any([e is entry for e in self.slowest]):
+                self.write_report()
+
+    def is_sampled(self, headers):
+        """Test whether a request with the given headers is profiled. Requests
+        that carry the profiling header are only profiled if the header value
+        equals the secret.
+
+        Parameters
+        ----------
+        headers: dict
+            Request headers
+
+        Returns
+        -------
+        bool
+        """
+        if not self.header is None:
+            value = headers.get(self.header)
+            if not value is None and hmac.compare_digest(
+                value.encode('utf-8'),
+                self.secret.encode('utf-8')
+            ):
+                return True
+        return self.rate > 0 and random.random() < self.rate
+
+    def start(self):
+        """Start profiling the current request. Returns None if the profiler
+        cannot be enabled, e.g., because another profiler is active.
+
+        Returns
+        -------
+        cProfile.Profile
+        """
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        return profile
+
+    def write_report(self):
+        """Write the report for the slowest requests. The report file is
+        replaced atomically. Expects the caller to hold the profiler lock.
+        """
+        lines = list()
+        for rank, entry in enumerate(self.slowest):
+            duration, timestamp, route, package_query, statistics = entry
+            title = str(rank + 1) + '. ' + route
+            if not package_query is None:
+                title += ' (' + package_query + ')'
+            lines.append(title)
+            lines.append(
+                '   ' + ('%.2f ms' % (duration * 1000)) + ' at ' + timestamp
+            )
+            lines.append(statistics)
+        report_file = os.path.join(self.directory, REPORT_FILE)
+        with open(report_file + '.tmp', 'w') as f:
+            f.write('\n'.join(lines))
+        os.replace(report_file + '.tmp', report_file)
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def profile_tag(route, package_query):
+    """Get a tag for the route and package query of a request that can be
+    used in file names.
+
+    Parameters
+    ----------
+    route: string
+        Route of the request
+    package_query: string
+        Package query of the request (may be None)
+
+    Returns
+    -------
+    string
+    """
+    tag = route.strip('/')
+    if not package_query is None:
+        tag = tag.split('/')[0] + '-' + package_query
+    tag = re.sub('[^A-Za-z0-9._@-]+', '_', tag).strip('_')
+    if tag == '':
+        tag = 'root'
+    return tag[:100]
@@ -0,0 +1,532 @@
+"""prm Package Web Service API - Module search
+
+Inverted index over the tokens in module names, folders, and descriptions of
+all packages in an index snapshot. Tokens are lower-case alphanumeric words.
+Query terms match all tokens that they are a prefix of. Exact matches and
+matches in module names rank higher than prefix matches and matches in
+folders or descriptions.
+
+Each module is identified by an integer document identifier. The modules of a
+package have consecutive identifiers starting at the base identifier of the
+package. For each token the index keeps the matching documents grouped by
+weight and sorted by identifier. Top results for single-term queries are read
+off these groups without scoring all matching modules.
+
+The index for a snapshot is derived from the index of a previous snapshot.
+Only the packages whose modules have changed are tokenized again and only
+their postings are replaced. Changed packages are assigned new base
+identifiers that are larger than all existing identifiers. Their documents
+are therefore appended to the existing groups without re-sorting.
+"""
+
+import bisect
+import heapq
+import logging
+import re
+
+
+"""Weight of a token depending on the module element that it occurs in."""
+WEIGHT_NAME = 3
+WEIGHT_FOLDER = 2
+WEIGHT_DESCRIPTION = 1
+
+"""Maximum number of tokens that a query term is expanded to. The term itself
+is always included if it is a token. Longer terms are needed to match tokens
+that are beyond the limit in lexical order."""
+MAX_EXPANSIONS = 128
+
+"""Regular expression for tokens."""
+TOKEN_PATTERN = re.compile('[a-z0-9]+')
+
+
+class PackageSearchIndex(object):
+    """Tokens of the modules in a single package. The index is immutable and
+    can be shared by the search indexes of different snapshots as long as the
+    package modules remain unchanged.
+
+    Attributes
+    ----------
+    entries: list(tuple)
+        List of (name, folder, description) triples for the package modules
+        in package file order
+    key: tuple
+        Key of the module source that the index was created from
+    name: string
+        Unique package name
+    postings: dict(list(tuple))
+        List of (entry position, weight) pairs keyed by token
+    """
+    def __init__(self, name, key, modules):
+        """Tokenize the given list of package modules.
+
+        Parameters
+        ----------
+        name: string
+            Unique package name
+        key: tuple
+            Key of the module source that the modules were read from
+        modules: list(tuple)
+            List of (name, folder, description) triples for the package
+            modules in package file order
+        """
+        self.name = name
+        self.key = key
+        self.entries = list()
+        self.postings = dict()
+        for module_name, folder, description in modules:
+            if not description is None:
+                description = str(description)
+            pos = len(self.entries)
+            self.entries.append((module_name, folder, description))
+            weights = dict()
+            for text, weight in [
+                (description, WEIGHT_DESCRIPTION),
+                (folder, WEIGHT_FOLDER),
+                (module_name, WEIGHT_NAME)
+            ]:
+                for token in tokenize(text):
+                    weights[token] = max(weight, weights.get(token, 0))
+            for token, weight in weights.items():
+                self.postings.setdefault(token, list()).append((pos, weight))
+
+
+class SearchIndex(object):
+    """Inverted index over the modules of all packages in an index snapshot.
+    The index is immutable once created.
+
+    Attributes
+    ----------
+    bases: dict(int)
+        Base document identifier for each package keyed by the package name
+    digest: string
+        Digest of the snapshot that the index was created for
+    documents: dict(dict(tuple))
+        For each token, a dictionary that maps a weight to the sorted tuple of
+        identifiers of the documents that contain the token with that weight
+    next_base: int
+        Base document identifier for the next added package
+    offsets: list(tuple)
+        List of (base identifier, package name) pairs sorted by identifier.
+        Packages without modules are not included since their base identifier
+        equals the base identifier of the next package.
+    packages: dict(prmpckgsrv.search.PackageSearchIndex)
+        Search index for each package keyed by the package name
+    tokens: list(string)
+        Sorted list of all tokens in the index
+    weights: dict(dict(int))
+        For each token, the weight of the token keyed by the identifiers of
+        the documents that contain the token
+    """
+    def __init__(self, snapshot, previous=None, logger=None):
+        """Create the index for the given snapshot. Reads the modules of all
+        packages whose search index cannot be taken from the previous index.
+        Modules are read without adding them to the module cache of the
+        snapshot. Packages whose modules cannot be read are logged and left
+        out of the index. They are read again by the index for the next
+        snapshot.
+
+        Parameters
+        ----------
+        snapshot: prmpckgsrv.index.IndexSnapshot
+            Index snapshot
+        previous: prmpckgsrv.search.SearchIndex, optional
+            Search index for a previous snapshot
+        logger: logging.Logger, optional
+            Logger for packages whose modules cannot be read
+        """
+        # Imported here since prmpckgsrv.index imports this module
+        from prmpckgsrv.index import PackageLoadError
+        if logger is None:
+            logger = logging.getLogger(__name__)
+        self.digest = snapshot.digest
+        self.packages = dict()
+        self.bases = dict()
+        if not previous is None:
+            self.next_base = previous.next_base
+            self.weights = dict(previous.weights)
+            self.documents = dict(previous.documents)
+        else:
+            self.next_base = 0
+            self.weights = dict()
+            self.documents = dict()
+        added = list()
+        for name, source in snapshot.sources.items():
+            package = None
+            if not previous is None:
+                package = previous.packages.get(name)
+            if not package is None and package.key == source.key:
+                self.packages[name] = package
+                self.bases[name] = previous.bases[name]
+                continue
+            try:
+                entries = snapshot.get_module_entries(name)
+            except PackageLoadError as ex:
+                logger.error(
+                    'cannot index modules of package \'' + name + '\': ' +
+                    str(ex)
+                )
+                continue
+            package = PackageSearchIndex(name, source.key, entries)
+            self.packages[name] = package
+            self.bases[name] = self.next_base
+            added.append((self.next_base, package))
+            self.next_base += len(package.entries)
+        # Modifications are applied to mutable copies of the postings of the
+        # affected tokens. The postings of all other tokens are shared with
+        # the previous index.
+        changes = dict()
+        if not previous is None:
+            for name, package in previous.packages.items():
+                if self.packages.get(name) is package:
+                    continue
+                base = previous.bases[name]
+                end = base + len(package.entries)
+                for token in package.postings:
+                    if not token in changes:
+                        changes[token] = PostingChange(
+                            previous.weights[token],
+                            previous.documents[token]
+                        )
+                    changes[token].removed.append((base, end))
+        for base, package in added:
+            for token, entries in package.postings.items():
+                if not token in changes:
+                    changes[token] = PostingChange(
+                        self.weights.get(token),
+                        self.documents.get(token)
+                    )
+                changes[token].added.extend([
+                    (base + pos, weight) for pos, weight in entries
+                ])
+        modified_tokens = previous is None
+        for token, change in changes.items():
+            weights, documents = change.apply()
+            if len(weights) > 0:
+                if not token in self.weights:
+                    modified_tokens = True
+                self.weights[token] = weights
+                self.documents[token] = documents
+            else:
+                modified_tokens = True
+                del self.weights[token]
+                del self.documents[token]
+        if modified_tokens:
+            self.tokens = sorted(self.weights.keys())
+        else:
+            self.tokens = previous.tokens
+        self.offsets = sorted([
+            (base, name) for name, base in self.bases.items()
+                if len(self.packages[name].entries) > 0
+        ])
+
+    def get_entry(self, doc):
+        """Get the package name and module entry for a document identifier.
+
+        Parameters
+        ----------
+        doc: int
+            Document identifier
+
+        Returns
+        -------
+        string, tuple
+        """
+        # The pair (doc + 1,) sorts after all pairs with a base identifier
+        # that is less than or equal to the document identifier.
+        pos = bisect.bisect_left(self.offsets, (doc + 1,)) - 1
+        base, name = self.offsets[pos]
+        return name, self.packages[name].entries[doc - base]
+
+    def get_matches(self, term):
+        """Get the tokens that start with the given term. Returns a list of
+        (token, boost) pairs. The boost is 2 for the token that equals the
+        term and 1 for all others. At most MAX_EXPANSIONS tokens are returned.
+
+        Parameters
+        ----------
+        term: string
+            Query term
+
+        Returns
+        -------
+        list(tuple)
+        """
+        start = bisect.bisect_left(self.tokens, term)
+        # All tokens that start with the term are smaller than the term with
+        # its last character incremented.
+        end = bisect.bisect_left(
+            self.tokens,
+            term[:-1] + chr(ord(term[-1]) + 1),
+            lo=start,
+            hi=min(start + MAX_EXPANSIONS, len(self.tokens))
+        )
+        return [
+            (token, 2 if token == term else 1)
+                for token in self.tokens[start:end]
+        ]
+
+    def search(self, query, limit=20):
+        """Get modules that match all terms in the given query. Each query
+        term matches the tokens that it is a prefix of. The score of a module
+        for a term is the weight of the best matching token. Exact matches
+        count twice as much as prefix matches. The module score is the sum of
+        the scores for all terms. Results are sorted by decreasing score.
+
+        Parameters
+        ----------
+        query: string
+            Search query
+        limit: int, optional
+            Maximum number of results
+
+        Returns
+        -------
+        list(tuple)
+            List of (package name, (name, folder, description), score) triples
+        """
+        terms = list()
+        for term in sorted(set(tokenize(query))):
+            matches = self.get_matches(term)
+            if len(matches) == 0:
+                return list()
+            terms.append(matches)
+        if len(terms) == 0:
+            return list()
+        elif len(terms) == 1:
+            ranked = self.top_documents(terms[0], limit)
+        else:
+            ranked = self.score_documents(terms, limit)
+        results = list()
+        for doc, score in ranked:
+            name, entry = self.get_entry(doc)
+            results.append((name, entry, score))
+        return results
+
+    def score_documents(self, terms, limit):
+        """Get the best documents that match all of the given query terms.
+        Candidates are the documents that match the term with the fewest
+        matching documents. Candidates are scored in order of decreasing score
+        for that term. Scoring stops once the remaining candidates cannot
+        reach the score of the current results.
+
+        Parameters
+        ----------
+        terms: list(list(tuple))
+            List of (token, boost) pairs for each query term
+        limit: int
+            Maximum number of results
+
+        Returns
+        -------
+        list(tuple)
+            List of (document identifier, score) pairs
+        """
+        terms = sorted(
+            terms,
+            key=lambda t: sum([len(self.weights[token]) for token, _ in t])
+        )
+        # Weights of the other terms and the maximum score that the other
+        # terms can add to the score of a candidate
+        others = list()
+        max_score = 0
+        for term in terms[1:]:
+            if len(term) > 16:
+                # Avoid per-candidate lookups for terms with many tokens
+                others.append([(term_scores(self.weights, term), 1)])
+            else:
+                others.append([(self.weights[token], boost) for token, boost in term])
+            max_score += max([
+                weight * boost
+                    for token, boost in term
+                        for weight in self.documents[token]
+            ])
+        groups = self.score_groups(terms[0])
+        results = list()
+        seen = set()
+        for score in sorted(groups.keys(), reverse=True):
+            if len(results) >= limit and score + max_score < results[0][0]:
+                break
+            for docs in groups[score]:
+                for doc in docs:
+                    if doc in seen:
+                        continue
+                    seen.add(doc)
+                    total = score
+                    for term_weights in others:
+                        best = 0
+                        for weights, boost in term_weights:
+                            weight = weights.get(doc)
+                            if not weight is None and weight * boost > best:
+                                best = weight * boost
+                        if best == 0:
+                            break
+                        total += best
+                    else:
+                        # Keep the best results in a heap whose first element
+                        # is the worst result
+                        if len(results) < limit:
+                            heapq.heappush(results, (total, -doc))
+                        elif (total, -doc) > results[0]:
+                            heapq.heapreplace(results, (total, -doc))
+        return [
+            (-doc, score)
+                for score, doc in sorted(results, reverse=True)
+        ]
+
+    def score_groups(self, term):
+        """Group the documents that match a query term by their score. The
+        result maps each score to a list of sorted document identifier tuples.
+
+        Parameters
+        ----------
+        term: list(tuple)
+            List of (token, boost) pairs for the query term
+
+        Returns
+        -------
+        dict(list(tuple))
+        """
+        groups = dict()
+        for token, boost in term:
+            for weight, docs in self.documents[token].items():
+                groups.setdefault(weight * boost, list()).append(docs)
+        return groups
+
+    def top_documents(self, term, limit):
+        """Get the best documents for a single query term. Documents are read
+        in order of decreasing score from the weight groups of the matching
+        tokens. Only as many documents as needed are read.
+
+        Parameters
+        ----------
+        term: list(tuple)
+            List of (token, boost) pairs for the query term
+        limit: int
+            Maximum number of results
+
+        Returns
+        -------
+        list(tuple)
+            List of (document identifier, score) pairs
+        """
+        groups = self.score_groups(term)
+        results = list()
+        seen = set()
+        for score in sorted(groups.keys(), reverse=True):
+            # A document that has been seen before had a higher score for a
+            # different token
+            for doc in heapq.merge(*groups[score]):
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                results.append((doc, score))
+                if len(results) >= limit:
+                    return results
+        return results
+
+
+class PostingChange(object):
+    """Modification of the postings for a single token. Documents are removed
+    by ranges of identifiers. Added documents have identifiers that are larger
+    than those of all existing documents.
+
+    Attributes
+    ----------
+    added: list(tuple)
+        List of (document identifier, weight) pairs in order of identifiers
+    documents: dict(tuple)
+        Existing documents grouped by weight. May be None.
+    removed: list(tuple)
+        List of (first identifier, identifier after last) ranges
+    weights: dict(int)
+        Weights of the existing documents. May be None.
+    """
+    def __init__(self, weights, documents):
+        """Initialize the existing postings.
+
+        Parameters
+        ----------
+        weights: dict(int)
+            Weights of the existing documents. May be None.
+        documents: dict(tuple)
+            Existing documents grouped by weight. May be None.
+        """
+        self.weights = weights
+        self.documents = documents
+        self.added = list()
+        self.removed = list()
+
+    def apply(self):
+        """Get the modified postings.
+
+        Returns
+        -------
+        dict(int), dict(tuple)
+        """
+        weights = dict()
+        documents = dict()
+        if not self.weights is None:
+            if len(self.removed) == 0:
+                weights = dict(self.weights)
+                documents = {w: list(docs) for w, docs in self.documents.items()}
+            else:
+                keep = lambda doc: not any([b <= doc < e for b, e in self.removed])
+                weights = {
+                    doc: w for doc, w in self.weights.items() if keep(doc)
+                }
+                documents = {
+                    w: [doc for doc in docs if keep(doc)]
+                        for w, docs in self.documents.items()
+                }
+        for doc, w in self.added:
+            weights[doc] = w
+            documents.setdefault(w, list()).append(doc)
+        documents = {w: tuple(docs) for w, docs in documents.items() if len(docs) > 0}
+        return weights, documents
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def term_scores(weights, term):
+    """Get the scores of all documents that match a query term.
+
+    Parameters
+    ----------
+    weights: dict(dict(int))
+        Document weights keyed by token
+    term: list(tuple)
+        List of (token, boost) pairs for the query term
+
+    Returns
+    -------
+    dict(int)
+    """
+    if len(term) == 1:
+        token, boost = term[0]
+        return {doc: w * boost for doc, w in weights[token].items()}
+    scores = dict()
+    for token, boost in term:
+        for doc, w in weights[token].items():
+            if scores.get(doc, 0) < w * boost:
+                scores[doc] = w * boost
+    return scores
+
+
+def tokenize(text):
+    """Get the list of lower-case alphanumeric tokens in a text. The result is
+    empty if the text is None.
+
+    Parameters
+    ----------
+    text: string
+        Text to tokenize
+
+    Returns
+    -------
+    list(string)
+    """
+    if text is None:
+        return list()
+    return TOKEN_PATTERN.findall(text.lower())
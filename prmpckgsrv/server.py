@@ -5,12 +5,25 @@ Implements the Web servivce API as documented in doc/api/v1/prm-pckgsrv.yaml.
 The online documentation is available at:
 http://cds-dc.cims.nyu.edu/prm/package-server/
 """
-from flask import Flask, jsonify, make_response, request
+from flask import Flask, Response, g, jsonify, make_response, request
+from flask import send_from_directory
 from flask_cors import CORS
+from werkzeug.exceptions import NotFound
+import calendar
+import datetime as dt
+import json
 import os
-import yaml
+import time
+from urllib.parse import quote, urlencode
 
 from prmpckgsrv.api import PrmPackageServer
+from prmpckgsrv.cache import ResponseCache
+from prmpckgsrv.index import PackageLoadError
+from prmpckgsrv.logutil import configure_logging
+from prmpckgsrv.metrics import STAGE_SERIALIZE, observe_stage
+from prmpckgsrv.profiling import RequestProfiler
+import prmpckgsrv.metrics as metrics
+from prmpckgsrv.yamlutil import load_yaml, yaml_backend
 import prmpckgsrv.const as const
 
 
@@ -31,9 +44,46 @@ default values (as defined below) are used.
 These are the valid parameter keys:
 
 - server.apppath : Application path part of the Url to access the app
+- server.batch.maxqueries : Maximum number of package queries in a batch
+  request
 - server.url : Base Url of the server where the app is running
 - server.port : Port the server is running on
-- server.logdir : Path to the log file directory
+- server.logdir : Path to the log file directory. If set, errors are written
+  to an error log and each request is written to an access log (one Json
+  object per line) in the directory. All log records are written by a
+  background thread instead of the request threads. Worker processes append
+  to the same files. The files are not rotated by the server and should be
+  rotated externally (e.g., logrotate). Logging is configured when this module
+  is imported. Under WSGI servers that fork workers after loading the app
+  (e.g., gunicorn --preload) the module has to be imported in each worker
+  instead, since the log listener thread does not survive the fork.
+- server.profile.rate : Fraction of requests that are profiled using cProfile
+  (default 0). Profiling requires the log directory. Profiles are written to
+  the sub-directory 'profiles' of the log directory.
+- server.profile.header : Name of a request header. Requests that carry the
+  header with the value of server.profile.secret are always profiled
+  (optional).
+- server.profile.secret : Value of the profiling header that enables
+  profiling. Required if server.profile.header is set.
+- server.profile.mode : 'dump' writes the profile of each profiled request to
+  a file whose name contains the route, the package query, and the request
+  duration. 'aggregate' keeps the profiles of the slowest requests only and
+  writes them to the report file 'slowest.txt' (default 'dump').
+- server.profile.maxfiles : Maximum number of profile files that each server
+  process keeps in dump mode. The oldest files are removed (default 100).
+- server.profile.top : Number of slowest requests that are kept in aggregate
+  mode (default 10)
+- server.cache.maxage : Value (in seconds) of the max-age directive in the
+  Cache-Control header of package responses
+- server.cache.maxbytes : Approximate memory budget (in bytes) for encoded
+  responses. Responses are kept in a least-recently-used cache. The cache is
+  unbounded if the value is 0.
+- server.metrics : Flag to switch the /metrics route and the recording of
+  per-route request metrics on/off (default True)
+- server.search.limit : Default number of results for module searches
+- server.stream.threshold : Module listings with at least this many modules
+  are streamed using chunked transfer encoding instead of being encoded (and
+  cached) as a whole. Streaming is disabled if the value is 0.
 
 - app.name : Application (short) name for the service description
 - app.debug : Flag to switch debugging on/off
@@ -43,9 +93,44 @@ These are the valid parameter keys:
 - download.urlprefix: Url prefix for modules that have download task. In modules
   specifications all path expressions are expected to be relative to the
   packages directory of the file server that serves the files.
+- download.directory: Directory that contains the module artifacts (optional).
+  If set, the server serves the artifacts itself at /downloads and the sources
+  of download tasks refer to this route instead of download.urlprefix. Files
+  are sent using the file wrapper of the WSGI server (zero-copy sendfile where
+  supported). Range requests and conditional requests are supported.
 
 - package.index: File (in Yaml format) that contains the list of available
-  packages on the server.
+  packages on the server. The value may also be a directory or a list of files
+  and directories. All Yaml files in a directory are index files. Each index
+  file is read and validated independently (as a shard) and all shards are
+  merged into a single package index. Package names that are defined by more
+  than one shard are logged as conflicts and the first shard in the list wins.
+  A shard that is not valid is logged and ignored while the other shards
+  remain available.
+- package.compiled: Compiled index file that is created by prm-pckgsrv-compile.
+  Defaults to the package index file name with suffix '.bin'. The compiled file
+  is used instead of the Yaml files as long as it is current. Can only be set
+  for a single index file. Each shard uses its own default compiled file.
+- package.cache.maxbytes: Approximate memory budget (in bytes) for package
+  modules. Modules are loaded when a package is first queried and kept in a
+  least-recently-used cache. The cache is unbounded if the value is 0.
+- package.load.workers: Number of workers that read package files in parallel
+  when the package index is loaded (default 1)
+- package.load.processes: Use a process pool instead of a thread pool to read
+  package files (default False)
+- package.shared: Share the package index between the worker processes of
+  the server (default False). The index is read by a single process and
+  published as an index generation in the compiled index file. All processes
+  memory-map the generation and read the Json encodings of modules from the
+  shared mapping. Module tries, package descriptors, and the search index are
+  still built by every process.
+  Modified index files result in a new generation that replaces the previous
+  one atomically. The compiled file must be writable by the server.
+- package.watch.interval: Polling interval (in seconds) for the background
+  index watcher. If greater than zero, modified index and package files are
+  reloaded in the background instead of on the request path. Modifications
+  that result in an invalid index are logged and the previous index remains
+  in use.
 """
 # Set default configuration parameter
 config = dict(const.DEFAULT_CONFIG)
@@ -53,10 +138,10 @@ config_file = os.getenv(const.ENV_CONFIG)
 obj = None
 if not config_file is None and os.path.isfile(config_file):
     with open(config_file, 'r') as f:
-        obj = yaml.load(f.read())
+        obj = load_yaml(f)
 elif os.path.isfile('./config.yaml'):
     with open('./config.yaml', 'r') as f:
-        obj = yaml.load(f.read())
+        obj = load_yaml(f)
 # Overwrite default configuration values if obj is not None
 if not obj is None:
     for prop in  obj['properties']:
@@ -73,7 +158,134 @@ app.config['APPLICATION_ROOT'] = config[const.SERVER_APP_PATH]
 app.config['DEBUG'] = config[const.APP_DEBUG]
 CORS(app)
 
-api = PrmPackageServer(config)
+# Route log records through a queue to a background listener. This applies to
+# the development server and to deployments under a WSGI server. The listener
+# thread must be started in the worker process, i.e., after a preload fork.
+log_listeners, access_logger = configure_logging(
+    app.logger,
+    log_dir=config.get(const.SERVER_LOG_DIR)
+)
+app.logger.info('using ' + yaml_backend() + ' Yaml parser')
+api = PrmPackageServer(config, logger=app.logger)
+
+# Cache for encoded package responses. The cache is invalidated whenever the
+# package index snapshot changes.
+cache = ResponseCache(config[const.SERVER_CACHE_MAXBYTES])
+
+# Profiler for sampled requests. Profiling is enabled if a sampling rate or a
+# profiling header is configured.
+profiler = None
+profile_header = config.get(const.SERVER_PROFILE_HEADER)
+if config[const.SERVER_PROFILE_RATE] > 0 or not profile_header is None:
+    if not const.SERVER_LOG_DIR in config:
+        raise ValueError(
+            'request profiling requires \'' + const.SERVER_LOG_DIR + '\''
+        )
+    profiler = RequestProfiler(
+        os.path.join(os.path.abspath(config[const.SERVER_LOG_DIR]), 'profiles'),
+        rate=config[const.SERVER_PROFILE_RATE],
+        header=profile_header,
+        secret=config.get(const.SERVER_PROFILE_SECRET),
+        mode=config[const.SERVER_PROFILE_MODE],
+        top=config[const.SERVER_PROFILE_TOP],
+        max_files=config[const.SERVER_PROFILE_MAXFILES]
+    )
+
+
+
+# ------------------------------------------------------------------------------
+#
+# Request Metrics and Access Log
+#
+# ------------------------------------------------------------------------------
+
+if config[const.SERVER_METRICS] or not access_logger is None:
+    @app.before_request
+    def start_request_timer():
+        """Record the start time of the request."""
+        g.request_start = time.perf_counter()
+
+if config[const.SERVER_METRICS]:
+    @app.after_request
+    def record_request_metrics(response):
+        """Record the request count and latency for the route of the
+        request. The latency of streamed responses does not include the time
+        for generating the response body."""
+        start = g.get('request_start')
+        if not start is None:
+            route = request_route()
+            metrics.registry.increment(
+                metrics.HTTP_REQUESTS,
+                (
+                    ('route', route),
+                    ('method', request.method),
+                    ('status', str(response.status_code))
+                )
+            )
+            metrics.registry.observe(
+                metrics.HTTP_REQUEST_DURATION,
+                (('route', route),),
+                time.perf_counter() - start
+            )
+        return response
+
+
+if not access_logger is None:
+    @app.after_request
+    def log_request(response):
+        """Write the access log record for the request. The record is
+        formatted and written by the log listener thread."""
+        start = g.get('request_start')
+        duration = None
+        if not start is None:
+            duration = round((time.perf_counter() - start) * 1000, 3)
+        access_logger.info(
+            request.method + ' ' + request.path,
+            extra={
+                'access': {
+                    'remote': request.remote_addr,
+                    'method': request.method,
+                    'path': request.full_path.rstrip('?'),
+                    'route': request_route(),
+                    'status': response.status_code,
+                    'bytes': response.content_length,
+                    'durationMs': duration
+                }
+            }
+        )
+        return response
+
+
+# ------------------------------------------------------------------------------
+#
+# Request Profiling
+#
+# ------------------------------------------------------------------------------
+
+if not profiler is None:
+    @app.before_request
+    def start_profiler():
+        """Start profiling the request if it is sampled."""
+        if profiler.is_sampled(request.headers):
+            g.profile_start = time.perf_counter()
+            g.profile = profiler.start()
+
+    @app.teardown_request
+    def stop_profiler(exception):
+        """Stop profiling the request and write or aggregate the profile.
+        The profile does not include the time for generating the body of
+        streamed responses."""
+        profile = g.pop('profile', None)
+        if not profile is None:
+            package_query = None
+            if not request.view_args is None:
+                package_query = request.view_args.get('package_query')
+            profiler.finish(
+                profile,
+                request_route(),
+                package_query,
+                time.perf_counter() - g.profile_start
+            )
 
 
 # ------------------------------------------------------------------------------
@@ -98,19 +310,445 @@ def service_overview():
 # ------------------------------------------------------------------------------
 @app.route('/packages')
 def list_packages():
-    """Get a listing of packages that are available on the server."""
-    return jsonify(api.list_packages())
+    """Get a listing of packages that are available on the server. The
+    listing can be paginated (limit, cursor) and restricted to a list of
+    fields (fields). If a timestamp is given (since) only packages that are
+    newer than the timestamp are listed."""
+    snapshot = api.get_snapshot()
+    args = query_arguments()
+    since = request.args.get('since')
+    if not since is None:
+        args['since'] = parse_timestamp(since)
+    return cached_json_response(
+        snapshot,
+        argument_key('packages', args),
+        api.get_timestamp(snapshot=snapshot),
+        lambda: encode_json(
+            api.list_packages(snapshot=snapshot, **args)
+        )
+    )
+
+
+@app.route('/packages:batch', methods=['POST'])
+def batch_package_modules():
+    """Resolve a list of package queries in a single request. The request body
+    is a Json object with element 'queries' that contains the list of package
+    queries. All queries are answered from the same index snapshot. Unknown
+    packages are reported per query instead of failing the whole request."""
+    obj = request.get_json(silent=True)
+    if not isinstance(obj, dict) or not isinstance(obj.get('queries'), list):
+        raise InvalidRequest('expected Json object with list of queries')
+    queries = obj['queries']
+    for query in queries:
+        if not isinstance(query, str) or query == '':
+            raise InvalidRequest('invalid package query \'' + str(query) + '\'')
+    if len(queries) > config[const.SERVER_BATCH_MAXQUERIES]:
+        raise InvalidRequest(
+            'too many queries (max. ' +
+            str(config[const.SERVER_BATCH_MAXQUERIES]) + ')'
+        )
+    return Response(
+        api.encode_batch_modules(queries),
+        mimetype='application/json'
+    )
 
 
 @app.route('/packages/<string:package_query>')
 def get_package_modules(package_query):
     """Retrieve descriptors for all modules that match the given package query.
     Queries are path expressions (using '.' as path delimiter) starting with
-    a package name."""
-    result = api.get_package_modules(package_query)
-    if not result is None:
-        return jsonify(result)
-    raise ResourceNotFound('unknown package or module \'' + package_query + '\'')
+    a package name and an optional version (name@version). The result can be
+    paginated (limit, cursor) and restricted to a list of fields (fields)."""
+    snapshot = api.get_snapshot()
+    args = query_arguments()
+    timestamp = api.get_timestamp(package_query, snapshot=snapshot)
+    if timestamp is None:
+        raise ResourceNotFound(
+            'unknown package or module \'' + package_query + '\''
+        )
+    key = argument_key('packages/' + package_query, args)
+    if len(args) > 0:
+        # Paginated and projected results are encoded from their dictionary
+        # serialization.
+        return cached_json_response(
+            snapshot,
+            key,
+            timestamp,
+            lambda: encode_json(
+                api.get_package_modules(package_query, snapshot=snapshot, **args)
+            )
+        )
+    # Conditional requests and cached responses are answered before the
+    # package modules are accessed. Whether the response is streamed depends
+    # on the number of matching modules.
+    def build():
+        modules = api.find_modules(package_query, snapshot=snapshot)
+        threshold = config[const.SERVER_STREAM_THRESHOLD]
+        if threshold > 0 and len(modules) >= threshold:
+            return api.stream_modules(package_query, modules)
+        return api.encode_modules(package_query, modules)
+    return cached_json_response(snapshot, key, timestamp, build)
+
+
+# ------------------------------------------------------------------------------
+# Downloads
+# ------------------------------------------------------------------------------
+@app.route('/downloads/<path:filename>')
+def download_file(filename):
+    """Download a module artifact from the local download directory. The file
+    is passed to the WSGI server without being read into memory. Responses
+    support Range requests and conditional requests (ETag, Last-Modified)."""
+    if api.download_directory is None:
+        raise ResourceNotFound('downloads are not enabled')
+    try:
+        response = send_from_directory(
+            api.download_directory,
+            filename,
+            conditional=True
+        )
+    except NotFound:
+        raise ResourceNotFound('unknown file \'' + filename + '\'')
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = config[const.SERVER_CACHE_MAXAGE]
+    return response
+
+
+# ------------------------------------------------------------------------------
+# Metrics
+# ------------------------------------------------------------------------------
+@app.route('/metrics')
+def get_metrics():
+    """Get request, loader, and index metrics in the Prometheus text
+    exposition format. Values are aggregated from the metrics of all request
+    threads when the route is called."""
+    if not config[const.SERVER_METRICS]:
+        raise ResourceNotFound('metrics are not enabled')
+    return Response(
+        metrics.registry.render(gauges=metric_gauges()),
+        mimetype='text/plain; version=0.0.4'
+    )
+
+
+# ------------------------------------------------------------------------------
+# Search
+# ------------------------------------------------------------------------------
+@app.route('/search')
+def search_modules():
+    """Search modules by name, folder, and description. The query (q) is a
+    list of terms. Each term matches words that start with the term. The
+    number of results can be limited (limit)."""
+    query = request.args.get('q')
+    if query is None:
+        raise InvalidRequest('missing search query')
+    args = query_arguments()
+    if 'fields' in args or 'cursor' in args:
+        raise InvalidRequest('search supports query and limit only')
+    limit = args.get('limit', config[const.SERVER_SEARCH_LIMIT])
+    snapshot = api.get_snapshot()
+    return cached_json_response(
+        snapshot,
+        argument_key('search', {'q': query, 'limit': limit}),
+        api.get_timestamp(snapshot=snapshot),
+        lambda: encode_json(
+            api.search_modules(query, limit=limit, snapshot=snapshot)
+        )
+    )
+
+
+# ------------------------------------------------------------------------------
+#
+# Helper Methods
+#
+# ------------------------------------------------------------------------------
+
+def argument_key(key, args):
+    """Append the given query arguments to a response cache key. The key and
+    the argument values are escaped so that different requests never result
+    in the same key.
+
+    Parameters
+    ----------
+    key: string
+        Route and path query of the request
+    args: dict
+        Query arguments as returned by query_arguments
+
+    Returns
+    -------
+    string
+    """
+    key = quote(key)
+    if len(args) == 0:
+        return key
+    query = list()
+    for k in sorted(args):
+        if k == 'fields':
+            query.extend([(k, field) for field in args[k]])
+        else:
+            query.append((k, str(args[k])))
+    return key + '?' + urlencode(query)
+
+
+def cached_json_response(snapshot, key, last_modified, build):
+    """Get Json response for the request with the given key. Conditional
+    requests whose entity tag or modification date matches are answered with
+    status 304 without creating the response. Otherwise, the encoded response
+    is taken from the cache or created using the given build function. Raises
+    InvalidRequest if the build function raises a ValueError.
+
+    The build function may return a generator instead of the encoded
+    response. The response body is then generated incrementally and sent
+    using chunked transfer encoding. Streamed responses are not cached.
+
+    Parameters
+    ----------
+    snapshot: prmpckgsrv.index.IndexSnapshot
+        Index snapshot that the response is created from
+    key: string
+        Route and query of the request
+    last_modified: datetime
+        Timestamp of the most recent package that the response depends on
+    build: func
+        Function that returns the Json encoded response or a generator for
+        the Json encoded response
+
+    Returns
+    -------
+    Http response
+    """
+    etag = cache.etag(snapshot, key)
+    if is_not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        body = cache.get(snapshot, key)
+        if body is None:
+            metrics.registry.increment(
+                metrics.RESPONSE_CACHE_REQUESTS,
+                (('result', 'miss'),)
+            )
+            # The API raises ValueError for invalid query arguments. Package
+            # files that cannot be read raise PackageLoadError, which is not
+            # a request error.
+            try:
+                body = build()
+            except ValueError as ex:
+                raise InvalidRequest(str(ex))
+            if not isinstance(body, bytes):
+                response = Response(body, mimetype='application/json')
+                return set_cache_headers(response, etag, last_modified)
+            cache.put(snapshot, key, body)
+        else:
+            metrics.registry.increment(
+                metrics.RESPONSE_CACHE_REQUESTS,
+                (('result', 'hit'),)
+            )
+        response = Response(body, mimetype='application/json')
+    return set_cache_headers(response, etag, last_modified)
+
+
+def metric_gauges():
+    """Get the values of index and cache metrics that are computed when the
+    metrics are collected. Returns a list of (name, labels, value) triples.
+
+    Returns
+    -------
+    list(tuple)
+    """
+    index = api.index_statistics()
+    modules = api.cache_statistics()
+    gauges = [
+        ('prmpckgsrv_packages', (), index['packages']),
+        ('prmpckgsrv_package_versions', (), index['versions']),
+        ('prmpckgsrv_index_shards', (), index['shards']),
+        ('prmpckgsrv_index_shard_errors', (), index['shardErrors']),
+        ('prmpckgsrv_index_conflicts', (), index['conflicts']),
+        ('prmpckgsrv_module_cache_entries', (), modules['entries']),
+        ('prmpckgsrv_module_cache_bytes', (), modules['size']),
+        ('prmpckgsrv_module_cache_hits_total', (), modules['hits']),
+        ('prmpckgsrv_module_cache_misses_total', (), modules['misses']),
+        ('prmpckgsrv_module_cache_evictions_total', (), modules['evictions']),
+        (
+            'prmpckgsrv_module_cache_hit_ratio',
+            (),
+            hit_ratio(modules['hits'], modules['misses'])
+        ),
+        ('prmpckgsrv_yaml_backend_info', (('backend', yaml_backend()),), 1)
+    ]
+    counters, _ = metrics.registry.collect()
+    hits = counters.get(
+        (metrics.RESPONSE_CACHE_REQUESTS, (('result', 'hit'),)),
+        0
+    )
+    misses = counters.get(
+        (metrics.RESPONSE_CACHE_REQUESTS, (('result', 'miss'),)),
+        0
+    )
+    gauges.append((
+        'prmpckgsrv_response_cache_hit_ratio',
+        (),
+        hit_ratio(hits, misses)
+    ))
+    return gauges
+
+
+def parse_timestamp(value):
+    """Parse a timestamp in ISO 8601 format. Timestamps with a time zone are
+    converted to UTC. Timestamps without time zone are expected to be in UTC.
+    Raises InvalidRequest if the value is not a valid timestamp or if the
+    converted timestamp is out of range.
+
+    Parameters
+    ----------
+    value: string
+        Timestamp in ISO 8601 format
+
+    Returns
+    -------
+    datetime
+    """
+    try:
+        timestamp = dt.datetime.fromisoformat(value)
+    except ValueError:
+        raise InvalidRequest('invalid timestamp \'' + value + '\'')
+    if not timestamp.tzinfo is None:
+        try:
+            timestamp = timestamp.astimezone(dt.timezone.utc)
+        except OverflowError:
+            raise InvalidRequest('timestamp out of range \'' + value + '\'')
+        timestamp = timestamp.replace(tzinfo=None)
+    return timestamp
+
+
+def query_arguments():
+    """Get pagination and projection arguments from the request query string.
+    The result contains the keys fields (list of field names), limit, and
+    cursor for those arguments that are present in the request. Raises
+    InvalidRequest if the limit is not a positive integer.
+
+    Returns
+    -------
+    dict
+    """
+    args = dict()
+    fields = request.args.get('fields')
+    if not fields is None:
+        args['fields'] = [f.strip() for f in fields.split(',') if f.strip() != '']
+    limit = request.args.get('limit')
+    if not limit is None:
+        try:
+            args['limit'] = int(limit)
+        except ValueError:
+            args['limit'] = 0
+        if args['limit'] < 1:
+            raise InvalidRequest('invalid limit \'' + limit + '\'')
+    cursor = request.args.get('cursor')
+    if not cursor is None:
+        args['cursor'] = cursor
+    return args
+
+
+def request_route():
+    """Get the route of the current request. The result is 'unmatched' for
+    requests that do not match any route.
+
+    Returns
+    -------
+    string
+    """
+    if request.url_rule is None:
+        return 'unmatched'
+    return request.url_rule.rule
+
+
+def set_cache_headers(response, etag, last_modified):
+    """Set the entity tag, modification date and cache control headers of a
+    package response.
+
+    Parameters
+    ----------
+    response: Http response
+        Response for the request
+    etag: string
+        Entity tag for the requested resource
+    last_modified: datetime
+        Modification date of the requested resource
+
+    Returns
+    -------
+    Http response
+    """
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = config[const.SERVER_CACHE_MAXAGE]
+    return response
+
+
+def encode_json(obj):
+    """Get the Json encoding of a dictionary.
+
+    Parameters
+    ----------
+    obj: dict
+        Dictionary serialization of a response
+
+    Returns
+    -------
+    bytes
+    """
+    start = time.perf_counter()
+    body = json.dumps(obj).encode('utf-8')
+    observe_stage(STAGE_SERIALIZE, start)
+    return body
+
+
+def hit_ratio(hits, misses):
+    """Get the ratio of cache lookups that were hits. The ratio is 0 if the
+    cache has not been accessed.
+
+    Parameters
+    ----------
+    hits: int
+        Number of cache hits
+    misses: int
+        Number of cache misses
+
+    Returns
+    -------
+    float
+    """
+    if hits + misses == 0:
+        return 0.0
+    return float(hits) / (hits + misses)
+
+
+def is_not_modified(etag, last_modified):
+    """Test whether the current request is a conditional request that is
+    satisfied by the given entity tag and modification date. The If-None-Match
+    header takes precedence over the If-Modified-Since header.
+
+    Parameters
+    ----------
+    etag: string
+        Entity tag for the requested resource
+    last_modified: datetime
+        Modification date of the requested resource
+
+    Returns
+    -------
+    bool
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if_modified_since = request.if_modified_since
+    if not if_modified_since is None and not last_modified is None:
+        # Package timestamps are in UTC. Compare the timestamps in seconds
+        # since the epoch to avoid comparing naive and aware datetimes.
+        return calendar.timegm(last_modified.utctimetuple()) <= calendar.timegm(
+            if_modified_since.utctimetuple()
+        )
+    return False
 
 
 # ------------------------------------------------------------------------------
@@ -145,6 +783,19 @@ class ServerRequestException(Exception):
         return {'message' : self.message}
 
 
+class InvalidRequest(ServerRequestException):
+    """Exception for invalid requests that have status code 400."""
+    def __init__(self, message):
+        """Initialize the message and status code (400) of super class.
+
+        Parameters
+        ----------
+        message : string
+            Error message.
+        """
+        super(InvalidRequest, self).__init__(message, 400)
+
+
 class ResourceNotFound(ServerRequestException):
     """Exception for file not found situations that have status code 404."""
     def __init__(self, message):
@@ -184,6 +835,31 @@ def invalid_request_or_resource_not_found(error):
     return response
 
 
+@app.errorhandler(PackageLoadError)
+def package_load_error(error):
+    """Json response handler for package files whose modules cannot be read.
+    The error is logged. The response does not contain the error message
+    since the message may contain server file paths and parser output.
+
+    Parameters
+    ----------
+    error : prmpckgsrv.index.PackageLoadError
+        Exception thrown by request handler
+
+    Returns
+    -------
+    Http response
+    """
+    app.logger.error(
+        'cannot read modules of package \'' + error.name + '\': ' + str(error)
+    )
+    response = jsonify({
+        'message': 'modules of package \'' + error.name + '\' are not available'
+    })
+    response.status_code = 500
+    return response
+
+
 @app.errorhandler(500)
 def internal_error(exception):
     """Exception handler that logs exceptions."""
@@ -203,24 +879,6 @@ if __name__ == '__main__':
     # http://flask.pocoo.org/docs/patterns/appdispatch/
     from werkzeug.serving import run_simple
     from werkzeug.wsgi import DispatcherMiddleware
-    # Switch logging on if log directory is defined
-    if 'server.logdir' in config:
-        import logging
-        from logging.handlers import RotatingFileHandler
-        log_dir = os.path.abspath(config['server.logdir'])
-        # Create the directory if it does not exist
-        if not os.path.isdir(log_dir):
-            os.makedirs(log_dir)
-        file_handler = RotatingFileHandler(
-            os.path.join(log_dir, 'vizier-api.log'),
-            maxBytes=1024 * 1024 * 100,
-            backupCount=20
-        )
-        file_handler.setLevel(logging.ERROR)
-        file_handler.setFormatter(
-            logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-        )
-        app.logger.addHandler(file_handler)
     # Load a dummy app at the root URL to give 404 errors.
     # Serve app at APPLICATION_ROOT for localhost development.
     application = DispatcherMiddleware(Flask('dummy_app'), {
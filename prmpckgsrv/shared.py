@@ -0,0 +1,144 @@
+"""prm Package Web Service API - Shared index generations
+
+When the Web server runs in several worker processes, the package index is
+read by a single process and published as an index generation. An index
+generation is a compiled index file that contains the encoded elements and the
+encoded serialization of every module. All worker processes memory-map the
+same generation file. The Json encodings of the module elements and of the
+serialized modules are read from the shared memory map instead of being held
+in a private copy by every process.
+
+Only these encodings are shared. Every process still builds its own package
+descriptors, module tries, and search index. For loaded packages it keeps one
+small object per module (folder, name, and record offset). Sharing a
+generation therefore reduces the private memory of each process by the size
+of the module encodings but not by the size of the parsed index. The module
+cache budget (package.cache.maxbytes) continues to bound the number of module
+tries per process.
+
+A new generation is published when the index or any of the package files
+changes. Processes that detect the change compete for an exclusive lock on the
+generation file. The process that holds the lock reads the modified index and
+replaces the generation file atomically. All other processes wait for the lock
+and then map the new generation without reading the index themselves.
+Processes that still use the previous generation can continue to read it
+until they switch to the new generation.
+"""
+
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # File locks are not available on all platforms. Without locks, processes
+    # may publish the same generation more than once.
+    fcntl = None
+
+from prmpckgsrv.compiled import write_generation
+
+
+"""Suffix of the lock file for an index generation file."""
+LOCK_SUFFIX = '.lock'
+
+"""Format of package timestamps in index generations."""
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+class GenerationLock(object):
+    """Exclusive lock for publishing an index generation. The lock is held on
+    a lock file next to the generation file. The lock is used as a context
+    manager.
+
+    Attributes
+    ----------
+    filename: string
+        Path to the lock file
+    """
+    def __init__(self, generation_file):
+        """Initialize the lock for the given generation file.
+
+        Parameters
+        ----------
+        generation_file: string
+            Path to the index generation file
+        """
+        self.filename = generation_file + LOCK_SUFFIX
+        self.fd = None
+
+    def __enter__(self):
+        """Acquire the lock. Blocks until the lock is available."""
+        if not fcntl is None:
+            self.fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Release the lock."""
+        if not self.fd is None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def package_entry(package):
+    """Get the entry for a package in the table of contents of an index
+    generation.
+
+    Parameters
+    ----------
+    package: prmpckgsrv.index.PackageDescriptor
+        Package descriptor
+
+    Returns
+    -------
+    dict
+    """
+    entry = {
+        'name': package.name,
+        'file': package.file,
+        'version': package.version,
+        'timestamp': package.timestamp.strftime(TIMESTAMP_FORMAT)
+    }
+    if not package.description is None:
+        entry['description'] = package.description
+    return entry
+
+
+def publish_generation(generation_file, index_file, snapshot, fingerprint, load):
+    """Write the given index snapshot as a new index generation. The modules
+    of all package versions in the snapshot are loaded and written. The caller
+    is expected to hold the generation lock.
+
+    The modification time of the generation file is set to the most recent
+    modification time of the index file and the package files as observed
+    before the snapshot was read. A file that was modified while the snapshot
+    was read is therefore newer than the generation.
+
+    Parameters
+    ----------
+    generation_file: string
+        Path to the index generation file
+    index_file: string
+        Absolute path to the index file that the snapshot was read from
+    snapshot: prmpckgsrv.index.IndexSnapshot
+        Index snapshot
+    fingerprint: string
+        Identifier for the serialization of modules
+    load: func
+        Function that loads the module tries for a list of module sources
+    """
+    sources = list(snapshot.files.values())
+    packages = list()
+    for source, modules in zip(sources, load(sources)):
+        packages.append((package_entry(source.package), modules.find([])))
+    write_generation(generation_file, index_file, packages, fingerprint)
+    mtime = max([
+        signature[0]
+            for filename, signature in snapshot.signatures.items()
+                if filename != generation_file and not signature is None
+    ])
+    os.utime(generation_file, ns=(mtime, mtime))
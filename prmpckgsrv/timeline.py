@@ -0,0 +1,95 @@
+"""prm Package Web Service API - Package timeline
+
+Index of the packages in an index snapshot sorted by their timestamp. The
+index answers the question which packages have changed since a given point in
+time. The timeline of a new snapshot is derived from the timeline of the
+previous snapshot by only removing and inserting the entries for packages
+that have changed.
+"""
+
+import bisect
+import datetime as dt
+
+
+class TimestampIndex(object):
+    """Sorted list of (timestamp, package name) pairs for all packages in an
+    index snapshot. Packages with the same timestamp are ordered by their name.
+    The index is immutable once created.
+
+    Attributes
+    ----------
+    descriptors: dict(prmpckgsrv.index.PackageDescriptor)
+        Package descriptors keyed by the package name
+    entries: list(tuple)
+        List of (timestamp, package name) pairs sorted by timestamp
+    """
+    def __init__(self, packages, previous=None):
+        """Create the index for the given package descriptors. If the index
+        of a previous snapshot is given, only the entries of those packages
+        whose descriptor is not identical to the descriptor in the previous
+        snapshot are updated.
+
+        Parameters
+        ----------
+        packages: dict(prmpckgsrv.index.PackageDescriptor)
+            Package descriptors keyed by the package name
+        previous: prmpckgsrv.timeline.TimestampIndex, optional
+            Index for the previous snapshot
+        """
+        self.descriptors = dict(packages)
+        if previous is None:
+            self.entries = sorted([(p.timestamp, name) for name, p in packages.items()])
+            return
+        entries = list(previous.entries)
+        for name, package in previous.descriptors.items():
+            if not packages.get(name) is package:
+                pos = bisect.bisect_left(entries, (package.timestamp, name))
+                del entries[pos]
+        for name, package in packages.items():
+            if not previous.descriptors.get(name) is package:
+                bisect.insort(entries, (package.timestamp, name))
+        self.entries = entries
+
+    def __len__(self):
+        """Number of packages in the index.
+
+        Returns
+        -------
+        int
+        """
+        return len(self.entries)
+
+    def high_water_mark(self):
+        """Get the timestamp of the most recent package. The result is None if
+        the index is empty.
+
+        Returns
+        -------
+        datetime
+        """
+        if len(self.entries) == 0:
+            return None
+        return self.entries[-1][0]
+
+    def since(self, timestamp):
+        """Get the names of all packages whose timestamp is after the given
+        timestamp. Packages are returned in order of their timestamp.
+
+        Parameters
+        ----------
+        timestamp: datetime
+            Point in time (in UTC)
+
+        Returns
+        -------
+        list(string)
+        """
+        # A single-element tuple sorts before all entries with the same
+        # timestamp. Timestamps have a resolution of one microsecond. No
+        # package is after the largest timestamp.
+        try:
+            following = timestamp + dt.timedelta(microseconds=1)
+        except OverflowError:
+            return list()
+        pos = bisect.bisect_left(self.entries, (following,))
+        return [name for _, name in self.entries[pos:]]
@@ -0,0 +1,92 @@
+"""prm Package Web Service API - Module trie
+
+Index for the modules of a package. Module identifiers are path expressions
+that use '.' as delimiter. The trie is keyed on the path components of the
+module identifiers. Each node in the trie keeps the modules in its subtree in
+the order in which they are listed in the package file. A package query is
+answered by walking down the trie along the query path.
+"""
+
+
+class TrieNode(object):
+    """Node in a module trie.
+
+    Attributes
+    ----------
+    children: dict(TrieNode)
+        Child nodes keyed by the next path component
+    modules: tuple(prmpckgsrv.index.ModuleSpecification)
+        All modules in the subtree of the node in package file order
+    """
+    __slots__ = ['children', 'modules']
+
+    def __init__(self):
+        """Initialize an empty node."""
+        self.children = dict()
+        self.modules = list()
+
+
+class ModuleTrie(object):
+    """Prefix trie over the identifiers of the modules in a package.
+
+    Attributes
+    ----------
+    root: TrieNode
+        Root of the trie. The root contains all modules of the package.
+    """
+    def __init__(self, modules):
+        """Build the trie for a list of module specifications.
+
+        Parameters
+        ----------
+        modules: list(prmpckgsrv.index.ModuleSpecification)
+            Modules in package file order
+        """
+        self.root = TrieNode()
+        for module in modules:
+            node = self.root
+            node.modules.append(module)
+            for component in module.identifier.split('.'):
+                child = node.children.get(component)
+                if child is None:
+                    child = TrieNode()
+                    node.children[component] = child
+                node = child
+                node.modules.append(module)
+        # The trie is shared between requests. Convert module lists into
+        # tuples once all modules have been added.
+        nodes = [self.root]
+        while len(nodes) > 0:
+            node = nodes.pop()
+            node.modules = tuple(node.modules)
+            nodes.extend(node.children.values())
+
+    def __len__(self):
+        """Number of modules in the trie.
+
+        Returns
+        -------
+        int
+        """
+        return len(self.root.modules)
+
+    def find(self, query):
+        """Get all modules whose identifier path starts with the given query
+        path. The result is the same as selecting all modules for which
+        ModuleSpecification.matches(query) is True.
+
+        Parameters
+        ----------
+        query: list(string)
+            List of path components
+
+        Returns
+        -------
+        tuple(prmpckgsrv.index.ModuleSpecification)
+        """
+        node = self.root
+        for component in query:
+            node = node.children.get(component)
+            if node is None:
+                return ()
+        return node.modules
@@ -0,0 +1,199 @@
+"""prm Package Web Service API - Package versions
+
+The package index may contain several versions of the same package. Versions
+of a package are kept in a list that is sorted by version. Version strings are
+compared component-wise. Numeric components are compared as numbers. Text
+components mark pre-releases, i.e., 1.0rc1 and 1.0.beta sort before 1.0.
+
+Package queries may reference a version using the syntax name@version, e.g.,
+cityofnewyork@0.1.10.transportation or cityofnewyork@latest. The version may
+be terminated by ':' (e.g., cityofnewyork@0.1.10:transportation) to separate
+it from a path that starts with numeric components. Without ':' all path
+components that start with a digit are part of the version. Module self links
+always use the terminated form. A version in a query resolves to the most
+recent version that equals it or that extends it by further components, i.e.,
+name@0.1 resolves to the latest 0.1.x version."""
+
+import bisect
+import re
+
+
+"""Version label for the most recent version of a package."""
+VERSION_LATEST = 'latest'
+
+"""Separator between the version and the path in a package query."""
+VERSION_SEPARATOR = ':'
+
+"""Regular expression for version components."""
+VERSION_COMPONENT = re.compile('[0-9]+|[a-zA-Z]+')
+
+
+class PackageVersions(object):
+    """Sorted list of the module sources for all versions of a package. The
+    list is immutable once created.
+
+    Attributes
+    ----------
+    keys: list(tuple)
+        Sorted list of version keys
+    sources: list(prmpckgsrv.index.ModuleSource)
+        Module sources in the order of the version keys
+    """
+    def __init__(self, sources):
+        """Sort the module sources by the version of their package. Raises
+        ValueError if two sources have the same version.
+
+        Parameters
+        ----------
+        sources: list(prmpckgsrv.index.ModuleSource)
+            Module sources for different versions of the same package
+        """
+        ordered = sorted(
+            [(version_key(source.package.version), source) for source in sources],
+            key=lambda item: item[0]
+        )
+        self.keys = [key for key, _ in ordered]
+        self.sources = [source for _, source in ordered]
+        for i in range(1, len(self.keys)):
+            if self.keys[i - 1] == self.keys[i]:
+                package = self.sources[i].package
+                raise ValueError(
+                    'duplicate version \'' + package.version +
+                    '\' for package \'' + package.name + '\''
+                )
+
+    def __len__(self):
+        """Number of versions.
+
+        Returns
+        -------
+        int
+        """
+        return len(self.sources)
+
+    def latest(self):
+        """Get the module source for the most recent version.
+
+        Returns
+        -------
+        prmpckgsrv.index.ModuleSource
+        """
+        return self.sources[-1]
+
+    def resolve(self, version):
+        """Get the module source for the most recent version that matches the
+        given version. The result is None if no version matches.
+
+        Parameters
+        ----------
+        version: string
+            Version or 'latest'
+
+        Returns
+        -------
+        prmpckgsrv.index.ModuleSource
+        """
+        if version == VERSION_LATEST:
+            return self.latest()
+        # Match the version components without the end marker
+        key = version_key(version)[:-1]
+        if len(key) == 0:
+            return None
+        # Keys that extend the given key are smaller than the key followed by
+        # a component that is larger than all other components.
+        end = bisect.bisect_left(self.keys, key + ((3, ''),))
+        if end == 0 or self.keys[end - 1][:len(key)] != key:
+            return None
+        return self.sources[end - 1]
+
+    def versions(self):
+        """Get the list of all version strings in ascending order.
+
+        Returns
+        -------
+        list(string)
+        """
+        return [source.package.version for source in self.sources]
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def module_query(name, version, identifier):
+    """Get the package query that references a module of a package version.
+    The query round-trips through parse_package_query for all versions that
+    do not contain the ':' separator.
+
+    Parameters
+    ----------
+    name: string
+        Package name
+    version: string
+        Package version
+    identifier: string
+        Module identifier (path expression using '.' as delimiter)
+
+    Returns
+    -------
+    string
+    """
+    return name + '@' + version + VERSION_SEPARATOR + identifier
+
+
+def parse_package_query(package_query):
+    """Split a package query into the package name, the optional version, and
+    the list of path components. The version that follows the '@' separator
+    ends at the first ':'. Without ':', path components that follow the
+    version are part of the version if they start with a digit. The version
+    'latest' is a single component.
+
+    Parameters
+    ----------
+    package_query: string
+        Path expression (using '.' as delimiter) referencing a package or a
+        package folder.
+
+    Returns
+    -------
+    string, string, list(string)
+    """
+    if not '@' in package_query.split('.', 1)[0]:
+        path = package_query.split('.')
+        return path[0], None, path[1:]
+    name, query = package_query.split('@', 1)
+    if VERSION_SEPARATOR in query:
+        version, query = query.split(VERSION_SEPARATOR, 1)
+        if query == '':
+            return name, version, list()
+        return name, version, query.split('.')
+    path = query.split('.')
+    version = path[0]
+    pos = 1
+    if version != VERSION_LATEST:
+        while pos < len(path) and path[pos][:1].isdigit():
+            version += '.' + path[pos]
+            pos += 1
+    return name, version, path[pos:]
+
+
+def version_key(version):
+    """Get the sort key for a version string. The key is a tuple with one
+    element per version component followed by an end marker. Text components
+    sort before the end marker and numeric components after it. Thus, a
+    version with a text component (pre-release) sorts before the version that
+    it extends. Numeric components are compared as numbers.
+
+    Parameters
+    ----------
+    version: string
+        Version string
+
+    Returns
+    -------
+    tuple
+    """
+    return tuple([
+        (2, int(c)) if c.isdigit() else (0, c)
+            for c in VERSION_COMPONENT.findall(str(version))
+    ] + [(1, '')])
@@ -0,0 +1,62 @@
+"""prm Package Web Service API - Index watcher
+
+Background thread that polls the stat signatures of the package index file and
+all package files. If any of the files changes, a new index snapshot is read
+outside of the request path and published by replacing the reference to the
+current snapshot. Requests never block on a reload and never see a partially
+read index.
+"""
+
+import logging
+import threading
+
+
+class IndexWatcher(threading.Thread):
+    """Daemon thread that periodically refreshes a package index.
+
+    Attributes
+    ----------
+    index: prmpckgsrv.index.PackageIndex
+        Watched package index
+    interval: float
+        Polling interval in seconds
+    logger: logging.Logger
+        Logger for failed reloads
+    """
+    def __init__(self, index, interval, logger=None):
+        """Initialize the watcher. The watcher has to be started explicitly.
+
+        Parameters
+        ----------
+        index: prmpckgsrv.index.PackageIndex
+            Watched package index
+        interval: float
+            Polling interval in seconds
+        logger: logging.Logger, optional
+            Logger for failed reloads
+        """
+        super(IndexWatcher, self).__init__(name='prm-index-watcher')
+        self.daemon = True
+        self.index = index
+        self.interval = interval
+        if logger is None:
+            logger = logging.getLogger(__name__)
+        self.logger = logger
+        self.stopped = threading.Event()
+
+    def run(self):
+        """Refresh the index every polling interval until the watcher is
+        stopped.
+        """
+        while not self.stopped.wait(self.interval):
+            try:
+                self.index.refresh()
+            except ValueError as ex:
+                self.logger.error('index reload failed: ' + str(ex))
+            except Exception as ex:
+                # Keep the watcher alive on unexpected errors
+                self.logger.exception(ex)
+
+    def stop(self):
+        """Stop the watcher after the current polling interval."""
+        self.stopped.set()
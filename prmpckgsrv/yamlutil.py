@@ -0,0 +1,150 @@
+"""prm Package Web Service API - Yaml loader
+
+Shared helper for reading Yaml documents. All documents are read using the
+safe loader. The C-accelerated loader is used if PyYAML was built with libyaml.
+Otherwise, the pure-Python loader is used. The parse time of each document
+is recorded in the metrics registry.
+
+The header of a document can be read without constructing the whole document.
+The header contains the scalar elements of the top-level mapping. All other
+elements are skipped on the event level.
+"""
+
+import time
+import yaml
+
+from prmpckgsrv.metrics import STAGE_YAML, observe_stage
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+    YAML_BACKEND = 'libyaml'
+except ImportError:
+    from yaml import SafeLoader
+    YAML_BACKEND = 'python'
+
+
+def load_yaml(stream):
+    """Parse a Yaml document using the safe loader.
+
+    Parameters
+    ----------
+    stream: string or file object
+        Yaml document
+
+    Returns
+    -------
+    any
+    """
+    start = time.perf_counter()
+    doc = yaml.load(stream, Loader=SafeLoader)
+    observe_stage(STAGE_YAML, start)
+    return doc
+
+
+def load_yaml_header(stream, keys=None):
+    """Parse the scalar elements of the top-level mapping of a Yaml document.
+    Elements with non-scalar values are skipped without being constructed.
+    If a list of keys is given, parsing stops once all of them have been
+    read. The result is empty if the document is not a mapping.
+
+    Parameters
+    ----------
+    stream: string or file object
+        Yaml document
+    keys: list(string), optional
+        Keys after which parsing may stop
+
+    Returns
+    -------
+    dict
+    """
+    start = time.perf_counter()
+    loader = SafeLoader(stream)
+    try:
+        header = dict()
+        loader.get_event()
+        if loader.check_event(yaml.StreamEndEvent):
+            return header
+        loader.get_event()
+        if not loader.check_event(yaml.MappingStartEvent):
+            return header
+        loader.get_event()
+        while not loader.check_event(yaml.MappingEndEvent):
+            if not loader.check_event(yaml.ScalarEvent):
+                skip_node(loader)
+                skip_node(loader)
+                continue
+            key = construct_scalar(loader, loader.get_event())
+            if loader.check_event(yaml.ScalarEvent):
+                header[key] = construct_scalar(loader, loader.get_event())
+            else:
+                skip_node(loader)
+            if not keys is None and all([k in header for k in keys]):
+                break
+        return header
+    finally:
+        loader.dispose()
+        observe_stage(STAGE_YAML, start)
+
+
+def yaml_backend():
+    """Get the name of the active Yaml parser backend. The result is either
+    'libyaml' or 'python'.
+
+    Returns
+    -------
+    string
+    """
+    return YAML_BACKEND
+
+
+# ------------------------------------------------------------------------------
+# Helper Methods
+# ------------------------------------------------------------------------------
+
+def construct_scalar(loader, event):
+    """Construct the value of a scalar event. The tag of plain scalars is
+    resolved in the same way as by the loader.
+
+    Parameters
+    ----------
+    loader: yaml.SafeLoader
+        Loader that produced the event
+    event: yaml.ScalarEvent
+        Scalar event
+
+    Returns
+    -------
+    any
+    """
+    tag = event.tag
+    if tag is None or tag == '!':
+        tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+    node = yaml.ScalarNode(
+        tag,
+        event.value,
+        event.start_mark,
+        event.end_mark,
+        style=event.style
+    )
+    return loader.construct_object(node, deep=True)
+
+
+def skip_node(loader):
+    """Skip the events of the next node including all of its children.
+
+    Parameters
+    ----------
+    loader: yaml.SafeLoader
+        Loader whose next event starts the node
+    """
+    event = loader.get_event()
+    if not isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+        return
+    depth = 1
+    while depth > 0:
+        event = loader.get_event()
+        if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+            depth += 1
+        elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+            depth -= 1
@@ -9,10 +9,16 @@ setup(
     keywords='project management ',
     license='GPLv3',
     packages=['prmpckgsrv'],
+    python_requires='>=3.7',
     package_data={'': ['LICENSE']},
     install_requires=[
         'Flask >= "0.12"',
         'flask-cors >= "3.0.2"',
         'pyaml'
-    ]
+    ],
+    entry_points={
+        'console_scripts': [
+            'prm-pckgsrv-compile = prmpckgsrv.compiler:main'
+        ]
+    }
 )
@@ -0,0 +1,51 @@
+import json
+import unittest
+
+from prmpckgsrv.api import PrmPackageServer
+from testutil import PackageFilesTestCase, server_config
+
+
+class TestBatchQueries(PackageFilesTestCase):
+
+    def test_batch(self):
+        """Test deduplication of modules, unknown packages, and the order of
+        query results.
+        """
+        api = PrmPackageServer(server_config(self.index_file))
+        queries = [
+            'cityofnewyork.transportation.mta',
+            'unknown.transportation',
+            'cityofnewyork.transportation',
+            'cityofnewyork@9.9',
+            'urban-integration',
+            'cityofnewyork.transportation.mta'
+        ]
+        obj = json.loads(api.encode_batch_modules(queries).decode('utf-8'))
+        # Query results are in the order of the request
+        self.assertEqual([r['query'] for r in obj['queries']], queries)
+        results = obj['queries']
+        self.assertEqual(results[1]['error'], 'unknown package \'unknown\'')
+        self.assertNotIn('modules', results[1])
+        self.assertEqual(results[3]['error'], 'unknown package \'cityofnewyork@9.9\'')
+        self.assertEqual(results[4]['modules'], [])
+        # Each module is contained once. Modules are listed in the order in
+        # which they first match a query.
+        modules = [m['name'] for m in obj['modules']]
+        self.assertEqual(modules, ['subway', 'taxi', 'citibike'])
+        self.assertEqual(results[0]['modules'], [0])
+        self.assertEqual(results[2]['modules'], [1, 2, 0])
+        self.assertEqual(results[5]['modules'], [0])
+        # Modules equal the result of the individual package query
+        expected = api.get_package_modules('cityofnewyork.transportation')
+        self.assertEqual(
+            [obj['modules'][pos] for pos in results[2]['modules']],
+            expected['modules']
+        )
+        self.assertEqual(
+            json.loads(api.encode_batch_modules([]).decode('utf-8'))['queries'],
+            []
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import unittest
+
+from prmpckgsrv.compiler import compile_index
+from prmpckgsrv.index import read_compiled_snapshot, read_index_snapshot
+from testutil import PACKAGE_FILES, PackageFilesTestCase
+
+
+class TestCompiledIndex(PackageFilesTestCase):
+
+    def setUp(self):
+        """Create the package files and the index file."""
+        super(TestCompiledIndex, self).setUp()
+        self.compiled_file = os.path.join(self.tmp_dir, 'index.bin')
+
+    def test_compile(self):
+        """Test compiling the index and loading the compiled snapshot."""
+        self.assertEqual(compile_index(self.index_file, self.compiled_file), 2)
+        compiled = read_compiled_snapshot(
+            self.compiled_file,
+            self.index_file,
+            'http://localhost'
+        )
+        self.assertIsNotNone(compiled)
+        snapshot = read_index_snapshot(self.index_file, 'http://localhost')
+        for name, package in snapshot.packages.items():
+            c_package = compiled.packages[name]
+            self.assertEqual(c_package.version, package.version)
+            self.assertEqual(c_package.timestamp, package.timestamp)
+            self.assertEqual(c_package.description, package.description)
+            self.assertEqual(
+                [m.to_dict() for m in compiled.get_modules(name).find([])],
+                [m.to_dict() for m in snapshot.get_modules(name).find([])]
+            )
+        # The compiled file is not used once a package file is newer
+        package_file = os.path.join(self.tmp_dir, PACKAGE_FILES[1])
+        st = os.stat(self.compiled_file)
+        os.utime(package_file, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        compiled = read_compiled_snapshot(
+            self.compiled_file,
+            self.index_file,
+            'http://localhost'
+        )
+        self.assertIsNone(compiled)
+        snapshot = read_index_snapshot(
+            self.index_file,
+            'http://localhost',
+            compiled_file=self.compiled_file
+        )
+        self.assertEqual(len(snapshot.packages), 2)
+        self.assertIn(self.compiled_file, snapshot.signatures)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import unittest
+
+from prmpckgsrv.index import PackageIndex
+from testutil import DATA_DIR, PACKAGE_FILES, PackageFilesTestCase
+
+
+class TestIndexShards(PackageFilesTestCase):
+
+    def setUp(self):
+        """Create the package files and an index directory with one shard per
+        package.
+        """
+        super(TestIndexShards, self).setUp()
+        self.index_dir = os.path.join(self.tmp_dir, 'index')
+        os.mkdir(self.index_dir)
+        self.write_shard('a.yaml', ['cityofnewyork.yaml'])
+        self.write_shard('b.yaml', ['urban-integration.yaml'])
+
+    def write_shard(self, shard, files):
+        """Write shard index file that references the given package files."""
+        self.write_index(files, index_file=os.path.join(self.index_dir, shard))
+
+    def test_merge(self):
+        """Test merging shards and reporting package name conflicts."""
+        index = PackageIndex(self.index_dir, 'http://localhost')
+        snapshot = index.get_snapshot()
+        self.assertEqual(
+            list(snapshot.packages.keys()),
+            ['cityofnewyork', 'urban-integration']
+        )
+        self.assertEqual(snapshot.conflicts, [])
+        self.assertEqual(len(snapshot.get_modules('cityofnewyork')), 5)
+        # Adding a shard that redefines a package is reported as a conflict.
+        # The package of the first shard is kept.
+        self.write_shard('c.yaml', ['cityofnewyork.yaml'])
+        shard_a = index.shards[os.path.join(self.index_dir, 'a.yaml')]
+        snapshot = index.get_snapshot()
+        self.assertEqual(len(index.shards), 3)
+        self.assertEqual(len(snapshot.conflicts), 1)
+        self.assertIn('c.yaml', snapshot.conflicts[0])
+        self.assertIs(
+            snapshot.sources['cityofnewyork'],
+            shard_a.snapshot.sources['cityofnewyork']
+        )
+        # Removing the shard resolves the conflict
+        os.remove(os.path.join(self.index_dir, 'c.yaml'))
+        self.assertEqual(index.get_snapshot().conflicts, [])
+
+    def test_isolation(self):
+        """Test that a broken shard does not affect the other shards."""
+        index = PackageIndex(
+            [os.path.join(self.index_dir, 'a.yaml'), self.index_dir],
+            'http://localhost'
+        )
+        snapshot = index.get_snapshot()
+        shard_b = index.shards[os.path.join(self.index_dir, 'b.yaml')]
+        # Break the package file of the second shard. The first shard keeps
+        # its snapshot and is not read again.
+        shard_a = index.shards[os.path.join(self.index_dir, 'a.yaml')]
+        snapshot_a = shard_a.snapshot
+        with open(os.path.join(self.tmp_dir, PACKAGE_FILES[1]), 'w') as f:
+            f.write('version: \'0.0.1\'\n')
+        self.assertTrue(index.refresh())
+        snapshot = index.get_snapshot()
+        self.assertIs(shard_a.snapshot, snapshot_a)
+        self.assertIsNotNone(shard_b.error)
+        self.assertEqual(list(snapshot.errors.keys()), [shard_b.index_file])
+        # The last valid snapshot of the broken shard remains available
+        self.assertEqual(
+            list(snapshot.packages.keys()),
+            ['cityofnewyork', 'urban-integration']
+        )
+        # The broken shard is not read again until its files change
+        self.assertFalse(index.refresh())
+        shutil.copy(os.path.join(DATA_DIR, PACKAGE_FILES[1]), self.tmp_dir)
+        self.assertTrue(index.refresh())
+        self.assertIsNone(shard_b.error)
+        self.assertEqual(index.get_snapshot().errors, {})
+        # An index without any valid shard is rejected
+        self.write_shard('a.yaml', ['unknown.yaml'])
+        self.write_shard('b.yaml', ['unknown.yaml'])
+        with self.assertRaises(ValueError):
+            PackageIndex(self.index_dir, 'http://localhost')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from logging.handlers import QueueHandler
+from prmpckgsrv.logutil import ACCESS_LOG_FILE, ERROR_LOG_FILE
+from prmpckgsrv.logutil import configure_logging, stop_listener
+
+
+class TestLogging(unittest.TestCase):
+
+    def setUp(self):
+        """Create a temporary log directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_queued_logging(self):
+        """Test that records are written by the listener thread."""
+        logger = logging.getLogger('test-queued-logging')
+        threads = list()
+        class RecordingHandler(logging.Handler):
+            def emit(self, record):
+                threads.append(threading.current_thread())
+        logger.addHandler(RecordingHandler())
+        listeners, access_logger = configure_logging(logger, log_dir=self.tmp_dir)
+        self.assertEqual(len(logger.handlers), 1)
+        self.assertIsInstance(logger.handlers[0], QueueHandler)
+        logger.error('unknown package \'a\'')
+        logger.warning('not in error log')
+        access_logger.info(
+            'GET /packages',
+            extra={'access': {'method': 'GET', 'status': 200}}
+        )
+        for listener in listeners:
+            self.assertTrue(listener.running)
+            stop_listener(listener)
+            self.assertFalse(listener.running)
+            # Stopping a stopped listener has no effect
+            stop_listener(listener)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.current_thread(), threads)
+        with open(os.path.join(self.tmp_dir, ERROR_LOG_FILE), 'r') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].endswith('ERROR - unknown package \'a\''))
+        with open(os.path.join(self.tmp_dir, ACCESS_LOG_FILE), 'r') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        obj = json.loads(lines[0])
+        self.assertEqual(obj['method'], 'GET')
+        self.assertEqual(obj['status'], 200)
+        self.assertIn('time', obj)
+
+    def test_external_rotation(self):
+        """Test that log files are reopened after they were moved."""
+        logger = logging.getLogger('test-external-rotation')
+        listeners, _ = configure_logging(logger, log_dir=self.tmp_dir)
+        log_file = os.path.join(self.tmp_dir, ERROR_LOG_FILE)
+        logger.error('before rotation')
+        # Wait for the record to be written before moving the file
+        listeners[-1].stop()
+        os.rename(log_file, log_file + '.1')
+        listeners[-1].start()
+        logger.error('after rotation')
+        for listener in listeners:
+            stop_listener(listener)
+        for filename, message in [
+            (log_file + '.1', 'before rotation'),
+            (log_file, 'after rotation')
+        ]:
+            with open(filename, 'r') as f:
+                lines = f.read().splitlines()
+            self.assertEqual(len(lines), 1)
+            self.assertTrue(lines[0].endswith(message))
+
+
+if __name__ == '__main__':
+    unittest.main()
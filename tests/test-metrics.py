@@ -0,0 +1,54 @@
+import threading
+import unittest
+
+from prmpckgsrv.metrics import MetricsRegistry
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_aggregate_threads(self):
+        """Test aggregating counters and histograms of several threads,
+        including threads that have terminated.
+        """
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        def record():
+            for _ in range(100):
+                registry.increment('requests', (('route', '/'),))
+            registry.observe('latency', (), 0.05)
+            registry.observe('latency', (), 0.5)
+            registry.observe('latency', (), 5.0)
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        record()
+        counters, histograms = registry.collect()
+        self.assertEqual(counters[('requests', (('route', '/'),))], 900)
+        histogram = histograms[('latency', ())]
+        self.assertEqual(histogram[:3], [9, 9, 9])
+        self.assertAlmostEqual(histogram[3], 9 * 5.55)
+        # Stores of terminated threads are merged when collecting
+        self.assertEqual(len(registry.stores), 1)
+        counters, _ = registry.collect()
+        self.assertEqual(counters[('requests', (('route', '/'),))], 900)
+
+    def test_render(self):
+        """Test rendering metrics in the Prometheus text format."""
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.increment('prmpckgsrv_http_requests_total', (('route', '/'),))
+        registry.observe('latency', (('stage', 'a"b'),), 0.5)
+        text = registry.render(gauges=[('size', (), 10)])
+        lines = text.splitlines()
+        self.assertIn('# TYPE prmpckgsrv_http_requests_total counter', lines)
+        self.assertIn('prmpckgsrv_http_requests_total{route="/"} 1', lines)
+        self.assertIn('latency_bucket{stage="a\\"b",le="0.1"} 0', lines)
+        self.assertIn('latency_bucket{stage="a\\"b",le="1.0"} 1', lines)
+        self.assertIn('latency_bucket{stage="a\\"b",le="+Inf"} 1', lines)
+        self.assertIn('latency_count{stage="a\\"b"} 1', lines)
+        self.assertIn('# TYPE size untyped', lines)
+        self.assertIn('size 10', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
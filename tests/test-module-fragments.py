@@ -0,0 +1,32 @@
+import json
+import os
+import unittest
+
+from prmpckgsrv.api import PrmPackageServer
+from testutil import PACKAGE_FILES, PackageFilesTestCase, server_config
+
+
+class TestModuleFragments(PackageFilesTestCase):
+
+    def test_renamed_package(self):
+        """Test that responses that are assembled from module fragments equal
+        the dictionary serialization after a package has been renamed.
+        """
+        api = PrmPackageServer(server_config(self.index_file))
+        self.assertEqual(
+            json.loads(api.encode_package_modules('cityofnewyork').decode('utf-8')),
+            api.get_package_modules('cityofnewyork')
+        )
+        # Rename the package without modifying the package file
+        with open(self.index_file, 'w') as f:
+            f.write('packages:\n')
+            f.write('    - name: \'nyc\'\n')
+            f.write('      file: \'' + os.path.join(self.tmp_dir, PACKAGE_FILES[0]) + '\'\n')
+        body = json.loads(api.encode_package_modules('nyc').decode('utf-8'))
+        self.assertEqual(body, api.get_package_modules('nyc'))
+        for module in body['modules']:
+            self.assertEqual(module['package'], 'nyc')
+
+
+if __name__ == '__main__':
+    unittest.main()
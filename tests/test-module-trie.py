@@ -0,0 +1,72 @@
+import json
+import unittest
+
+from prmpckgsrv.index import ModuleSpecification
+from prmpckgsrv.trie import ModuleTrie
+
+
+"""Module folders and names used for test purposes."""
+MODULES = [
+    ('', 'load'),
+    ('transportation', 'taxi'),
+    ('transportation.mta', 'subway'),
+    ('services', 'complaints'),
+    ('transportation', 'citibike'),
+    ('transportation.mta.bus', 'routes'),
+    ('', 'transportation')
+]
+
+
+class TestModuleTrie(unittest.TestCase):
+
+    def test_find(self):
+        """Test that trie lookups give the same result as a linear scan using
+        ModuleSpecification.matches.
+        """
+        modules = [
+            ModuleSpecification({'folder': folder, 'name': name})
+                for folder, name in MODULES
+        ]
+        trie = ModuleTrie(modules)
+        self.assertEqual(len(trie), len(MODULES))
+        queries = [
+            [],
+            [''],
+            ['load'],
+            ['transportation'],
+            ['transportation', 'mta'],
+            ['transportation', 'mta', 'bus', 'routes'],
+            ['transportation', 'mta', 'bus', 'routes', 'x'],
+            ['services', 'complaints'],
+            ['unknown']
+        ]
+        for query in queries:
+            expected = [m for m in modules if m.matches(query)]
+            self.assertEqual(list(trie.find(query)), expected)
+
+    def test_module_specification(self):
+        """Test compact module specifications."""
+        obj = {
+            'name': 'taxi',
+            'folder': 'transportation',
+            'description': 'Yellow taxi trip records',
+            'settings': [{'name': 'year', 'value': '2017'}]
+        }
+        module = ModuleSpecification(dict(obj))
+        self.assertEqual(module.identifier, 'transportation.taxi')
+        self.assertEqual(module.to_dict(), obj)
+        self.assertIsNot(module.to_dict(), module.to_dict())
+        with self.assertRaises(AttributeError):
+            module.name = 'bus'
+        self.assertEqual(
+            module.to_dict(fields=['name', 'description', 'unknown']),
+            {'name': 'taxi', 'description': 'Yellow taxi trip records'}
+        )
+        self.assertIsNone(module.fragment)
+        # Pre-encoded Json fragment
+        module = ModuleSpecification(dict(obj), serialize=lambda m: m.to_dict())
+        self.assertEqual(json.loads(module.fragment.decode('utf-8')), obj)
+
+
+if __name__ == '__main__':
+    unittest.main()
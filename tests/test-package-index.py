@@ -0,0 +1,144 @@
+import os
+import time
+import unittest
+
+from prmpckgsrv.index import PackageIndex, PackageLoadError
+from testutil import PACKAGE_FILES, PackageFilesTestCase
+
+
+class TestPackageIndex(PackageFilesTestCase):
+
+    def test_snapshot_reuse(self):
+        """Test that the snapshot is only re-read if a file changes."""
+        index = PackageIndex(self.index_file, 'http://localhost')
+        snapshot = index.get_snapshot()
+        self.assertEqual(len(snapshot.packages), 2)
+        self.assertEqual(len(snapshot.get_modules('cityofnewyork')), 5)
+        self.assertEqual(len(snapshot.get_modules('urban-integration')), 0)
+        self.assertIs(index.get_snapshot(), snapshot)
+        # Modifying a package file results in a new snapshot
+        package_file = os.path.join(self.tmp_dir, 'urban-integration.yaml')
+        with open(package_file, 'a') as f:
+            f.write('description: \'Urban data integration\'\n')
+        previous = snapshot
+        snapshot = index.get_snapshot()
+        package = snapshot.packages['urban-integration']
+        self.assertEqual(package.description, 'Urban data integration')
+        self.assertIs(index.get_snapshot(), snapshot)
+        # Unchanged packages are reused from the previous snapshot
+        self.assertIs(
+            snapshot.packages['cityofnewyork'],
+            previous.packages['cityofnewyork']
+        )
+        self.assertIs(
+            snapshot.sources['cityofnewyork'],
+            previous.sources['cityofnewyork']
+        )
+        # Removing a package from the index results in a new snapshot
+        self.write_index(['cityofnewyork.yaml'])
+        snapshot = index.get_snapshot()
+        self.assertEqual(list(snapshot.packages.keys()), ['cityofnewyork'])
+
+    def test_refresh(self):
+        """Test that a failed refresh keeps the current snapshot."""
+        index = PackageIndex(self.index_file, 'http://localhost')
+        snapshot = index.get_snapshot()
+        self.assertFalse(index.refresh())
+        # Index file with a missing package file
+        self.write_index(PACKAGE_FILES + ['unknown.yaml'])
+        with self.assertRaises(ValueError):
+            index.refresh()
+        self.assertIs(index.snapshot, snapshot)
+        # The failed refresh is not repeated until the files change again
+        self.assertFalse(index.refresh())
+        self.write_index(['cityofnewyork.yaml'])
+        self.assertTrue(index.refresh())
+        self.assertEqual(list(index.snapshot.packages.keys()), ['cityofnewyork'])
+
+    def test_watcher(self):
+        """Test that the watcher publishes a new snapshot in the background."""
+        index = PackageIndex(self.index_file, 'http://localhost')
+        snapshot = index.get_snapshot()
+        index.start_watcher(0.01)
+        try:
+            self.write_index(['cityofnewyork.yaml'])
+            for i in range(500):
+                if not index.get_snapshot() is snapshot:
+                    break
+                time.sleep(0.01)
+            packages = index.get_snapshot().packages
+            self.assertEqual(list(packages.keys()), ['cityofnewyork'])
+        finally:
+            index.stop_watcher()
+
+    def test_module_cache(self):
+        """Test that modules are loaded on first access and evicted when the
+        memory budget is exceeded.
+        """
+        index = PackageIndex(self.index_file, 'http://localhost', cache_size=1)
+        snapshot = index.get_snapshot()
+        self.assertEqual(index.cache.statistics()['misses'], 0)
+        modules = snapshot.get_modules('cityofnewyork')
+        self.assertIs(snapshot.get_modules('cityofnewyork'), modules)
+        snapshot.get_modules('urban-integration')
+        stats = index.cache.statistics()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['entries'], 1)
+        self.assertIsNot(snapshot.get_modules('cityofnewyork'), modules)
+
+    def test_package_header(self):
+        """Test that only the package header is parsed when the index is
+        loaded.
+        """
+        package_file = os.path.join(self.tmp_dir, PACKAGE_FILES[0])
+        with open(package_file, 'a') as f:
+            f.write('    - name: [\n')
+        index = PackageIndex(self.index_file, 'http://localhost')
+        snapshot = index.get_snapshot()
+        package = snapshot.packages['cityofnewyork']
+        self.assertEqual(package.version, '0.1.10')
+        self.assertIsNotNone(package.description)
+        self.assertEqual(index.cache.statistics()['misses'], 0)
+        # The invalid module list is detected when the modules are read
+        with self.assertRaises(PackageLoadError) as cm:
+            snapshot.get_modules('cityofnewyork')
+        self.assertEqual(cm.exception.name, 'cityofnewyork')
+        with self.assertRaises(PackageLoadError):
+            snapshot.get_module_entries('cityofnewyork')
+
+    def test_parallel_load(self):
+        """Test reading package files in parallel."""
+        for processes in [False, True]:
+            index = PackageIndex(
+                self.index_file,
+                'http://localhost',
+                workers=4,
+                processes=processes
+            )
+            snapshot = index.get_snapshot()
+            self.assertEqual(
+                list(snapshot.packages.keys()),
+                ['cityofnewyork', 'urban-integration']
+            )
+            self.assertEqual(len(snapshot.get_modules('cityofnewyork')), 5)
+        # Errors in package files are raised
+        with open(os.path.join(self.tmp_dir, PACKAGE_FILES[1]), 'w') as f:
+            f.write('version: \'0.0.1\'\n')
+        with self.assertRaises(ValueError):
+            PackageIndex(self.index_file, 'http://localhost', workers=4)
+
+    def test_download_prefix(self):
+        """Test that download sources are prefixed with the download Url."""
+        index = PackageIndex(self.index_file, 'http://localhost')
+        module = index.get_snapshot().get_modules('cityofnewyork').find(['transportation'])[0]
+        task = module.to_dict()['install']['tasks'][0]
+        self.assertEqual(
+            task['properties'][0]['value'],
+            'http://localhost/cityofnewyork/taxi.py'
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from prmpckgsrv.api import PrmPackageServer
+from prmpckgsrv.index import PackageIndex
+from prmpckgsrv.versions import parse_package_query, version_key
+from testutil import server_config
+
+
+"""Package file used for test purposes."""
+PACKAGE_FILE = './data/cityofnewyork.yaml'
+VERSIONS = ['0.1.10', '0.2.1', '0.1.9']
+
+"""Versions of a package with a numeric folder name. The first version is not
+quoted in the package file."""
+LINK_VERSIONS = ['1.0', '1.0rc1', '1.0.beta']
+
+
+class TestPackageVersions(unittest.TestCase):
+
+    def setUp(self):
+        """Create one copy of the package file for each version and an index
+        file that references them.
+        """
+        self.tmp_dir = tempfile.mkdtemp()
+        with open(PACKAGE_FILE, 'r') as f:
+            doc = f.read()
+        self.index_file = os.path.join(self.tmp_dir, 'index.yaml')
+        with open(self.index_file, 'w') as f:
+            f.write('packages:\n')
+            for version in VERSIONS:
+                filename = os.path.join(self.tmp_dir, version + '.yaml')
+                with open(filename, 'w') as pf:
+                    pf.write(doc.replace('0.1.10', version))
+                f.write('    - name: \'cityofnewyork\'\n')
+                f.write('      file: \'' + filename + '\'\n')
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_parse_query(self):
+        """Test splitting package queries into name, version, and path."""
+        self.assertEqual(
+            parse_package_query('nyc.transportation'),
+            ('nyc', None, ['transportation'])
+        )
+        self.assertEqual(
+            parse_package_query('nyc@0.1.10.transportation.mta'),
+            ('nyc', '0.1.10', ['transportation', 'mta'])
+        )
+        self.assertEqual(parse_package_query('nyc@latest'), ('nyc', 'latest', []))
+        self.assertEqual(
+            parse_package_query('nyc@1.0:2019.trips'),
+            ('nyc', '1.0', ['2019', 'trips'])
+        )
+        self.assertEqual(
+            parse_package_query('nyc@1.0.beta:transportation'),
+            ('nyc', '1.0.beta', ['transportation'])
+        )
+        self.assertEqual(parse_package_query('nyc@1.0:'), ('nyc', '1.0', []))
+        self.assertTrue(version_key('0.1.9') < version_key('0.1.10'))
+        # Pre-releases sort before the version that they extend
+        ordered = ['0.9', '1.0.beta', '1.0rc1', '1.0', '1.0.1']
+        self.assertEqual(sorted(reversed(ordered), key=version_key), ordered)
+
+    def test_resolve(self):
+        """Test resolving package versions."""
+        index = PackageIndex(self.index_file, 'http://localhost')
+        snapshot = index.get_snapshot()
+        self.assertEqual(snapshot.packages['cityofnewyork'].version, '0.2.1')
+        self.assertEqual(
+            snapshot.versions['cityofnewyork'].versions(),
+            ['0.1.9', '0.1.10', '0.2.1']
+        )
+        for query, version in [
+            (None, '0.2.1'),
+            ('latest', '0.2.1'),
+            ('0', '0.2.1'),
+            ('0.1', '0.1.10'),
+            ('0.1.9', '0.1.9'),
+            ('0.1.1', None),
+            ('0.3', None)
+        ]:
+            source = snapshot.resolve('cityofnewyork', version=query)
+            if version is None:
+                self.assertIsNone(source)
+            else:
+                self.assertEqual(source.package.version, version)
+        # Equal module elements are shared between versions
+        modules = snapshot.get_modules('cityofnewyork', version='0.1.9').find([])
+        latest = snapshot.get_modules('cityofnewyork').find([])
+        self.assertEqual(len(modules), 5)
+        for m1, m2 in zip(modules, latest):
+            self.assertIs(m1.properties, m2.properties)
+        # Duplicate versions are rejected
+        with open(self.index_file, 'a') as f:
+            f.write('    - name: \'cityofnewyork\'\n')
+            f.write('      file: \'' + os.path.abspath(PACKAGE_FILE) + '\'\n')
+        with self.assertRaises(ValueError):
+            index.get_snapshot()
+
+    def test_self_links(self):
+        """Test that every module self link resolves to the module and the
+        package version that it was emitted for.
+        """
+        index_file = os.path.join(self.tmp_dir, 'links.yaml')
+        with open(index_file, 'w') as f:
+            f.write('packages:\n')
+            for i, version in enumerate(LINK_VERSIONS):
+                filename = os.path.join(self.tmp_dir, 'p1-' + str(i) + '.yaml')
+                with open(filename, 'w') as pf:
+                    if i == 0:
+                        pf.write('version: ' + version + '\n')
+                    else:
+                        pf.write('version: \'' + version + '\'\n')
+                    pf.write('timestamp: \'2019-01-01T00:00:00\'\n')
+                    pf.write('modules:\n')
+                    for name, folder in [
+                        ('load', ''),
+                        ('trips', '2019'),
+                        ('fares', 'taxi.2019')
+                    ]:
+                        pf.write('    - name: \'' + name + '\'\n')
+                        pf.write('      folder: \'' + folder + '\'\n')
+                        pf.write('      description: \'Trip records\'\n')
+                f.write('    - name: \'p1\'\n')
+                f.write('      file: \'' + filename + '\'\n')
+        api = PrmPackageServer(server_config(index_file))
+        snapshot = api.get_snapshot()
+        self.assertEqual(snapshot.packages['p1'].version, '1.0')
+        results = list()
+        for version in LINK_VERSIONS:
+            obj = api.get_package_modules('p1@' + version + ':')
+            self.assertEqual(len(obj['modules']), 3)
+            results.extend(obj['modules'])
+        results.extend(api.search_modules('trips')['modules'])
+        prefix = api.urls.packages_url() + '/'
+        for module in results:
+            href = [l['href'] for l in module['links'] if l['rel'] == 'self'][0]
+            self.assertTrue(href.startswith(prefix))
+            obj = api.get_package_modules(href[len(prefix):])
+            self.assertEqual(len(obj['modules']), 1)
+            self.assertEqual(obj['modules'][0]['name'], module['name'])
+            self.assertEqual(obj['modules'][0]['folder'], module['folder'])
+            self.assertEqual(obj['modules'][0]['version'], module['version'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import base64
+import datetime as dt
+import os
+import shutil
+import unittest
+from urllib.parse import parse_qs, urlparse
+
+from prmpckgsrv.api import PrmPackageServer, page, page_url
+from testutil import PACKAGE_FILES, PackageFilesTestCase, server_config
+
+
+def next_cursor(obj):
+    """Get the cursor from the 'next' reference of a paginated result. The
+    result is None if there is no 'next' reference."""
+    for link in obj['links']:
+        if link['rel'] == 'next':
+            return parse_qs(urlparse(link['href']).query)['cursor'][0]
+    return None
+
+
+class TestPagination(PackageFilesTestCase):
+
+    def test_page(self):
+        """Test paging through a list and continuing after changes."""
+        items = ['a', 'b', 'c', 'd', 'e']
+        key = lambda item: item
+        result, cursor = page(items, key, 'd1', limit=2)
+        self.assertEqual(result, ['a', 'b'])
+        result, cursor = page(items, key, 'd1', limit=2, cursor=cursor)
+        self.assertEqual(result, ['c', 'd'])
+        self.assertEqual(page(items, key, 'd1', limit=2, cursor=cursor), (['e'], None))
+        self.assertEqual(page(items, key, 'd1', cursor=cursor), (['e'], None))
+        # Items that are added to a new snapshot are not repeated
+        _, cursor = page(items, key, 'd1', limit=2)
+        changed = ['x', 'a', 'b', 'c', 'd', 'e']
+        result, _ = page(changed, key, 'd2', limit=2, cursor=cursor)
+        self.assertEqual(result, ['c', 'd'])
+        # Cursors whose item was removed are rejected unless the items are
+        # ordered by their key
+        changed = ['a', 'c', 'd', 'e']
+        with self.assertRaises(ValueError):
+            page(changed, key, 'd2', limit=2, cursor=cursor)
+        result, _ = page(changed, key, 'd2', limit=2, cursor=cursor, ordered=True)
+        self.assertEqual(result, ['c', 'd'])
+        with self.assertRaises(ValueError):
+            page(items, key, 'd1', limit=0)
+
+    def test_invalid_cursor(self):
+        """Test that invalid and tampered cursors are rejected."""
+        items = ['a', 'b', 'c']
+        key = lambda item: item
+        _, cursor = page(items, key, 'd1', limit=1)
+        encode = lambda obj: base64.urlsafe_b64encode(obj.encode('utf-8')).decode('ascii')
+        for invalid in [
+            '1',
+            'not a cursor',
+            encode('{}'),
+            encode('["d1", 1]'),
+            encode('["d1", "1", "a"]'),
+            encode('["d1", 0, "a"]'),
+            encode('["d1", 4, "a"]'),
+            encode('["d1", 2, "a"]'),
+            encode('["d2", 1, "x"]')
+        ]:
+            with self.assertRaises(ValueError):
+                page(items, key, 'd1', limit=1, cursor=invalid)
+        # Keys of a different type are rejected for ordered items
+        with self.assertRaises(ValueError):
+            page(items, key, 'd1', cursor=encode('["d2", 1, 1]'), ordered=True)
+        self.assertEqual(page(items, key, 'd1', cursor=cursor), (['b', 'c'], None))
+
+    def test_page_url(self):
+        """Test appending query parameters to resource Urls."""
+        url = 'http://localhost/packages'
+        self.assertEqual(page_url(url), url)
+        self.assertEqual(
+            page_url(
+                url,
+                fields=['name', 'version'],
+                limit=2,
+                cursor='abc=',
+                since=dt.datetime(2017, 10, 1)
+            ),
+            url + '?fields=name%2Cversion&limit=2&cursor=abc%3D&since=2017-10-01T00%3A00%3A00'
+        )
+
+    def test_list_packages(self):
+        """Test paginated and projected package listings."""
+        api = PrmPackageServer(server_config(self.index_file))
+        obj = api.list_packages(limit=1, fields=['name'])
+        self.assertEqual(obj['packages'], [{'name': 'cityofnewyork'}])
+        cursor = next_cursor(obj)
+        obj = api.list_packages(limit=1, fields=['name'], cursor=cursor)
+        self.assertEqual(obj['packages'], [{'name': 'urban-integration'}])
+        self.assertIsNone(next_cursor(obj))
+        # Change feed ordered by timestamp
+        obj = api.list_packages(limit=1, since=dt.datetime(2017, 1, 1))
+        self.assertEqual(obj['packages'][0]['name'], 'cityofnewyork')
+        obj = api.list_packages(
+            limit=1,
+            since=dt.datetime(2017, 1, 1),
+            cursor=next_cursor(obj)
+        )
+        self.assertEqual(obj['packages'][0]['name'], 'urban-integration')
+        self.assertIsNone(next_cursor(obj))
+        with self.assertRaises(ValueError):
+            api.list_packages(limit=1, cursor='1')
+
+    def test_high_water_mark(self):
+        """Test that the high-water mark of a change feed page does not skip
+        packages on the following pages.
+        """
+        # Copy of a package with the same timestamp
+        shutil.copy(
+            os.path.join(self.tmp_dir, PACKAGE_FILES[0]),
+            os.path.join(self.tmp_dir, 'nyc.yaml')
+        )
+        self.write_index(PACKAGE_FILES + ['nyc.yaml'])
+        api = PrmPackageServer(server_config(self.index_file))
+        since = dt.datetime(2017, 1, 1)
+        nyc = '2017-09-21T08:00:00'
+        for limit, names, high_water_mark in [
+            (None, ['cityofnewyork', 'nyc', 'urban-integration'], '2017-10-08T16:22:44'),
+            (1, ['cityofnewyork'], since.isoformat()),
+            (2, ['cityofnewyork', 'nyc'], nyc)
+        ]:
+            obj = api.list_packages(limit=limit, since=since)
+            self.assertEqual([p['name'] for p in obj['packages']], names)
+            self.assertEqual(obj['highWaterMark'], high_water_mark)
+        obj = api.list_packages(since=dt.datetime(2018, 1, 1))
+        self.assertEqual(obj['packages'], [])
+        self.assertEqual(obj['highWaterMark'], '2018-01-01T00:00:00')
+
+    def test_package_modules(self):
+        """Test paginated module listings."""
+        api = PrmPackageServer(server_config(self.index_file))
+        modules = list()
+        cursor = None
+        while True:
+            obj = api.get_package_modules(
+                'cityofnewyork',
+                fields=['name'],
+                limit=2,
+                cursor=cursor
+            )
+            modules.extend([m['name'] for m in obj['modules']])
+            cursor = next_cursor(obj)
+            if cursor is None:
+                break
+        self.assertEqual(
+            modules,
+            [m['name'] for m in api.get_package_modules('cityofnewyork')['modules']]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
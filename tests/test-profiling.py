@@ -0,0 +1,80 @@
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from prmpckgsrv.profiling import MODE_AGGREGATE, REPORT_FILE, RequestProfiler
+
+
+def busy(n):
+    """Function that is profiled for test purposes."""
+    return sum([i * i for i in range(n)])
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        """Create a temporary profile directory."""
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def test_dump(self):
+        """Test writing profile files for sampled requests."""
+        profiler = RequestProfiler(self.tmp_dir, header='X-Profile', secret='s3')
+        self.assertFalse(profiler.is_sampled({}))
+        self.assertTrue(profiler.is_sampled({'X-Profile': 's3'}))
+        profile = profiler.start()
+        busy(1000)
+        profiler.finish(profile, '/packages/<string:package_query>', 'a.b', 0.25)
+        filenames = os.listdir(self.tmp_dir)
+        self.assertEqual(len(filenames), 1)
+        self.assertTrue(filenames[0].endswith('-packages-a.b-250ms.prof'))
+        stats = pstats.Stats(os.path.join(self.tmp_dir, filenames[0]))
+        self.assertTrue(any([f[2] == 'busy' for f in stats.stats]))
+
+    def test_header_secret(self):
+        """Test that the profiling header enables profiling only if it carries
+        the secret.
+        """
+        profiler = RequestProfiler(self.tmp_dir, header='X-Profile', secret='s3')
+        for value in ['', '1', 's', 's3s3', '\u00e9']:
+            self.assertFalse(profiler.is_sampled({'X-Profile': value}))
+        with self.assertRaises(ValueError):
+            RequestProfiler(self.tmp_dir, header='X-Profile')
+
+    def test_max_files(self):
+        """Test that only the most recent profile files are kept."""
+        with open(os.path.join(self.tmp_dir, '00000000T000000-0-old.prof'), 'w') as f:
+            f.write('')
+        profiler = RequestProfiler(self.tmp_dir, rate=1, max_files=2)
+        for query in ['a', 'b']:
+            profiler.finish(profiler.start(), '/packages/<string:package_query>', query, 0.1)
+        filenames = sorted(os.listdir(self.tmp_dir))
+        self.assertEqual(len(filenames), 2)
+        self.assertTrue(filenames[0].endswith('-packages-a-100ms.prof'))
+        self.assertTrue(filenames[1].endswith('-packages-b-100ms.prof'))
+
+    def test_aggregate(self):
+        """Test keeping the profiles of the slowest requests."""
+        profiler = RequestProfiler(self.tmp_dir, rate=1, mode=MODE_AGGREGATE, top=2)
+        self.assertTrue(profiler.is_sampled({}))
+        for query, duration in [('a', 0.1), ('b', 0.3), ('c', 0.2), ('d', 0.05)]:
+            profile = profiler.start()
+            busy(100)
+            profiler.finish(profile, '/packages/<string:package_query>', query, duration)
+        self.assertEqual([e[3] for e in profiler.slowest], ['b', 'c'])
+        with open(os.path.join(self.tmp_dir, REPORT_FILE), 'r') as f:
+            report = f.read()
+        self.assertIn('1. /packages/<string:package_query> (b)', report)
+        self.assertIn('2. /packages/<string:package_query> (c)', report)
+        self.assertIn('busy', report)
+        with self.assertRaises(ValueError):
+            RequestProfiler(self.tmp_dir, mode='unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from prmpckgsrv.cache import ResponseCache
+from prmpckgsrv.index import IndexSnapshot
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_invalidate(self):
+        """Test that cached responses are dropped when the snapshot changes."""
+        snapshot = IndexSnapshot(dict(), dict(), {'index.yaml': (1, 10, 100)})
+        cache = ResponseCache(1024)
+        cache.put(snapshot, 'packages', b'{}')
+        cache.put(snapshot, 'packages/a', b'{}')
+        self.assertEqual(cache.get(snapshot, 'packages'), b'{}')
+        etag = cache.etag(snapshot, 'packages')
+        self.assertNotEqual(etag, cache.etag(snapshot, 'packages/a'))
+        # Modified index file
+        modified = IndexSnapshot(dict(), dict(), {'index.yaml': (2, 10, 100)})
+        self.assertIsNone(cache.get(modified, 'packages'))
+        self.assertNotEqual(etag, cache.etag(modified, 'packages'))
+        self.assertIsNone(cache.get(snapshot, 'packages'))
+        self.assertEqual(cache.size, 0)
+
+    def test_eviction(self):
+        """Test that least recently used responses are evicted when the
+        memory budget is exceeded.
+        """
+        snapshot = IndexSnapshot(dict(), dict(), {'index.yaml': (1, 10, 100)})
+        # Each entry occupies 20 bytes (key and body)
+        cache = ResponseCache(50)
+        cache.put(snapshot, 'packages/a', b'0123456789')
+        cache.put(snapshot, 'packages/b', b'0123456789')
+        self.assertIsNotNone(cache.get(snapshot, 'packages/a'))
+        cache.put(snapshot, 'packages/c', b'0123456789')
+        self.assertIsNotNone(cache.get(snapshot, 'packages/a'))
+        self.assertIsNone(cache.get(snapshot, 'packages/b'))
+        self.assertIsNotNone(cache.get(snapshot, 'packages/c'))
+        self.assertEqual(cache.size, 40)
+        # Replacing a response does not count its previous size
+        cache.put(snapshot, 'packages/a', b'01234')
+        self.assertEqual(cache.size, 35)
+        # Responses that exceed the budget on their own are not cached
+        cache.put(snapshot, 'packages/d', b'0' * 50)
+        self.assertIsNone(cache.get(snapshot, 'packages/d'))
+        self.assertIsNotNone(cache.get(snapshot, 'packages/c'))
+
+
+if __name__ == '__main__':
+    unittest.main()
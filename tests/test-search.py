@@ -0,0 +1,107 @@
+import os
+import unittest
+
+from prmpckgsrv.index import PackageIndex
+from prmpckgsrv.search import SearchIndex
+from testutil import PackageFilesTestCase
+
+
+class TestSearchIndex(PackageFilesTestCase):
+
+    def test_search(self):
+        """Test ranking, prefix matching, and result limits."""
+        index = PackageIndex(self.index_file, 'http://localhost')
+        search = index.get_search_index(index.get_snapshot())
+        self.assertIs(index.get_search_index(index.get_snapshot()), search)
+        # Modules are read without adding them to the module cache
+        self.assertEqual(index.cache.statistics()['entries'], 0)
+        names = lambda results: [entry[0] for _, entry, _ in results]
+        # Module names rank before folders
+        self.assertEqual(names(search.search('subway')), ['subway'])
+        self.assertEqual(
+            names(search.search('trans')),
+            ['taxi', 'citibike', 'subway']
+        )
+        self.assertEqual(names(search.search('trans mta')), ['subway'])
+        self.assertEqual(names(search.search('Trip records')), ['taxi'])
+        self.assertEqual(len(search.search('trans', limit=2)), 2)
+        self.assertEqual(search.search('trans unknown'), [])
+        self.assertEqual(search.search(''), [])
+
+    def test_empty_package(self):
+        """Test search when a package without modules is listed first."""
+        self.write_index(['urban-integration.yaml', 'cityofnewyork.yaml'])
+        index = PackageIndex(self.index_file, 'http://localhost')
+        search = index.get_search_index(index.get_snapshot())
+        self.assertEqual(search.bases['urban-integration'], 0)
+        self.assertEqual(search.bases['cityofnewyork'], 0)
+        self.assertEqual(
+            [(p, entry[0]) for p, entry, _ in search.search('trans')],
+            [
+                ('cityofnewyork', 'taxi'),
+                ('cityofnewyork', 'citibike'),
+                ('cityofnewyork', 'subway')
+            ]
+        )
+
+    def test_unreadable_package(self):
+        """Test that packages whose modules cannot be read are skipped."""
+        index = PackageIndex(self.index_file, 'http://localhost')
+        package_file = os.path.join(self.tmp_dir, 'urban-integration.yaml')
+        with open(package_file, 'a') as f:
+            f.write('modules:\n')
+            f.write('    - name: \'taxizones\'\n')
+            f.write('      folder: \'\'\n')
+        package_file = os.path.join(self.tmp_dir, 'cityofnewyork.yaml')
+        with open(package_file, 'r') as f:
+            doc = f.read()
+        with open(package_file, 'a') as f:
+            f.write('    - name: [\n')
+        with self.assertLogs('prmpckgsrv.index', level='ERROR'):
+            search = index.get_search_index(index.get_snapshot())
+        self.assertNotIn('cityofnewyork', search.packages)
+        self.assertEqual(
+            [(p, entry[0]) for p, entry, _ in search.search('taxi')],
+            [('urban-integration', 'taxizones')]
+        )
+        # The package is indexed once it can be read again
+        with open(package_file, 'w') as f:
+            f.write(doc)
+        search = index.get_search_index(index.get_snapshot())
+        self.assertEqual(
+            [(p, entry[0]) for p, entry, _ in search.search('taxi')],
+            [('cityofnewyork', 'taxi'), ('urban-integration', 'taxizones')]
+        )
+
+    def test_update(self):
+        """Test that the index is updated for modified packages only."""
+        index = PackageIndex(self.index_file, 'http://localhost')
+        previous = index.get_search_index(index.get_snapshot())
+        package_file = os.path.join(self.tmp_dir, 'urban-integration.yaml')
+        with open(package_file, 'a') as f:
+            f.write('modules:\n')
+            f.write('    - name: \'taxizones\'\n')
+            f.write('      folder: \'\'\n')
+            f.write('      description: \'Taxi zone boundaries\'\n')
+        snapshot = index.get_snapshot()
+        search = index.get_search_index(snapshot)
+        self.assertIs(
+            search.packages['cityofnewyork'],
+            previous.packages['cityofnewyork']
+        )
+        self.assertEqual(
+            [(p, entry[0]) for p, entry, _ in search.search('taxi')],
+            [('cityofnewyork', 'taxi'), ('urban-integration', 'taxizones')]
+        )
+        # The updated index equals an index that is created from scratch
+        full = SearchIndex(snapshot)
+        self.assertEqual(search.tokens, full.tokens)
+        for query in ['taxi', 'trans', 'zone', 'data']:
+            self.assertEqual(
+                [r[1:] for r in search.search(query)],
+                [r[1:] for r in full.search(query)]
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,250 @@
+import importlib
+import os
+import shutil
+import tempfile
+import unittest
+
+import prmpckgsrv.const as const
+from testutil import DATA_DIR
+
+
+"""Package files in the order in which they are listed in the index file. The
+first package has no modules."""
+PACKAGE_FILES = ['urban-integration.yaml', 'cityofnewyork.yaml']
+
+"""Maximum number of queries in a batch request."""
+BATCH_MAXQUERIES = 3
+
+"""Modules listings with at least this many modules are streamed."""
+STREAM_THRESHOLD = 3
+
+"""Module artifact in the download directory."""
+ARTIFACT_FILE = 'cityofnewyork/taxi.py'
+ARTIFACT_DATA = b'import sys\n'
+
+
+"""The Web server is configured when the server module is first imported. The
+module is imported by setUpModule after the configuration file is written."""
+server = None
+tmp_dir = None
+
+
+def setUpModule():
+    """Write the server configuration to a temporary directory and import the
+    server module.
+    """
+    global server, tmp_dir
+    tmp_dir = tempfile.mkdtemp()
+    # Package files are copied so that tests can modify them
+    index_file = os.path.join(tmp_dir, 'index.yaml')
+    with open(index_file, 'w') as f:
+        f.write('packages:\n')
+        for filename in PACKAGE_FILES:
+            shutil.copy(os.path.join(DATA_DIR, filename), tmp_dir)
+            f.write('    - name: \'' + filename[:-5] + '\'\n')
+            f.write('      file: \'' + os.path.join(tmp_dir, filename) + '\'\n')
+    download_dir = os.path.join(tmp_dir, 'downloads')
+    artifact_file = os.path.join(download_dir, ARTIFACT_FILE)
+    os.makedirs(os.path.dirname(artifact_file))
+    with open(artifact_file, 'wb') as f:
+        f.write(ARTIFACT_DATA)
+    config_file = os.path.join(tmp_dir, 'config.yaml')
+    with open(config_file, 'w') as f:
+        f.write('properties:\n')
+        for key, value in [
+            (const.PACKAGE_INDEXFILE, '\'' + index_file + '\''),
+            (const.SERVER_BATCH_MAXQUERIES, str(BATCH_MAXQUERIES)),
+            (const.SERVER_STREAM_THRESHOLD, str(STREAM_THRESHOLD)),
+            (const.DOWNLOAD_DIRECTORY, '\'' + download_dir + '\''),
+            (const.APP_DEBUG, 'false')
+        ]:
+            f.write('    - key: \'' + key + '\'\n')
+            f.write('      value: ' + value + '\n')
+    os.environ[const.ENV_CONFIG] = config_file
+    server = importlib.import_module('prmpckgsrv.server')
+
+
+def tearDownModule():
+    """Remove the temporary directory."""
+    shutil.rmtree(tmp_dir)
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        """Create a test client for the Web server."""
+        self.client = server.app.test_client()
+
+    def module_lookups(self):
+        """Get the number of module cache lookups."""
+        stats = server.api.cache_statistics()
+        return stats['hits'] + stats['misses']
+
+    def test_batch(self):
+        """Test batch requests and their validation."""
+        queries = [
+            'cityofnewyork.transportation',
+            'unknown',
+            'cityofnewyork.transportation.mta'
+        ]
+        response = self.client.post('/packages:batch', json={'queries': queries})
+        self.assertEqual(response.status_code, 200)
+        obj = response.get_json()
+        self.assertEqual([r['query'] for r in obj['queries']], queries)
+        self.assertIn('error', obj['queries'][1])
+        self.assertEqual(obj['queries'][2]['modules'], [2])
+        self.assertEqual(len(obj['modules']), 3)
+        # Invalid requests
+        for body in [
+            {'queries': queries + ['urban-integration']},
+            {'queries': 'cityofnewyork'},
+            {'queries': ['cityofnewyork', '']},
+            {'queries': ['cityofnewyork', 1]},
+            ['cityofnewyork']
+        ]:
+            response = self.client.post('/packages:batch', json=body)
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            '/packages:batch',
+            data='{"queries": [',
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_cache_key(self):
+        """Test that escaped query arguments do not share cached responses
+        with the arguments that they resemble.
+        """
+        url = '/packages/cityofnewyork'
+        response = self.client.get(url + '?fields=name%26limit%3D1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['modules']), 5)
+        etag = response.headers['ETag']
+        response = self.client.get(url + '?fields=name&limit=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.get_json()['modules'],
+            [{'name': 'load'}]
+        )
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_broken_modules(self):
+        """Test that package files with invalid modules result in a server
+        error that does not expose the file path.
+        """
+        package_file = os.path.join(tmp_dir, 'cityofnewyork.yaml')
+        with open(package_file, 'r') as f:
+            doc = f.read()
+        try:
+            with open(package_file, 'w') as f:
+                f.write(doc.replace('    - name: \'taxi\'', '    - name: [taxi'))
+            response = self.client.get('/packages')
+            self.assertEqual(response.status_code, 200)
+            for url in [
+                '/packages/cityofnewyork',
+                '/packages/cityofnewyork?limit=1'
+            ]:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 500)
+                message = response.get_json()['message']
+                self.assertIn('cityofnewyork', message)
+                self.assertNotIn(tmp_dir, message)
+            # The package is left out of search results
+            response = self.client.get('/search?q=load')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['modules'], [])
+        finally:
+            with open(package_file, 'w') as f:
+                f.write(doc)
+        response = self.client.get('/packages/cityofnewyork?limit=1')
+        self.assertEqual(response.status_code, 200)
+
+    def test_since(self):
+        """Test listing packages with timestamps at the limits of the value
+        range.
+        """
+        response = self.client.get('/packages?since=9999-12-31T23:59:59.999999')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['packages'], [])
+        response = self.client.get('/packages?since=0001-01-01T00:00:00%2B01:00')
+        self.assertEqual(response.status_code, 400)
+
+    def test_conditional_request(self):
+        """Test that conditional requests and cached responses are answered
+        without accessing the package modules.
+        """
+        for query, streamed in [
+            ('cityofnewyork', True),
+            ('cityofnewyork.transportation.mta', False)
+        ]:
+            url = '/packages/' + query
+            lookups = self.module_lookups()
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            # Streamed responses have no content length
+            self.assertEqual(response.content_length is None, streamed)
+            self.assertEqual(self.module_lookups(), lookups + 1)
+            etag = response.headers['ETag']
+            response = self.client.get(url, headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(self.module_lookups(), lookups + 1)
+            # Encoded responses are cached. Streamed responses are not.
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            if streamed:
+                self.assertEqual(self.module_lookups(), lookups + 2)
+            else:
+                self.assertEqual(self.module_lookups(), lookups + 1)
+
+    def test_downloads(self):
+        """Test downloading module artifacts from the download directory."""
+        # Unknown package and unknown version
+        for url in [
+            '/packages/unknown.transportation.taxi',
+            '/packages/cityofnewyork@9.9:transportation.taxi',
+            '/downloads/unknown/taxi.py',
+            '/downloads/cityofnewyork/unknown.py',
+            '/downloads/../config.yaml'
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 404)
+        # Download tasks refer to the download route
+        response = self.client.get(
+            '/packages/cityofnewyork@0.1.10:transportation.taxi'
+        )
+        self.assertEqual(response.status_code, 200)
+        task = response.get_json()['modules'][0]['install']['tasks'][0]
+        source = [p['value'] for p in task['properties'] if p['name'] == 'source'][0]
+        self.assertTrue(source.endswith('/downloads/' + ARTIFACT_FILE))
+        url = '/downloads/' + ARTIFACT_FILE
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, ARTIFACT_DATA)
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        etag = response.headers['ETag']
+        response.close()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response.close()
+        response = self.client.get(url, headers={'Range': 'bytes=0-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, ARTIFACT_DATA[:6])
+        response.close()
+
+    def test_search(self):
+        """Test module search with a package without modules listed first in
+        the package index.
+        """
+        response = self.client.get('/search?q=trans')
+        self.assertEqual(response.status_code, 200)
+        obj = response.get_json()
+        self.assertEqual(
+            [m['name'] for m in obj['modules']],
+            ['taxi', 'citibike', 'subway']
+        )
+        response = self.client.get('/search')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
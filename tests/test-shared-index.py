@@ -0,0 +1,99 @@
+import json
+import os
+import unittest
+
+from prmpckgsrv.compiled import GENERATION_VERSION, CompiledIndex
+from prmpckgsrv.index import MappedModuleSpecification, PackageIndex
+from prmpckgsrv.index import read_index_snapshot
+from testutil import PACKAGE_FILES, PackageFilesTestCase
+
+
+def serialize(package, module):
+    """Module serializer used for test purposes."""
+    obj = module.to_dict()
+    obj['version'] = package.version
+    return obj
+
+
+class TestSharedIndex(PackageFilesTestCase):
+
+    def setUp(self):
+        """Create the package files and the index file."""
+        super(TestSharedIndex, self).setUp()
+        self.generation_file = os.path.join(self.tmp_dir, 'index.bin')
+
+    def shared_index(self):
+        """Create a package index that uses the shared generation file."""
+        return PackageIndex(
+            self.index_file,
+            'http://localhost',
+            compiled_file=self.generation_file,
+            serializer=serialize,
+            fingerprint='test'
+        )
+
+    def test_publish(self):
+        """Test publishing an index generation and reading modules from it."""
+        index = self.shared_index()
+        compiled = CompiledIndex(self.generation_file)
+        self.assertEqual(compiled.version, GENERATION_VERSION)
+        self.assertEqual(compiled.fingerprint, 'test')
+        compiled.close()
+        snapshot = index.get_snapshot()
+        expected = read_index_snapshot(self.index_file, 'http://localhost')
+        self.assertEqual(
+            list(snapshot.packages.keys()),
+            list(expected.packages.keys())
+        )
+        modules = snapshot.get_modules('cityofnewyork').find([])
+        expected_modules = expected.get_modules('cityofnewyork').find([])
+        self.assertEqual(len(modules), 5)
+        for module, expected_module in zip(modules, expected_modules):
+            self.assertIsInstance(module, MappedModuleSpecification)
+            self.assertEqual(module.identifier, expected_module.identifier)
+            self.assertEqual(module.to_dict(), expected_module.to_dict())
+            self.assertEqual(
+                json.loads(module.fragment.decode('utf-8')),
+                serialize(snapshot.packages['cityofnewyork'], expected_module)
+            )
+        # Generations with a different fingerprint are not used
+        other = PackageIndex(
+            self.index_file,
+            'http://localhost',
+            compiled_file=self.generation_file,
+            fingerprint='other'
+        )
+        self.assertIsNone(other.get_snapshot().get_modules('cityofnewyork').find([])[0].fragment)
+
+    def test_switch_generation(self):
+        """Test that processes switch to a new generation that is published
+        by another process.
+        """
+        index_1 = self.shared_index()
+        index_2 = self.shared_index()
+        snapshot = index_1.get_snapshot()
+        self.assertEqual(
+            index_2.get_snapshot().signatures,
+            snapshot.signatures
+        )
+        # Modify a package file. The first index that is refreshed publishes
+        # the new generation. The second index reads the new generation.
+        package_file = os.path.join(self.tmp_dir, PACKAGE_FILES[1])
+        with open(package_file, 'a') as f:
+            f.write('description: \'Urban data integration\'\n')
+        self.assertTrue(index_2.refresh())
+        signature = index_2.get_snapshot().signatures[self.generation_file]
+        self.assertNotEqual(signature, snapshot.signatures[self.generation_file])
+        self.assertTrue(index_1.refresh())
+        snapshot = index_1.get_snapshot()
+        self.assertEqual(snapshot.signatures[self.generation_file], signature)
+        self.assertEqual(
+            snapshot.packages['urban-integration'].description,
+            'Urban data integration'
+        )
+        source = snapshot.sources['cityofnewyork']
+        self.assertEqual(source.compiled.version, GENERATION_VERSION)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import datetime as dt
+import unittest
+
+from prmpckgsrv.index import PackageDescriptor
+from prmpckgsrv.timeline import TimestampIndex
+
+
+def descriptor(name, day):
+    """Get package descriptor with a timestamp in October 2017."""
+    return PackageDescriptor(name, name + '.yaml', '0.1', dt.datetime(2017, 10, day))
+
+
+class TestTimestampIndex(unittest.TestCase):
+
+    def test_since(self):
+        """Test listing packages that changed since a given timestamp."""
+        packages = {
+            'a': descriptor('a', 3),
+            'b': descriptor('b', 1),
+            'c': descriptor('c', 2)
+        }
+        timeline = TimestampIndex(packages)
+        self.assertEqual(timeline.since(dt.datetime(2017, 9, 1)), ['b', 'c', 'a'])
+        self.assertEqual(timeline.since(dt.datetime(2017, 10, 2)), ['a'])
+        self.assertEqual(timeline.since(dt.datetime(2017, 10, 3)), [])
+        self.assertEqual(timeline.high_water_mark(), dt.datetime(2017, 10, 3))
+        self.assertIsNone(TimestampIndex(dict()).high_water_mark())
+        # Packages with the same timestamp are ordered by name
+        packages['d'] = descriptor('d', 2)
+        timeline = TimestampIndex(packages)
+        self.assertEqual(timeline.since(dt.datetime(2017, 10, 1)), ['c', 'd', 'a'])
+        self.assertEqual(timeline.since(dt.datetime(2017, 10, 2)), ['a'])
+        self.assertEqual(
+            timeline.since(dt.datetime(2017, 10, 1, 23, 59, 59, 999999)),
+            ['c', 'd', 'a']
+        )
+
+        # No package is after the largest timestamp
+        self.assertEqual(timeline.since(dt.datetime.max), [])
+
+    def test_update(self):
+        """Test that updating the index for changed packages gives the same
+        result as creating a new index.
+        """
+        packages = {
+            'a': descriptor('a', 3),
+            'b': descriptor('b', 1),
+            'c': descriptor('c', 2)
+        }
+        previous = TimestampIndex(packages)
+        packages = dict(packages)
+        del packages['c']
+        packages['b'] = descriptor('b', 5)
+        packages['d'] = descriptor('d', 4)
+        timeline = TimestampIndex(packages, previous=previous)
+        self.assertEqual(timeline.entries, TimestampIndex(packages).entries)
+        self.assertEqual(timeline.since(dt.datetime(2017, 10, 3)), ['d', 'b'])
+        self.assertEqual(len(previous), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Helper for tests that read a package index from a temporary directory."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import prmpckgsrv.const as const
+
+
+"""Package index and package files used for test purposes."""
+DATA_DIR = './data'
+PACKAGE_FILES = ['cityofnewyork.yaml', 'urban-integration.yaml']
+
+
+def server_config(index_file):
+    """Get the default Web service configuration for the given index file.
+
+    Parameters
+    ----------
+    index_file: string
+        Path to the package index file
+
+    Returns
+    -------
+    dict
+    """
+    config = dict(const.DEFAULT_CONFIG)
+    config[const.PACKAGE_INDEXFILE] = index_file
+    return config
+
+
+class PackageFilesTestCase(unittest.TestCase):
+    """Test case that copies the package files into a temporary directory and
+    creates an index file that references them.
+
+    Attributes
+    ----------
+    index_file: string
+        Path to the index file in the temporary directory
+    tmp_dir: string
+        Temporary directory that contains the package files
+    """
+    def setUp(self):
+        """Copy package files into a temporary directory and create an index
+        file that references them.
+        """
+        self.tmp_dir = tempfile.mkdtemp()
+        for filename in PACKAGE_FILES:
+            shutil.copy(os.path.join(DATA_DIR, filename), self.tmp_dir)
+        self.index_file = os.path.join(self.tmp_dir, 'index.yaml')
+        self.write_index(PACKAGE_FILES)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.tmp_dir)
+
+    def write_index(self, files, index_file=None):
+        """Write index file that references the given package files in the
+        temporary directory. The package name is the file name without suffix.
+
+        Parameters
+        ----------
+        files: list(string)
+            Names of package files in the temporary directory
+        index_file: string, optional
+            Path to the index file. Defaults to the index file of the test.
+        """
+        if index_file is None:
+            index_file = self.index_file
+        with open(index_file, 'w') as f:
+            f.write('packages:\n')
+            for filename in files:
+                f.write('    - name: \'' + filename[:-5] + '\'\n')
+                f.write('      file: \'' + os.path.join(self.tmp_dir, filename) + '\'\n')